@@ -21,6 +21,9 @@ if not api_config.developer_enabled:
    builtins.print = print
    sys.stdout = NullWriter()
    sys.stderr = NullWriter()
+from startup_profiler import StartupProfiler
+STARTUP = StartupProfiler('launcher')
+STARTUP.begin('imports')
 import http.server
 import socketserver
 import threading
@@ -50,6 +53,9 @@ from PyQt6.QtGui import QAction, QIcon
 from PyQt6.QtWebEngineWidgets import QWebEngineView
 from PyQt6.QtWebEngineCore import QWebEngineProfile, QWebEngineScript
 import updater_module 
+from engine_ipc import EngineClient
+from config_service import ConfigService, ConfigConflict
+from file_watcher import FileWatcher, RESCAN, THEME_REMOVED
 import zlib  
 import base64 
 import ctypes
@@ -77,6 +83,7 @@ try:
 except ImportError:
     HAS_EMBEDDED_ASSETS = False
     print(" No embedded assets found. Running in dev (file-system) mode.")
+STARTUP.end('imports')
 
 
 
@@ -100,6 +107,16 @@ else:
 print(f"Server Root detected as: {SERVER_ROOT}")
 APP_CONFIG_FILE = api_config.APP_CONFIG_FILE
 THUMBNAIL_CACHE_DIR = 'thumbnail_cache'
+CONFIG = ConfigService(SERVER_ROOT)
+ENGINE_CLIENT = EngineClient(SERVER_ROOT)
+# Latest engine state pushed over the control channel (see on_engine_event).
+ENGINE_STATE = {"connected": False}
+ENGINE_STATE_LOCK = threading.Lock()
+# validate_wallpaper() result per installed theme, or a stale marker; kept
+# current by FILE_WATCHER so /wallpapers only re-validates what changed.
+THEME_INDEX = None
+THEME_INDEX_LOCK = threading.Lock()
+FILE_WATCHER = None
 user32   = ctypes.windll.user32
 kernel32 = ctypes.windll.kernel32
 
@@ -228,20 +245,8 @@ else:
     print("WARNING: No 'engine.exe' or 'main.py' found in server root.")
 
 def read_app_config():
-    config_path = os.path.join(SERVER_ROOT, APP_CONFIG_FILE)
-
-    defaults = {'active_theme': '', 'port': 8080, 'auto_start': True} 
-    if not os.path.isfile(config_path):
-        print(f"Warning: {APP_CONFIG_FILE} not found. Using defaults.")
-        return defaults
-    try:
-        with open(config_path, 'r', encoding='utf-8') as f:
-            config = json.load(f)
-            defaults.update(config) 
-            return defaults
-    except Exception as e:
-        print(f"Error reading {APP_CONFIG_FILE}: {e}. Using defaults.")
-        return defaults
+    """app_config.json merged with the defaults, as a plain dict for the UI."""
+    return CONFIG.app_config().to_dict()
 
 def update_startup_shortcut(enable: bool):
     if not HAS_WIN32COM:
@@ -292,14 +297,10 @@ def update_startup_shortcut(enable: bool):
         return False, str(e)
 
 def validate_wallpaper(theme_dir_name, theme_path):
-    config_path = os.path.join(theme_path, 'config.json')
-
-    if not os.path.isfile(config_path):
-        return {'isValid': False, 'themeId': theme_dir_name, 'themeName': theme_dir_name, 'missingAssets': ['config.json']}
-
     try:
-        with open(config_path, 'r', encoding='utf-8') as f:
-            config_data = json.load(f)
+        config_data = CONFIG.theme_config(theme_dir_name).raw
+    except LookupError:
+        return {'isValid': False, 'themeId': theme_dir_name, 'themeName': theme_dir_name, 'missingAssets': ['config.json']}
     except Exception as e:
         return {'isValid': False, 'themeId': theme_dir_name, 'themeName': theme_dir_name, 'missingAssets': ['config.json (Invalid JSON)'], 'error': str(e)}
 
@@ -363,6 +364,47 @@ def validate_wallpaper(theme_dir_name, theme_path):
 
     return wallpaper_data
 
+def on_watch_events(events):
+    global THEME_INDEX
+    with THEME_INDEX_LOCK:
+        if THEME_INDEX is None: return
+        for event in events:
+            if event.kind == RESCAN:
+                THEME_INDEX = None
+                return
+            if event.kind == THEME_REMOVED:
+                THEME_INDEX.pop(event.theme_id, None)
+            elif event.theme_id:
+                THEME_INDEX[event.theme_id] = object()
+
+def invalidate_theme(theme_id):
+    """For our own installs and deletes, which /wallpapers may ask about
+    before the watcher has reported them."""
+    with THEME_INDEX_LOCK:
+        if THEME_INDEX is None: return
+        if os.path.isdir(os.path.join(SERVER_ROOT, WALLPAPERS_DIR, theme_id)):
+            THEME_INDEX[theme_id] = object()
+        else:
+            THEME_INDEX.pop(theme_id, None)
+
+def validated_themes(base_dir):
+    """validate_wallpaper() for every theme folder; without the file watcher
+    every call lists and validates them all again."""
+    global THEME_INDEX
+    with THEME_INDEX_LOCK:
+        index = THEME_INDEX if FILE_WATCHER is not None else None
+        if index is None:
+            index = {name: object() for name in os.listdir(base_dir) if os.path.isdir(os.path.join(base_dir, name))}
+            if FILE_WATCHER is not None: THEME_INDEX = index
+        results = {k: v for k, v in index.items() if isinstance(v, dict)}
+        stale = {k: v for k, v in index.items() if not isinstance(v, dict)}
+    for theme_id, marker in stale.items():
+        results[theme_id] = validate_wallpaper(theme_id, os.path.join(base_dir, theme_id))
+        with THEME_INDEX_LOCK:
+            # Unless it changed again while we were validating.
+            if index.get(theme_id) is marker: index[theme_id] = results[theme_id]
+    return list(results.values())
+
 def scan_all_wallpapers():
     valid_wallpapers = []
     invalid_wallpapers = []
@@ -376,16 +418,11 @@ def scan_all_wallpapers():
         print(f"Error: Wallpapers directory not found at {base_dir}")
         return {"error": f"Wallpapers directory not found at {base_dir}"}
 
-    for theme_dir_name in os.listdir(base_dir):
-        theme_path = os.path.join(base_dir, theme_dir_name)
-
-        if os.path.isdir(theme_path):
-            result = validate_wallpaper(theme_dir_name, theme_path)
-
-            if result['isValid']:
-                valid_wallpapers.append(result)
-            else:
-                invalid_wallpapers.append(result)
+    for result in validated_themes(base_dir):
+        if result['isValid']:
+            valid_wallpapers.append(result)
+        else:
+            invalid_wallpapers.append(result)
 
     valid_wallpapers.sort(key=lambda x: x['themeId'] != active_theme_id)
 
@@ -397,7 +434,25 @@ def scan_all_wallpapers():
         'appVersion': CURRENT_APP_VERSION
     }
 
+def on_engine_event(event, data):
+    with ENGINE_STATE_LOCK:
+        if event == 'connected':
+            ENGINE_STATE.clear()
+            ENGINE_STATE.update(connected=True, pid=(data or {}).get('pid'))
+        elif event in ('disconnected', 'stopping'):
+            ENGINE_STATE['connected'] = False
+        else:
+            ENGINE_STATE[event] = data
+        ENGINE_STATE['updated_at'] = time.time()
+
 def is_engine_running(port):
+    with ENGINE_STATE_LOCK:
+        if ENGINE_STATE.get('connected'): return True
+    try:
+        ENGINE_CLIENT.request('ping')
+        return True
+    except Exception: pass
+    # Engine without a control channel: fall back to probing its HTTP port.
     try:
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
             s.settimeout(1) 
@@ -406,6 +461,32 @@ def is_engine_running(port):
     except:
         return False
 
+LIVE_RENDER_KEYS = ('fpsLimit', 'qualityPreset', 'videoProfile', 'muteAudio', 'volume')
+
+def push_live_render_settings(theme_id, previous_config, config_data):
+    """Send changed render settings of the active theme to the running engine so
+    it can apply them without a restart. Returns the engine's report (with
+    "live": True when no /reload is needed) or None if the engine must reload."""
+    changed = {k for k in set(previous_config) | set(config_data) if previous_config.get(k) != config_data.get(k)}
+    if not changed or not changed.issubset(LIVE_RENDER_KEYS):
+        return None
+    app_config = CONFIG.app_config()
+    port = app_config.port
+    if app_config.active_theme != theme_id or not is_engine_running(port):
+        return None
+    settings = {k: config_data[k] for k in changed if k in config_data}
+    started = time.perf_counter()
+    try:
+        # The engine waits up to RENDER_SETTINGS_TIMEOUT for the wallpaper; don't give up first.
+        report = ENGINE_CLIENT.request('reload_settings', {'settings': settings},
+                                       timeout=api_config.RENDER_SETTINGS_TIMEOUT + 2)
+    except Exception as e:
+        print(f"Live render settings failed, engine will reload: {e}")
+        return None
+    report['round_trip_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    print(f"Live render settings: {report}")
+    return report if report.get('live') else None
+
 def start_engine_process():
     if not ENGINE_RUN_COMMAND:
         raise FileNotFoundError("Engine executable or script not found.")
@@ -503,6 +584,12 @@ class EditorHTTPHandler(http.server.SimpleHTTPRequestHandler):
                 self.send_json_response(500, {'error': f"Error generating wallpaper list: {e}"})
             return
 
+        elif self.path == '/engine_state':
+            with ENGINE_STATE_LOCK:
+                state = dict(ENGINE_STATE)
+            self.send_json_response(200, state)
+            return
+
         elif self.path == '/get_app_settings':
             try:
                 config = read_app_config()
@@ -592,16 +679,15 @@ class EditorHTTPHandler(http.server.SimpleHTTPRequestHandler):
                 post_body = self.rfile.read(content_len)
                 data = json.loads(post_body)
 
-                app_config = read_app_config()
+                changes = {}
                 if 'tour' in data:
-                    app_config['tour'] = bool(data.get('tour'))
+                    changes['tour'] = bool(data.get('tour'))
                 new_auto_start = data.get('auto_start')
                 if new_auto_start is not None:
-                    app_config['auto_start'] = bool(new_auto_start)
-
-                config_path = os.path.join(SERVER_ROOT, APP_CONFIG_FILE)
-                with open(config_path, 'w', encoding='utf-8') as f:
-                    json.dump(app_config, f, indent=2)
+                    changes['auto_start'] = bool(new_auto_start)
+                # A UI that sends back the config_version it loaded gets a 409
+                # instead of overwriting a change the engine made meanwhile.
+                CONFIG.update_app_config(expected_version=data.get('config_version'), **changes)
 
                 if new_auto_start is not None:
                     success, msg = update_startup_shortcut(bool(new_auto_start))
@@ -609,6 +695,8 @@ class EditorHTTPHandler(http.server.SimpleHTTPRequestHandler):
                          print(f"Failed to update startup shortcut: {msg}")
 
                 self.send_json_response(200, {'status': 'success', 'message': 'Settings saved'})
+            except ConfigConflict as e:
+                self.send_json_response(409, {'error': str(e), 'config': read_app_config()})
             except Exception as e:
                 print(f"Error saving settings: {e}")
                 self.send_json_response(500, {'error': str(e)})
@@ -674,6 +762,7 @@ class EditorHTTPHandler(http.server.SimpleHTTPRequestHandler):
                             target.write(source.read())
 
                 print(f"Successfully installed theme: {theme_id}")
+                invalidate_theme(theme_id)
                 self.send_json_response(200, {'status': 'success', 'installed': theme_id})
 
             except Exception as e:
@@ -760,6 +849,7 @@ class EditorHTTPHandler(http.server.SimpleHTTPRequestHandler):
                             target.write(source.read())
 
                 print(f"Successfully imported theme: {theme_id}")
+                invalidate_theme(theme_id)
                 self.send_json_response(200, {'status': 'success', 'themeId': theme_id})
 
             except Exception as e:
@@ -778,12 +868,7 @@ class EditorHTTPHandler(http.server.SimpleHTTPRequestHandler):
                     self.send_json_response(400, {'error': "Missing 'themeId' in request body"})
                     return
 
-                app_config = read_app_config()
-                app_config['active_theme'] = new_theme_id
-
-                config_path = os.path.join(SERVER_ROOT, APP_CONFIG_FILE)
-                with open(config_path, 'w', encoding='utf-8') as f:
-                    json.dump(app_config, f, indent=2)
+                CONFIG.update_app_config(active_theme=str(new_theme_id))
 
                 self.send_json_response(200, {'status': 'success', 'activated': new_theme_id})
 
@@ -804,63 +889,82 @@ class EditorHTTPHandler(http.server.SimpleHTTPRequestHandler):
                     self.send_json_response(400, {'error': "Missing 'themeId'"})
                     return
 
-                theme_path = os.path.join(SERVER_ROOT, WALLPAPERS_DIR, theme_id)
-                config_path = os.path.join(theme_path, 'config.json')
-
-                if not os.path.isfile(config_path):
-                    self.send_json_response(404, {'error': 'config.json not found for this theme.'})
-                    return
-
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    config_data = json.load(f)
-
+                changes = {}
                 if 'enableGlobal' in data:
-                    config_data['Enable_Global_Widget'] = bool(data.get('enableGlobal'))
-
-                    if 'Enable_Network_Widget' in config_data:
-                        del config_data['Enable_Network_Widget']
+                    changes['enable_global_widget'] = bool(data.get('enableGlobal'))
+                    changes['enable_network_widget'] = None
 
                 if 'fpsLimit' in data:
                     try:
-                        config_data['fpsLimit'] = int(data.get('fpsLimit'))
+                        changes['fps_limit'] = int(data.get('fpsLimit'))
                     except (ValueError, TypeError):
-                        config_data['fpsLimit'] = 60
+                        changes['fps_limit'] = 60
                 
                 if 'qualityPreset' in data:
-                    config_data['qualityPreset'] = str(data.get('qualityPreset'))
+                    changes['quality_preset'] = str(data.get('qualityPreset'))
+
+                if 'videoProfile' in data:
+                    # null goes back to the profile qualityPreset implies.
+                    changes['video_profile'] = data.get('videoProfile') or None
 
                 if 'muteAudio' in data:
 
                     val = data.get('muteAudio')
-                    config_data['muteAudio'] = bool(val) if val is not None else True
+                    changes['mute_audio'] = bool(val) if val is not None else True
 
                 if 'volume' in data:
                     try:
-                        config_data['volume'] = int(data.get('volume'))
+                        changes['volume'] = min(100, max(0, int(data.get('volume'))))
                     except (ValueError, TypeError):
-                        config_data['volume'] = 70
+                        changes['volume'] = 70
 
-                with open(config_path, 'w', encoding='utf-8') as f:
-                    json.dump(config_data, f, indent=2)
+                previous, updated = CONFIG.update_theme_config(theme_id, **changes)
 
                 print(f"Updated config for '{theme_id}'")
-                self.send_json_response(200, {'status': 'success', 'message': 'Config updated.'})
-
+                invalidate_theme(theme_id)
+                live = push_live_render_settings(theme_id, previous.raw, updated.raw)
+                self.send_json_response(200, {'status': 'success', 'message': 'Config updated.', 'live': live})
+
+            except LookupError:
+                self.send_json_response(404, {'error': 'config.json not found for this theme.'})
+            except ValueError as e:
+                self.send_json_response(400, {'error': str(e)})
             except Exception as e:
                 print(f"Error updating config: {e}")
                 self.send_json_response(500, {'error': str(e)})
             return
 
+        elif self.path == '/preload_theme':
+            try:
+                content_len = int(self.headers.get('Content-Length'))
+                data = json.loads(self.rfile.read(content_len))
+                theme_id = str(data.get('themeId') or '')
+                app_config = CONFIG.app_config()
+                port = app_config.port
+                if not theme_id or theme_id == app_config.active_theme or not is_engine_running(port):
+                    self.send_json_response(200, {'state': 'skipped'})
+                    return
+                self.send_json_response(200, ENGINE_CLIENT.request('preload_theme', {'theme': theme_id}))
+            except Exception as e:
+                print(f"Preload request failed: {e}")
+                self.send_json_response(200, {'state': 'failed', 'error': str(e)})
+            return
+
         elif self.path == '/start_engine':
             try:
-                app_config = read_app_config()
-                port = app_config.get('port', 8080)
+                app_config = CONFIG.app_config()
+                port = app_config.port
                 
                 if is_engine_running(port):
                     print(f"Engine already running on port {port}. Reloading...")
                     try:
-                        with urllib.request.urlopen(f"http://localhost:{port}/reload", timeout=2) as r:
-                            pass
+                        ENGINE_CLIENT.request('activate_theme', {'theme': app_config.active_theme})
+                    except ConnectionError:
+                        try:
+                            with urllib.request.urlopen(f"http://localhost:{port}/reload", timeout=2) as r:
+                                pass
+                        except Exception as e:
+                            print(f"Reload request failed: {e}")
                     except Exception as e:
                         print(f"Reload request failed: {e}")
                     
@@ -885,8 +989,7 @@ class EditorHTTPHandler(http.server.SimpleHTTPRequestHandler):
                     self.send_json_response(400, {'error': "Missing 'themeId' in request body"})
                     return
 
-                app_config = read_app_config()
-                if app_config.get('active_theme') == theme_id:
+                if CONFIG.app_config().active_theme == theme_id:
                     self.send_json_response(400, {'error': 'Cannot delete the active theme.'})
                     return
 
@@ -902,12 +1005,9 @@ class EditorHTTPHandler(http.server.SimpleHTTPRequestHandler):
 
                 try:
                     thumb_filename = None
-                    config_path = os.path.join(theme_path, 'config.json')
-                    
-                    if os.path.exists(config_path):
-                        with open(config_path, 'r', encoding='utf-8') as f:
-                            c = json.load(f)
-                            thumb_filename = c.get('metadata', {}).get('thumbnailImage')
+                    try:
+                        thumb_filename = CONFIG.theme_config(theme_id).metadata.get('thumbnailImage')
+                    except Exception: pass
 
                     if not thumb_filename or not os.path.isfile(os.path.join(theme_path, thumb_filename)):
                         for test_name in ['thumbnail.gif', 'thumbnail.png']:
@@ -954,6 +1054,7 @@ class EditorHTTPHandler(http.server.SimpleHTTPRequestHandler):
                 if not success:
                     raise Exception(f"Failed to delete '{theme_id}' after {max_attempts} attempts. File may be locked. Error: {last_error}")
 
+                invalidate_theme(theme_id)
                 self.send_json_response(200, {'status': 'success', 'message': f"Theme '{theme_id}' deleted."})
 
             except Exception as e:
@@ -1002,6 +1103,7 @@ class ThreadingHTTPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
 def start_editor_server(port):
     Handler = EditorHTTPHandler
     httpd = ThreadingHTTPServer(("", port), Handler)
+    STARTUP.mark('editor_server_listening')
 
     print(f"Editor server (Multi-threaded) started at http://localhost:{port}")
     print(f"Serving files from: {SERVER_ROOT}")
@@ -1073,10 +1175,15 @@ if __name__ == "__main__":
     
     os.environ["QTWEBENGINE_REMOTE_DEBUGGING"] = "9222"
 
-    app = QApplication(sys.argv)
+    with STARTUP.phase('qapplication'):
+        app = QApplication(sys.argv)
     app.setQuitOnLastWindowClosed(True)
 
     def cleanup_old_cache():
+        with STARTUP.phase('cache_cleanup'):
+            _cleanup_old_cache()
+
+    def _cleanup_old_cache():
         try:
             cache_dir = os.path.join(SERVER_ROOT, THUMBNAIL_CACHE_DIR)
             if not os.path.isdir(cache_dir):
@@ -1116,8 +1223,9 @@ if __name__ == "__main__":
         ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID(myappid)
     except: pass
 
-    if not check_single_instance():
-        sys.exit(0)
+    with STARTUP.phase('single_instance'):
+        if not check_single_instance():
+            sys.exit(0)
 
     for html_file in [EDITOR_HTML, DISCOVER_HTML, SETTINGS_HTML]: 
         html_path = os.path.join(SERVER_ROOT, html_file)
@@ -1134,16 +1242,30 @@ if __name__ == "__main__":
             print(f"Could not create wallpapers directory: {e}")
             sys.exit(1)
 
-    startup_config = read_app_config()
-    if startup_config.get('auto_start', True):
+    with STARTUP.phase('file_watcher'):
+        try:
+            FILE_WATCHER = FileWatcher(SERVER_ROOT)
+            FILE_WATCHER.start()
+            CONFIG.watch(FILE_WATCHER)
+            FILE_WATCHER.subscribe(on_watch_events)
+        except Exception as e:
+            print(f"File Watcher: Unavailable, re-scanning themes on every request: {e}")
+            FILE_WATCHER = None
+
+    ENGINE_CLIENT.subscribe(on_engine_event)
+    startup_config = CONFIG.app_config()
+    if startup_config.auto_start:
 
-        engine_port = startup_config.get('port', 8080)
+        engine_port = startup_config.port
         print(f"Auto-start enabled. Checking if Engine is running on port {engine_port}...")
 
-        if not is_engine_running(engine_port):
+        with STARTUP.phase('engine_probe'):
+            engine_running = is_engine_running(engine_port)
+        if not engine_running:
             print("Engine not detected. Launching now...")
             try:
-                start_engine_process()
+                with STARTUP.phase('engine_launch'):
+                    start_engine_process()
             except Exception as e:
                 print(f"Failed to auto-launch engine: {e}")
         else:
@@ -1160,11 +1282,21 @@ if __name__ == "__main__":
         print(f"Error: Could not start server thread: {e}")
         sys.exit(1)
 
-    if not updater_module.run_update_check(CURRENT_APP_VERSION, CURRENT_APP_VERSION_NAME, API_BASE_URL):
+    with STARTUP.phase('update_check'):
+        update_ok = updater_module.run_update_check(CURRENT_APP_VERSION, CURRENT_APP_VERSION_NAME, API_BASE_URL)
+    if not update_ok:
         sys.exit(0) 
 
     print("DevTools (Inspect) available at http://localhost:9222") 
     print(f"Loading editor UI from: {EDITOR_SERVER_URL}")
 
-    window = EditorWindow(EDITOR_SERVER_URL)
+    with STARTUP.phase('editor_window'):
+        window = EditorWindow(EDITOR_SERVER_URL)
+
+    def on_editor_loaded(ok):
+        # The first load is the local "Loading..." page; the editor UI follows it.
+        if ok and window.webEngineView.url().port() == EDITOR_PORT:
+            STARTUP.finish(SERVER_ROOT)
+    window.webEngineView.loadFinished.connect(on_editor_loaded)
+    QTimer.singleShot(60000, lambda: STARTUP.finish(SERVER_ROOT, timed_out=True))
     sys.exit(app.exec())
\ No newline at end of file
@@ -20,6 +20,8 @@ FEATURED_HTML = 'featured.html'
 # Engine Settings
 ENGINE_HTTP_PORT = 60600
 ENGINE_WS_PORT = 60601
+# Seconds the engine waits for the wallpaper to apply live render settings.
+RENDER_SETTINGS_TIMEOUT = 3.0
 
 # App Identity
 APP_USER_MODEL_ID = 'dkydivyansh.librewall'
\ No newline at end of file
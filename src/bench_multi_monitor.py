@@ -0,0 +1,81 @@
+import sys
+import time
+import argparse
+from bench_theme_switch import CONFIG, read_app_config, get, engine_status
+from resource_usage import process_tree_usage
+import api_config
+
+# Cost of covering every screen from one engine (screen_layout "span" or
+# "mirror") against one engine per screen. Only one engine can run at a time
+# (single-instance mutex, fixed port), so "N separate engines" is the
+# measured primary-only engine times the number of screens.
+
+def set_screen_layout(layout):
+    CONFIG.update_app_config(screen_layout=layout)
+
+def restart_into(port, layout, timeout):
+    before = engine_status(port)
+    if before is None:
+        raise RuntimeError(f"no engine answering /engine/status on port {port}")
+    set_screen_layout(layout)
+    get(port, '/restart')
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        status = engine_status(port)
+        if status is not None and status['pid'] != before['pid'] and status['ready']:
+            return status
+        time.sleep(0.1)
+    raise RuntimeError(f"engine not ready in '{layout}' layout after {timeout}s")
+
+def measure(port, layout, settle, interval, timeout):
+    status = restart_into(port, layout, timeout)
+    time.sleep(settle)
+    usage = process_tree_usage(status['pid'], interval)
+    usage['screens'] = len(status.get('screens') or [1])
+    return usage
+
+def fmt(usage):
+    gpu = "n/a" if usage['gpu_percent'] is None else f"{usage['gpu_percent']:.1f}%"
+    vram = "n/a" if usage['vram'] is None else f"{usage['vram'] / 1048576:.0f} MB"
+    return (f"CPU {usage['cpu_percent']:6.1f}%  GPU {gpu:>7}  RSS {usage['rss'] / 1048576:7.0f} MB  "
+            f"VRAM {vram:>8}  processes {usage['processes']}")
+
+def scaled(usage, n):
+    return {
+        "cpu_percent": usage['cpu_percent'] * n,
+        "gpu_percent": None if usage['gpu_percent'] is None else usage['gpu_percent'] * n,
+        "rss": usage['rss'] * n, "vram": None if usage['vram'] is None else usage['vram'] * n,
+        "processes": usage['processes'] * n
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare one shared multi-screen engine with one engine per screen.")
+    parser.add_argument('--layout', choices=('span', 'mirror'), default='mirror')
+    parser.add_argument('--settle', type=float, default=10.0, help="seconds to let the wallpaper warm up before sampling")
+    parser.add_argument('--interval', type=float, default=10.0, help="sampling window in seconds")
+    parser.add_argument('--port', type=int, default=None, help="engine HTTP port (default: app_config.json)")
+    parser.add_argument('--timeout', type=float, default=60.0)
+    args = parser.parse_args()
+
+    original = read_app_config()
+    port = args.port or original.get('port', api_config.ENGINE_HTTP_PORT)
+    try:
+        single = measure(port, 'primary', args.settle, args.interval, args.timeout)
+        shared = measure(port, args.layout, args.settle, args.interval, args.timeout)
+    except Exception as e:
+        print(f"Benchmark failed: {e}")
+        sys.exit(1)
+    finally:
+        set_screen_layout(original.get('screen_layout', 'primary'))
+        try: get(port, '/restart')
+        except Exception: pass
+
+    n = shared['screens']
+    print(f"one screen, one engine : {fmt(single)}")
+    print(f"{n} separate engines     : {fmt(scaled(single, n))}  (estimated)")
+    print(f"{n} screens, {args.layout:<6} engine: {fmt(shared)}")
+    if n < 2:
+        print("Only one screen connected; the shared layout falls back to 'primary'.")
+
+if __name__ == "__main__":
+    main()
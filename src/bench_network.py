@@ -0,0 +1,215 @@
+import sys
+import time
+import random
+import asyncio
+import tempfile
+import argparse
+import tracemalloc
+import collections
+import network_monitor
+
+# Shapes of psutil's net_connections() / net_io_counters() results.
+Addr = collections.namedtuple('Addr', 'ip port')
+SConn = collections.namedtuple('SConn', 'fd family type laddr raddr status pid')
+NetIO = collections.namedtuple('NetIO', 'bytes_sent bytes_recv')
+
+class SocketType:
+    name = 'SOCK_STREAM'
+
+SOCK_STREAM = SocketType()
+
+PORT_PROFILES = {
+    # Mostly web traffic with a long tail, like a desktop with a browser open.
+    'web': [(443, 70), (80, 10), (53, 3), (993, 2), (22, 1), (3478, 2), (None, 12)],
+    # Every remote port equally likely; defeats the protocol map.
+    'uniform': [(None, 1)],
+    # Chatty services on a handful of ports, e.g. a dev box running databases.
+    'services': [(5432, 25), (6379, 25), (27017, 15), (8080, 15), (443, 10), (None, 10)]
+}
+
+PROCESS_NAMES = ['chrome.exe', 'firefox.exe', 'svchost.exe', 'Discord.exe', 'Code.exe', 'steam.exe',
+                 'spotify.exe', 'python.exe', 'node.exe', 'postgres.exe', 'OneDrive.exe', 'Teams.exe']
+
+class FakeConnectionSource:
+    """Synthetic stand-in for PsutilSource.
+
+    count: sockets in the table, churn: fraction replaced per advance(),
+    processes: live PID count, pid_reuse: chance an exiting PID is handed
+    straight to a new process under a different name, listen_ratio and
+    syn_ratio: share of LISTEN and SYN_SENT sockets, ports: a PORT_PROFILES key.
+    """
+
+    def __init__(self, count, churn=0.05, processes=150, pid_reuse=0.3, listen_ratio=0.02,
+                 syn_ratio=0.01, ports='web', seed=1):
+        self.random = random.Random(seed)
+        self.churn = churn
+        self.pid_reuse = pid_reuse
+        self.listen_ratio = listen_ratio
+        self.syn_ratio = syn_ratio
+        self.port_choices, self.port_weights = zip(*PORT_PROFILES[ports])
+        self.names = {}
+        self.starts = {}
+        self.spawned = 0
+        self.next_pid = 1000
+        self.free_pids = []
+        for _ in range(processes):
+            self._spawn_process()
+        self.pids = list(self.names)
+        self.next_fd = 3
+        self.sent = self.recv = 0
+        self.connections = [self._make_connection() for _ in range(count)]
+
+    def _spawn_process(self):
+        if self.free_pids and self.random.random() < self.pid_reuse:
+            pid = self.free_pids.pop()
+        else:
+            pid = self.next_pid
+            self.next_pid += 4
+        self.names[pid] = self.random.choice(PROCESS_NAMES)
+        self.spawned += 1
+        self.starts[pid] = float(self.spawned)
+        return pid
+
+    def _remote_port(self):
+        port = self.random.choices(self.port_choices, self.port_weights)[0]
+        return port if port is not None else self.random.randint(1024, 65535)
+
+    def _make_connection(self, pid=None):
+        pid = self.random.choice(self.pids) if pid is None else pid
+        self.next_fd += 1
+        roll = self.random.random()
+        if roll < self.listen_ratio:
+            return SConn(self.next_fd, 2, SOCK_STREAM, Addr('0.0.0.0', self.random.randint(1024, 65535)), (), 'LISTEN', pid)
+        laddr = Addr('192.168.1.20', self.random.randint(49152, 65535))
+        raddr = Addr(f"{self.random.randint(1, 223)}.{self.random.randint(0, 255)}.{self.random.randint(0, 255)}.{self.random.randint(1, 254)}",
+                     self._remote_port())
+        status = 'SYN_SENT' if roll < self.listen_ratio + self.syn_ratio else 'ESTABLISHED'
+        return SConn(self.next_fd, 2, SOCK_STREAM, laddr, raddr, status, pid)
+
+    def advance(self):
+        """Replace churn * count sockets, occasionally restarting a process."""
+        replaced = int(len(self.connections) * self.churn)
+        for _ in range(replaced):
+            self.connections[self.random.randrange(len(self.connections))] = self._make_connection()
+        if replaced and self.random.random() < 0.2:
+            index = self.random.randrange(len(self.pids))
+            old_pid = self.pids[index]
+            del self.names[old_pid]
+            self.free_pids.append(old_pid)
+            new_pid = self._spawn_process()
+            self.pids[index] = new_pid
+            # Sockets don't outlive their process; the new one opens its own.
+            self.connections = [self._make_connection(new_pid) if c.pid == old_pid else c for c in self.connections]
+        self.sent += self.random.randint(0, 5000000)
+        self.recv += self.random.randint(0, 50000000)
+
+    def net_connections(self):
+        return list(self.connections)
+
+    def net_io_counters(self):
+        return NetIO(self.sent, self.recv)
+
+    def process_name(self, pid):
+        return self.names.get(pid, "Access Denied")
+
+    def process_start(self, pid):
+        return self.starts.get(pid)
+
+class NullClient:
+    def __init__(self):
+        self.bytes = 0
+
+    async def send(self, data):
+        self.bytes += len(data)
+
+def push_once(clients):
+    """One push_tick + ws_broadcast round against in-process clients."""
+    async def push():
+        data_json = network_monitor.build_push_payload('engine.exe')
+        await asyncio.gather(*[client.send(data_json) for client in clients], return_exceptions=True)
+        return data_json
+    return asyncio.run(push())
+
+def measure(step, ticks, source, trace):
+    cpu, allocated, peaks = [], [], []
+    result = None
+    for _ in range(ticks):
+        source.advance()
+        if trace:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        start = time.process_time()
+        result = step()
+        cpu.append(time.process_time() - start)
+        if trace:
+            current, peak = tracemalloc.get_traced_memory()
+            allocated.append(current - before)
+            peaks.append(peak - before)
+    return cpu, allocated, peaks, result
+
+def summarize(label, cpu, allocated, peaks):
+    cpu_ms = sorted(c * 1000 for c in cpu)
+    line = f"   {label:<16} cpu/tick avg {sum(cpu_ms) / len(cpu_ms):8.3f} ms  p95 {cpu_ms[int(len(cpu_ms) * 0.95) - 1]:8.3f} ms"
+    if allocated:
+        line += f"  | retained/tick {sum(allocated) / len(allocated) / 1024:8.1f} KiB  peak/tick {max(peaks) / 1024:8.1f} KiB"
+    print(line)
+
+def run_size(count, args, root_dir):
+    source = FakeConnectionSource(count, churn=args.churn, processes=args.processes, pid_reuse=args.pid_reuse,
+                                  listen_ratio=args.listen_ratio, syn_ratio=args.syn_ratio, ports=args.ports, seed=args.seed)
+    network_monitor.SOURCE = source
+    network_monitor.init_monitor(root_dir, 'engine.exe', {'traffic_log': {'flush_seconds': 3600}})
+    clients = [NullClient() for _ in range(args.clients)]
+
+    start = time.process_time()
+    network_monitor.traffic_tick()
+    cold = (time.process_time() - start) * 1000
+    print(f"\n {count} connections ({args.ports} ports, churn {args.churn:.0%}, {args.clients} clients)")
+    print(f"   cold table fill  {cold:8.3f} ms")
+
+    for trace in ((False, True) if args.trace else (False,)):
+        if trace:
+            tracemalloc.start()
+            print("   -- tracemalloc on (timings inflated) --")
+        for label, step in (('stats_tick', network_monitor.stats_tick),
+                            ('traffic_tick', network_monitor.traffic_tick),
+                            ('get_network_data', lambda: network_monitor.get_network_data('engine.exe')),
+                            ('ws push', lambda: push_once(clients))):
+            cpu, allocated, peaks, result = measure(step, args.ticks, source, trace)
+            summarize(label, cpu, allocated, peaks)
+        if trace:
+            tracemalloc.stop()
+
+    payload = network_monitor.build_push_payload('engine.exe').encode('utf-8')
+    data = network_monitor.get_network_data('engine.exe')
+    print(f"   payload          {len(payload) / 1024:8.1f} KiB  ({data['active_count']} active, {data['listening_count']} listening, "
+          f"{len(data['live_traffic_log'])} log entries)")
+    # Sync the table with the source's current sockets before checking names.
+    network_monitor.traffic_tick()
+    table = network_monitor.CONNECTION_TABLE
+    stale = sum(1 for row in table.rows.values() if row.process != source.names.get(row.pid, "Access Denied"))
+    print(f"   table rows       {len(table)}  process names cached {len(table.process_names)}  wrong names {stale}")
+    network_monitor.shutdown_monitor()
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic-load benchmark for the network monitor pipeline.")
+    parser.add_argument('--sizes', default='1000,5000,20000', help="comma separated connection counts")
+    parser.add_argument('--ticks', type=int, default=50)
+    parser.add_argument('--churn', type=float, default=0.05, help="fraction of sockets replaced per tick")
+    parser.add_argument('--processes', type=int, default=150)
+    parser.add_argument('--pid-reuse', type=float, default=0.3)
+    parser.add_argument('--listen-ratio', type=float, default=0.02)
+    parser.add_argument('--syn-ratio', type=float, default=0.01)
+    parser.add_argument('--ports', choices=sorted(PORT_PROFILES), default='web')
+    parser.add_argument('--clients', type=int, default=2, help="websocket clients to push to")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--no-trace', dest='trace', action='store_false', help="skip the tracemalloc pass")
+    args = parser.parse_args()
+
+    print(f" Network monitor benchmark: {args.ticks} ticks per size, Python {sys.version.split()[0]}")
+    for count in (int(s) for s in args.sizes.split(',') if s.strip()):
+        with tempfile.TemporaryDirectory() as root_dir:
+            run_size(count, args, root_dir)
+
+if __name__ == "__main__":
+    main()
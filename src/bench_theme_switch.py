@@ -0,0 +1,100 @@
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import urllib.request
+import api_config
+from config_service import ConfigService
+
+# Compares theme switch latency of a running engine: "restart" is the old
+# /reload behaviour (quit, sleep, re-exec; now /restart), "hot" is the
+# in-process switch behind /reload. Latency runs from the request until
+# /engine/status reports the new theme's surface ready.
+
+if getattr(sys, 'frozen', False):
+    SCRIPT_DIR = os.path.dirname(sys.executable)
+else:
+    SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_CONFIG_PATH = os.path.join(SCRIPT_DIR, api_config.APP_CONFIG_FILE)
+CONFIG = ConfigService(SCRIPT_DIR)
+
+def read_app_config():
+    with open(APP_CONFIG_PATH, 'r') as f:
+        return json.load(f)
+
+def set_active_theme(theme):
+    CONFIG.update_app_config(active_theme=theme)
+
+def get(port, path, timeout=1.0):
+    with urllib.request.urlopen(f"http://localhost:{port}{path}", timeout=timeout) as r:
+        return r.read()
+
+def engine_status(port):
+    try: return json.loads(get(port, '/engine/status'))
+    except Exception: return None
+
+def switch(port, theme, mode, timeout):
+    """Switch to theme and wait until it is on screen. Returns milliseconds."""
+    before = engine_status(port)
+    if before is None:
+        raise RuntimeError(f"no engine answering /engine/status on port {port}")
+    set_active_theme(theme)
+    started = time.perf_counter()
+    get(port, '/restart' if mode == 'restart' else '/reload')
+    while time.perf_counter() - started < timeout:
+        status = engine_status(port)
+        if status is not None and status['theme'] == theme and status['ready']:
+            if mode == 'restart' and status['pid'] != before['pid']:
+                return (time.perf_counter() - started) * 1000
+            if mode == 'hot' and status['generation'] > before['generation']:
+                return (time.perf_counter() - started) * 1000
+        time.sleep(0.02)
+    raise RuntimeError(f"{mode} switch to '{theme}' not ready after {timeout}s")
+
+def summarize(mode, samples):
+    if not samples:
+        print(f"{mode:>8}  no successful switches")
+        return
+    print(f"{mode:>8}  n={len(samples):<3} median {statistics.median(samples):8.0f} ms  "
+          f"mean {statistics.mean(samples):8.0f} ms  min {min(samples):8.0f} ms  max {max(samples):8.0f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure theme switch latency of the running engine.")
+    parser.add_argument('--themes', required=True, help="comma separated theme ids to cycle through, e.g. a web and a video theme")
+    parser.add_argument('--rounds', type=int, default=5, help="switches per mode")
+    parser.add_argument('--mode', choices=('hot', 'restart', 'both'), default='both')
+    parser.add_argument('--port', type=int, default=None, help="engine HTTP port (default: app_config.json)")
+    parser.add_argument('--timeout', type=float, default=30.0, help="seconds to wait for each switch")
+    args = parser.parse_args()
+
+    themes = [t.strip() for t in args.themes.split(',') if t.strip()]
+    original = read_app_config()
+    port = args.port or original.get('port', api_config.ENGINE_HTTP_PORT)
+    modes = ('restart', 'hot') if args.mode == 'both' else (args.mode,)
+    results = {}
+    try:
+        for mode in modes:
+            samples = results.setdefault(mode, [])
+            for i in range(args.rounds):
+                theme = themes[i % len(themes)]
+                try:
+                    elapsed = switch(port, theme, mode, args.timeout)
+                except Exception as e:
+                    print(f"{mode} #{i + 1} -> {theme}: {e}")
+                    continue
+                samples.append(elapsed)
+                print(f"{mode} #{i + 1} -> {theme}: {elapsed:.0f} ms")
+                time.sleep(0.5)
+    finally:
+        if original.get('active_theme') is not None:
+            set_active_theme(original['active_theme'])
+            try: get(port, '/reload')
+            except Exception: pass
+    print()
+    for mode in modes:
+        summarize(mode, results.get(mode, []))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+from render_profiles import PROFILE_ORDER, RENDER_PROFILES
+
+# Decode/present cost of each mpv render profile. Runs mpv headless (no Qt
+# window) with software decoding by default, so it works on a CI runner:
+#   python bench_video_profiles.py --vo null            decode side only
+#   xvfb-run python bench_video_profiles.py --vo gpu    adds the render passes
+#                                                       (software GL under Mesa)
+# CPU is this process's CPU time (mpv runs in-process), "speed" is media
+# seconds played per wall second, render ms is the sum of vo-passes' average
+# pass times per frame (vo=gpu only). With --untimed mpv decodes as fast as it
+# can and speed is the throughput ceiling.
+
+SYNTHETIC = "testsrc2=size=1920x1080:rate=60"
+
+def make_clip(seconds):
+    """An H.264 clip to decode (rawvideo from lavfi would skip the decoder options)."""
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg is None:
+        print(f"ffmpeg not found; playing av://lavfi:{SYNTHETIC} (no real decoding)")
+        return f"av://lavfi:{SYNTHETIC}", None
+    path = os.path.join(tempfile.mkdtemp(prefix='librewall-bench-'), 'clip.mp4')
+    subprocess.run([ffmpeg, '-v', 'error', '-f', 'lavfi', '-i', f"{SYNTHETIC}:duration={seconds}",
+                    '-c:v', 'libx264', '-preset', 'veryfast', '-pix_fmt', 'yuv420p', path], check=True)
+    return path, path
+
+def render_ms(player):
+    try:
+        passes = player['vo-passes']
+    except Exception:
+        return None
+    if not passes: return None
+    return sum(p.get('avg', 0) for p in passes.get('fresh', [])) / 1e6
+
+def measure(mpv, media, profile, args):
+    options = {'vo': args.vo, 'hwdec': args.hwdec, 'loop-file': 'inf', 'audio': 'no', 'keep-open': 'yes'}
+    if args.untimed: options['untimed'] = 'yes'
+    for item in args.mpv:
+        key, _, value = item.partition('=')
+        options[key] = value
+    player = mpv.MPV(loglevel='error')
+    for key, value in options.items():
+        player[key] = value
+    for key, value in RENDER_PROFILES[profile].items():
+        try: player[key] = value
+        except Exception as e: print(f"    {key}={value} not supported: {e}")
+    try:
+        player.play(media)
+        player.wait_until_playing(timeout=10)
+        time.sleep(args.warmup)
+
+        def position():
+            try: return player['time-pos'] or 0.0
+            except Exception: return 0.0
+        drops0 = (player['frame-drop-count'] or 0) + (player['decoder-frame-drop-count'] or 0)
+        cpu0, wall0, last, played = time.process_time(), time.perf_counter(), position(), 0.0
+        while time.perf_counter() - wall0 < args.seconds:
+            time.sleep(0.05)
+            now = position()
+            # A loop restarts time-pos; count only forward steps.
+            played += now - last if now >= last else now
+            last = now
+        wall = time.perf_counter() - wall0
+        cpu = time.process_time() - cpu0
+        fps = player['container-fps'] or 60.0
+        drops = (player['frame-drop-count'] or 0) + (player['decoder-frame-drop-count'] or 0) - drops0
+        frames = max(1.0, played * fps)
+        return {
+            "cpu_percent": cpu / wall * 100, "cpu_ms_per_frame": cpu * 1000 / frames,
+            "speed": played / wall, "dropped": drops, "render_ms": render_ms(player)
+        }
+    finally:
+        player.terminate()
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the decode and present cost of the mpv render profiles.")
+    parser.add_argument('--media', default=None, help="video to play (default: a generated 1080p60 H.264 clip)")
+    parser.add_argument('--profiles', nargs='+', choices=PROFILE_ORDER, default=list(reversed(PROFILE_ORDER)))
+    parser.add_argument('--seconds', type=float, default=10.0, help="sampling window per profile")
+    parser.add_argument('--warmup', type=float, default=2.0)
+    parser.add_argument('--vo', default='null', help="mpv video output: null (decode only) or gpu")
+    parser.add_argument('--hwdec', default='no', help="'no' for software decoding, 'auto' for the GPU decoder")
+    parser.add_argument('--untimed', action='store_true', help="decode and present as fast as possible")
+    parser.add_argument('--mpv', nargs='*', default=[], metavar='KEY=VALUE', help="extra mpv options, e.g. gpu-api=opengl")
+    args = parser.parse_args()
+
+    try:
+        import mpv
+    except (ImportError, OSError) as e:
+        print(f"python-mpv / libmpv not available: {e}")
+        sys.exit(1)
+    media, cleanup = (args.media, None) if args.media else make_clip(max(5, int(args.seconds)))
+    results = {}
+    try:
+        for profile in args.profiles:
+            try:
+                results[profile] = measure(mpv, media, profile, args)
+            except Exception as e:
+                print(f"{profile:<11} ERROR {e}")
+    finally:
+        if cleanup: shutil.rmtree(os.path.dirname(cleanup), ignore_errors=True)
+
+    print(f"vo={args.vo} hwdec={args.hwdec}{' untimed' if args.untimed else ''}, {args.seconds:.0f} s per profile")
+    print(f"{'profile':<11} {'CPU':>7} {'CPU/frame':>10} {'speed':>7} {'dropped':>8} {'render/frame':>13}")
+    baseline = results.get('ultra')
+    for profile, r in results.items():
+        render = "n/a" if r['render_ms'] is None else f"{r['render_ms']:.2f} ms"
+        relative = f"  ({r['cpu_ms_per_frame'] / baseline['cpu_ms_per_frame'] * 100:.0f}% of ultra)" if baseline and profile != 'ultra' else ""
+        print(f"{profile:<11} {r['cpu_percent']:6.1f}% {r['cpu_ms_per_frame']:7.2f} ms {r['speed']:6.2f}x {r['dropped']:8d} {render:>13}{relative}")
+    sys.exit(0 if len(results) == len(args.profiles) else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import os
+import re
+import sys
+import argparse
+import subprocess
+
+# Import-time regression check for the engine. Imports main.py once per render
+# mode under `python -X importtime` (LIBREWALL_ENGINE_MODE picks the mode
+# instead of the active theme) and fails if a mode pulls in modules it does
+# not use or its imports take longer than the budget. Budgets are warm-cache
+# ceilings on the reference machine; the fastest of --runs is compared.
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+WEB_MODULES = ('PyQt6.QtWebEngineWidgets', 'PyQt6.QtWebEngineCore', 'frontend.engine_assets')
+WIDGET_MODULES = ('network_monitor', 'port_map', 'psutil')
+
+# name: (engine mode, extra imports, forbidden, required, budget ms)
+MODES = {
+    'video': ('video', (), WEB_MODULES + WIDGET_MODULES, (), 350),
+    'web': ('web', (), WIDGET_MODULES, ('PyQt6.QtWebEngineWidgets',), 700),
+    'app': ('app', (), WIDGET_MODULES, ('PyQt6.QtWebEngineWidgets',), 700),
+    # What a Global Widgets theme adds once start_global_widgets() runs.
+    'web+widgets': ('web', ('network_monitor', 'psutil'), (), ('PyQt6.QtWebEngineWidgets', 'port_map'), 800),
+}
+
+LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+def parse_importtime(stderr):
+    """[(module, self_us, cumulative_us, depth)] in the order Python reports them."""
+    rows = []
+    for line in stderr.splitlines():
+        m = LINE.match(line)
+        if m:
+            rows.append((m.group(4), int(m.group(1)), int(m.group(2)), len(m.group(3)) // 2))
+    return rows
+
+def measure(name):
+    mode, extra, _, _, _ = MODES[name]
+    targets = ('main',) + extra
+    env = dict(os.environ, LIBREWALL_ENGINE_MODE=mode)
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + ', '.join(targets)],
+                          cwd=ROOT, env=env, capture_output=True, text=True)
+    rows = parse_importtime(proc.stderr)
+    if proc.returncode != 0:
+        tail = proc.stderr.strip().splitlines()[-1:] or ['no output']
+        raise RuntimeError(f"import failed in '{name}' mode: {tail[0]}")
+    total_us = sum(cumulative for module, _, cumulative, depth in rows if depth == 0 and module in targets)
+    return total_us / 1000, {row[0] for row in rows}, rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the engine's per-mode import set and import time.")
+    parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES))
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--slack', type=float, default=1.0, help="multiply every budget by this factor")
+    parser.add_argument('--top', type=int, default=8, help="slowest modules to list per mode")
+    args = parser.parse_args()
+
+    failed = False
+    for name in args.modes:
+        _, _, forbidden, required, budget = MODES[name]
+        budget *= args.slack
+        try:
+            runs = [measure(name) for _ in range(max(1, args.runs))]
+        except Exception as e:
+            print(f"{name:<12} ERROR {e}")
+            failed = True
+            continue
+        total_ms, modules, rows = min(runs, key=lambda run: run[0])
+        problems = [f"imports {m}" for m in forbidden if m in modules]
+        problems += [f"does not import {m}" for m in required if m not in modules]
+        if total_ms > budget:
+            problems.append(f"{total_ms:.0f} ms over the {budget:.0f} ms budget")
+        failed = failed or bool(problems)
+        print(f"{name:<12} {'FAIL' if problems else 'ok':<4} {total_ms:7.1f} ms (budget {budget:.0f} ms, {len(modules)} modules)")
+        for problem in problems:
+            print(f"    - {problem}")
+        for module, self_us, _, _ in sorted(rows, key=lambda row: row[1], reverse=True)[:args.top]:
+            print(f"      {self_us / 1000:7.1f} ms  {module}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,480 @@
+import os
+import sys
+import json
+import time
+import threading
+import hashlib
+import dataclasses
+from dataclasses import dataclass, field
+import api_config
+from playback_policy import QUALITY_ORDER
+from screen_layout import LAYOUTS
+from memory_budget import DEFAULT_BUDGET_MB as DEFAULT_MEMORY_BUDGET_MB
+from render_profiles import PROFILE_ORDER, PROFILE_FOR_QUALITY
+from file_watcher import RESCAN, CONFIG_CHANGED, THEME_ADDED, THEME_CHANGED, THEME_REMOVED
+
+DEFAULT_THEME = 'default'
+THEME_CACHE_FILE = 'theme_cache.json'
+LOCK_FILE = '.config.lock'
+COMPILER_VERSION = 1
+_UNTYPED = ('theme_id', 'content_hash', 'assets', 'payload', 'raw', 'errors')
+
+def _setting(default, key=None, kind=None, nullable=False, choices=None, low=None, high=None):
+    """Dataclass field for one JSON key; key defaults to the attribute name."""
+    metadata = {"key": key, "kind": kind, "nullable": nullable, "choices": choices, "low": low, "high": high}
+    if isinstance(default, (dict, list)):
+        return field(default_factory=lambda: type(default)(default), metadata=metadata)
+    return field(default=default, metadata=metadata)
+
+def _key(f):
+    return f.metadata.get("key") or f.name
+
+def _check(f, value):
+    """value coerced to f's type, or ValueError."""
+    m = f.metadata
+    if value is None:
+        if m.get("nullable"): return None
+        raise ValueError(f"'{_key(f)}' may not be null")
+    kind = m.get("kind") or f.type
+    if kind is bool:
+        if not isinstance(value, bool): raise ValueError(f"'{_key(f)}' must be true or false")
+    elif kind in (int, float):
+        if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+            raise ValueError(f"'{_key(f)}' must be a number")
+        try: value = kind(value)
+        except ValueError: raise ValueError(f"'{_key(f)}' must be a number")
+        if m.get("low") is not None and value < m["low"]: raise ValueError(f"'{_key(f)}' must be >= {m['low']}")
+        if m.get("high") is not None and value > m["high"]: raise ValueError(f"'{_key(f)}' must be <= {m['high']}")
+    elif not isinstance(value, kind):
+        raise ValueError(f"'{_key(f)}' must be a {kind.__name__}")
+    if m.get("choices") and value not in m["choices"]:
+        raise ValueError(f"'{_key(f)}' must be one of {', '.join(m['choices'])}")
+    return value
+
+def _build(cls, data, source):
+    """cls from a JSON object: known keys validated (bad values fall back to the
+    default and are listed in .errors), everything else kept in .raw."""
+    data = data if isinstance(data, dict) else {}
+    values, errors = {}, []
+    for f in dataclasses.fields(cls):
+        if f.name in _UNTYPED or _key(f) not in data: continue
+        try:
+            values[f.name] = _check(f, data[_key(f)])
+        except (ValueError, TypeError) as e:
+            errors.append(str(e))
+    if errors:
+        print(f"Config: {source}: {'; '.join(errors)}; using defaults for those keys")
+    return cls(raw=dict(data), errors=tuple(errors), **values)
+
+def _merge(config, changes):
+    """config's raw dict with changes (attribute names) validated and applied; None removes a nullable key."""
+    by_name = {f.name: f for f in dataclasses.fields(config) if f.name not in _UNTYPED}
+    data = dict(config.raw)
+    for name, value in changes.items():
+        if name not in by_name:
+            raise ValueError(f"unknown setting '{name}'")
+        value = _check(by_name[name], value)
+        if value is None: data.pop(_key(by_name[name]), None)
+        else: data[_key(by_name[name])] = value
+    return data
+
+class ConfigConflict(Exception):
+    """A compare-and-swap update found app_config.json at another version."""
+
+class FileLock:
+    """Exclusive advisory lock on a file, shared by every process using it
+    (fcntl.flock on POSIX, msvcrt.locking on Windows). Writers take it;
+    readers never block because write_json() swaps files atomically."""
+
+    def __init__(self, path, timeout=10.0):
+        self.path = path
+        self.timeout = timeout
+        self.f = None
+
+    def _lock(self, unlock=False):
+        if sys.platform == 'win32':
+            import msvcrt
+            self.f.seek(0)
+            msvcrt.locking(self.f.fileno(), msvcrt.LK_UNLCK if unlock else msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(self.f.fileno(), fcntl.LOCK_UN if unlock else fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    def __enter__(self):
+        self.f = open(self.path, 'a+b')
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                self._lock()
+                return self
+            except OSError:
+                if time.monotonic() > deadline:
+                    self.f.close()
+                    raise TimeoutError(f"could not lock {os.path.basename(self.path)} within {self.timeout}s")
+                time.sleep(0.005)
+
+    def __exit__(self, *exc):
+        try: self._lock(unlock=True)
+        finally: self.f.close()
+
+def write_json(path, data):
+    """Replace path with data: temp file, fsync, rename. Readers see the old
+    file or the new one, never a truncated one."""
+    tmp = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    for attempt in range(100):
+        try:
+            os.replace(tmp, path)
+            return
+        except PermissionError:
+            # Windows refuses while a reader has the target open; that is brief.
+            if attempt == 99:
+                os.remove(tmp)
+                raise
+            time.sleep(0.01)
+
+def strip_annotations(value):
+    """value without "//..." comment keys, at any depth."""
+    if isinstance(value, dict):
+        return {k: strip_annotations(v) for k, v in value.items() if not (isinstance(k, str) and k.startswith('//'))}
+    if isinstance(value, list):
+        return [strip_annotations(v) for v in value]
+    return value
+
+@dataclass(frozen=True, slots=True)
+class AppConfig:
+    """app_config.json. Keys no attribute covers (widget positions and the
+    like) are carried in raw so a write does not drop them. version counts
+    the writes made through ConfigService and is the compare-and-swap token."""
+    version: int = _setting(0, key='config_version', low=0)
+    active_theme: str = _setting(DEFAULT_THEME)
+    port: int = _setting(api_config.ENGINE_HTTP_PORT, low=1, high=65535)
+    ws_port: int = _setting(None, kind=int, nullable=True, low=0, high=65535)
+    auto_start: bool = _setting(True)
+    hide_icons: bool = _setting(False)
+    tour: bool = _setting(None, kind=bool, nullable=True)
+    desktop_monitor: str = _setting('auto', choices=('auto', 'poll'))
+    playback_rules: list = _setting(None, kind=list, nullable=True)
+    battery_saver: bool = _setting(False)
+    deep_suspend: dict = _setting({})
+    preload: dict = _setting({})
+    memory_budget_mb: int = _setting(DEFAULT_MEMORY_BUDGET_MB, low=64)
+    screen_layout: str = _setting('primary', choices=LAYOUTS)
+    traffic_log: dict = _setting(None, kind=dict, nullable=True)
+    reverse_dns: dict = _setting(None, kind=dict, nullable=True)
+    raw: dict = field(default_factory=dict, compare=False, repr=False)
+    errors: tuple = ()
+
+    def to_dict(self):
+        """raw merged with the defaults; what the Launcher UI gets."""
+        data = dict(self.raw)
+        for f in dataclasses.fields(self):
+            if f.name in _UNTYPED: continue
+            value = getattr(self, f.name)
+            if value is not None: data[_key(f)] = value
+        return data
+
+@dataclass(frozen=True, slots=True)
+class ThemeConfig:
+    """A theme's config.json, compiled: "//" annotation keys are stripped
+    (raw), the keys Python reads are typed, asset paths are resolved and the
+    page's /config response is pre-serialised (payload)."""
+    theme_id: str = ''
+    content_hash: str = ''
+    assets: dict = field(default_factory=dict, compare=False)
+    payload: bytes = field(default=b'', compare=False, repr=False)
+    video_render: bool = _setting(False, key='videorender')
+    media: str = _setting(None, kind=str, nullable=True)
+    html_render: bool = _setting(False, key='htmlrender')
+    html_widget_file: str = _setting('index.html', key='htmlWidgetFile')
+    fps_limit: int = _setting(60, key='fpsLimit', low=0)
+    mute_audio: bool = _setting(True, key='muteAudio')
+    volume: int = _setting(70, low=0, high=100)
+    quality_preset: str = _setting('high', key='qualityPreset', choices=QUALITY_ORDER)
+    video_profile: str = _setting(None, key='videoProfile', kind=str, nullable=True, choices=PROFILE_ORDER)
+    enable_global_widget: bool = _setting(False, key='Enable_Global_Widget')
+    enable_network_widget: bool = _setting(False, key='Enable_Network_Widget', nullable=True)
+    enable_3d_model: bool = _setting(True, key='enable3DModel')
+    model_file: str = _setting(None, key='modelFile', kind=str, nullable=True)
+    enable_environment_hdr: bool = _setting(True, key='enableEnvironmentHDR')
+    background_media: str = _setting(None, key='backgroundMedia', kind=str, nullable=True)
+    css_file: str = _setting(None, key='cssFile', kind=str, nullable=True)
+    logic_file: str = _setting(None, key='logicFile', kind=str, nullable=True)
+    metadata: dict = _setting({})
+    raw: dict = field(default_factory=dict, compare=False, repr=False)
+    errors: tuple = ()
+
+    @property
+    def render_mode(self):
+        """'video' (mpv), 'app' (HTML app in the work area) or 'web' (3D scene page)."""
+        if self.video_render and self.media:
+            return 'video'
+        return 'app' if self.html_render else 'web'
+
+    @property
+    def render_profile(self):
+        """mpv render profile for video mode; videoProfile, else from qualityPreset."""
+        return self.video_profile or PROFILE_FOR_QUALITY[self.quality_preset]
+
+    @property
+    def wants_global_widgets(self):
+        return not self.html_render and (self.enable_global_widget or self.enable_network_widget)
+
+    @property
+    def quality_rank(self):
+        return QUALITY_ORDER.index(self.quality_preset)
+
+def _resolve_assets(config, theme_path, root_dir):
+    """Absolute paths of the files the theme's first load fetches, by role.
+    Existence is not checked; that changes without the config changing."""
+    names = {"media": config.media} if config.render_mode == 'video' else {
+        "model": config.model_file if config.enable_3d_model else None,
+        "background": config.background_media, "css": config.css_file,
+        # The 3D page injects htmlWidgetFile only when the key is set.
+        "html": config.html_widget_file if config.html_render else config.raw.get('htmlWidgetFile'),
+        "logic": config.logic_file}
+    assets = {}
+    for role, name in names.items():
+        if isinstance(name, str) and name and '://' not in name:
+            assets[role] = os.path.normcase(os.path.abspath(os.path.join(theme_path, name.lstrip('/'))))
+    if config.render_mode == 'web' and config.enable_3d_model and config.enable_environment_hdr:
+        assets["hdr"] = os.path.normcase(os.path.abspath(os.path.join(root_dir, 'hdr', 'default_environment.hdr')))
+    return assets
+
+class ConfigService:
+    """Shared loader for app_config.json and theme config.json files.
+
+    Parsed configs are cached per file and re-read only when the file's
+    mtime, size or inode changes, so callers can ask on every request. Theme
+    configs are also kept compiled (annotation keys stripped) in
+    theme_cache.json by content hash, so a cold start with unchanged themes
+    skips reading and parsing them. The
+    returned objects are frozen; change settings through update_app_config()
+    and update_theme_config(). Subscribers are called with (path, config)
+    whenever a cached file is found to have changed, by a read, poll() or
+    one of our own writes. After watch(), cached files are trusted until a
+    FileWatcher event says otherwise, so reads no longer stat().
+    """
+
+    def __init__(self, root_dir):
+        self.root_dir = root_dir
+        self.theme_cache_path = os.path.join(root_dir, THEME_CACHE_FILE)
+        self.theme_cache = None
+        self.app_config_path = os.path.join(root_dir, api_config.APP_CONFIG_FILE)
+        self.wallpapers_dir = os.path.join(root_dir, api_config.WALLPAPERS_DIR)
+        self.lock = threading.RLock()
+        self.lock_path = os.path.join(root_dir, LOCK_FILE)
+        self.cache = {}
+        self.subscribers = []
+        self.watched = False
+        self.dirty = set()
+
+    def subscribe(self, callback):
+        with self.lock:
+            self.subscribers.append(callback)
+
+    def _stamp(self, path):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _load(self, path, build, force=False):
+        with self.lock:
+            cached = self.cache.get(path)
+            if self.watched and cached is not None and path not in self.dirty and not force:
+                return cached[1]
+            self.dirty.discard(path)
+        stamp = self._stamp(path)
+        if cached is not None and cached[0] == stamp and not force:
+            return cached[1]
+        try:
+            config = build(path, stamp)
+        except Exception:
+            with self.lock: self.dirty.add(path)
+            raise
+        with self.lock:
+            self.cache[path] = (stamp, config, build)
+        if cached is not None and cached[0] != stamp:
+            self._notify(path, config)
+        return config
+
+    def _notify(self, path, config):
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for callback in subscribers:
+            try: callback(path, config)
+            except Exception as e: print(f"Config: Subscriber failed for {os.path.basename(path)}: {e}")
+
+    def _build_app_config(self, path, stamp):
+        data = {}
+        if stamp is not None:
+            try:
+                data = self._read_json(path)
+            except Exception as e:
+                # A hand edit gone wrong; keep what we had rather than
+                # falling back to the default theme.
+                with self.lock:
+                    cached = self.cache.get(path)
+                if cached is not None:
+                    print(f"Config: Could not read {os.path.basename(path)}, keeping the last good copy: {e}")
+                    return cached[1]
+                print(f"Config: Could not read {os.path.basename(path)}, using defaults: {e}")
+        return _build(AppConfig, data, os.path.basename(path))
+
+    def _read_json(self, path):
+        for attempt in range(20):
+            try:
+                with open(path, 'r', encoding='utf-8') as f: return json.load(f)
+            except PermissionError:
+                # Windows: the writer is mid-rename.
+                if attempt == 19: raise
+                time.sleep(0.005)
+
+    def app_config(self):
+        return self._load(self.app_config_path, self._build_app_config)
+
+    def theme_path(self, theme_id):
+        theme_id = str(theme_id or '')
+        if not theme_id or os.path.basename(theme_id) != theme_id or theme_id in ('.', '..'):
+            raise ValueError(f"invalid theme id '{theme_id}'")
+        return os.path.join(self.wallpapers_dir, theme_id)
+
+    def active_theme_path(self):
+        return os.path.join(self.wallpapers_dir, self.app_config().active_theme)
+
+    def _load_theme_cache(self):
+        if self.theme_cache is None:
+            try:
+                with open(self.theme_cache_path, 'r', encoding='utf-8') as f: cache = json.load(f)
+                self.theme_cache = cache["themes"] if cache.get("version") == COMPILER_VERSION else {}
+            except Exception:
+                self.theme_cache = {}
+        return self.theme_cache
+
+    def _save_theme_cache(self):
+        # Engine and Launcher both write this; the last writer wins, which
+        # only costs the other one a recompile.
+        themes = {k: v for k, v in self.theme_cache.items() if os.path.isdir(os.path.join(self.wallpapers_dir, k))}
+        tmp = f"{self.theme_cache_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({"version": COMPILER_VERSION, "themes": themes}, f, separators=(',', ':'))
+            os.replace(tmp, self.theme_cache_path)
+        except Exception as e:
+            print(f"Config: Could not write {THEME_CACHE_FILE}: {e}")
+
+    def _compile_theme(self, theme_id, path, stamp):
+        """Stripped config dict and content hash, from the disk cache when the
+        file's stamp or content hash matches."""
+        with self.lock:
+            entry = self._load_theme_cache().get(theme_id)
+        if entry is not None and entry.get("stamp") == list(stamp):
+            return entry["config"], entry["hash"]
+        with open(path, 'rb') as f: content = f.read()
+        digest = hashlib.sha1(content).hexdigest()
+        if entry is not None and entry.get("hash") == digest:
+            data = entry["config"]
+        else:
+            try:
+                data = strip_annotations(json.loads(content.decode('utf-8-sig')))
+            except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                raise ValueError(f"config.json of '{theme_id}' is not valid JSON: {e}")
+        with self.lock:
+            self.theme_cache[theme_id] = {"stamp": list(stamp), "hash": digest, "config": data}
+            self._save_theme_cache()
+        return data, digest
+
+    def theme_config(self, theme_id):
+        """Raises LookupError if the theme has no config.json, ValueError if it is not valid JSON."""
+        theme_path = self.theme_path(theme_id)
+        path = os.path.join(theme_path, 'config.json')
+        def build(path, stamp):
+            if stamp is None:
+                raise LookupError(f"theme '{theme_id}' has no config.json")
+            data, digest = self._compile_theme(theme_id, path, stamp)
+            config = _build(ThemeConfig, data, f"{theme_id}/config.json")
+            return dataclasses.replace(config, theme_id=theme_id, content_hash=digest,
+                                       assets=_resolve_assets(config, theme_path, self.root_dir),
+                                       payload=json.dumps(data).encode('utf-8'))
+        return self._load(path, build)
+
+    def active_theme_config(self):
+        """Config of the active theme; an all-defaults ThemeConfig if it cannot be read."""
+        theme_id = self.app_config().active_theme
+        try:
+            return self.theme_config(theme_id)
+        except Exception as e:
+            print(f"Config: Active theme '{theme_id}' unreadable: {e}")
+            return ThemeConfig(theme_id=theme_id)
+
+    def update_app_config(self, expected_version=None, **changes):
+        """Validate and write changes (attribute names) as one transaction
+        across processes; returns the new AppConfig. Raises ValueError, or
+        ConfigConflict if expected_version is given and no longer current."""
+        with self.lock, FileLock(self.lock_path):
+            current = self._load(self.app_config_path, self._build_app_config, force=True)
+            if expected_version is not None and current.version != expected_version:
+                raise ConfigConflict(f"app_config.json is at version {current.version}, expected {expected_version}")
+            data = _merge(current, changes)
+            data['config_version'] = current.version + 1
+            write_json(self.app_config_path, data)
+            self.dirty.add(self.app_config_path)
+            return self.app_config()
+
+    def update_theme_config(self, theme_id, **changes):
+        """Like update_app_config for a theme; returns (previous, new) ThemeConfig.
+        The file is rewritten from its full content, annotations included."""
+        with self.lock, FileLock(self.lock_path):
+            previous = self.theme_config(theme_id)
+            path = os.path.join(self.theme_path(theme_id), 'config.json')
+            with open(path, 'r', encoding='utf-8-sig') as f: full = json.load(f)
+            data = _merge(dataclasses.replace(previous, raw=full), changes)
+            write_json(path, data)
+            self.dirty.add(path)
+            return previous, self.theme_config(theme_id)
+
+    def invalidate(self, path):
+        """Re-check path on its next read, e.g. after another process says it wrote it."""
+        with self.lock:
+            self.dirty.add(path)
+
+    def watch(self, watcher):
+        """Take change detection from watcher (a FileWatcher) instead of stat()."""
+        watcher.subscribe(self._on_watch_events)
+        with self.lock:
+            self.watched = True
+            # Anything cached before the watcher started may already be stale.
+            self.dirty.update(self.cache)
+
+    def _on_watch_events(self, events):
+        paths = set()
+        for event in events:
+            if event.kind == RESCAN:
+                with self.lock: paths.update(self.cache)
+            elif event.kind == CONFIG_CHANGED:
+                paths.add(self.app_config_path)
+            elif event.kind in (THEME_ADDED, THEME_CHANGED):
+                paths.add(os.path.join(self.wallpapers_dir, event.theme_id, 'config.json'))
+            elif event.kind == THEME_REMOVED:
+                with self.lock:
+                    self.cache.pop(os.path.join(self.wallpapers_dir, event.theme_id, 'config.json'), None)
+        with self.lock:
+            self.dirty.update(paths)
+            entries = [(path, self.cache[path][2]) for path in paths if path in self.cache]
+        # Re-read now rather than on the next request so subscribers hear about it.
+        for path, build in entries:
+            try: self._load(path, build)
+            except Exception: pass
+
+    def poll(self):
+        """Re-check every cached file and notify subscribers about changes."""
+        with self.lock:
+            entries = [(path, entry[2]) for path, entry in self.cache.items()]
+        for path, build in entries:
+            try: self._load(path, build)
+            except Exception: pass
@@ -0,0 +1,211 @@
+import threading
+
+SORT_FIELDS = ('process', 'pid', 'remote_ip', 'remote_port', 'local_port', 'status', 'protocol')
+
+class ConnectionRow:
+    __slots__ = (
+        'key', 'pid', 'process', 'local_ip', 'local_port', 'remote_ip', 'remote_port',
+        'status', 'type', 'protocol', 'hostname', 'owner', 'info', 'brief'
+    )
+
+    def __init__(self, key, pid, process, local_ip, local_port, remote_ip, remote_port, status, sock_type, protocol):
+        self.key = key
+        self.pid = pid
+        self.process = process
+        self.local_ip = local_ip
+        self.local_port = local_port
+        self.remote_ip = remote_ip
+        self.remote_port = remote_port
+        self.status = status
+        self.type = sock_type
+        self.protocol = protocol
+        self.hostname = None
+        self.owner = None
+        self.info = None
+        self.brief = None
+
+    def summary(self):
+        if self.brief is None:
+            if self.status == 'LISTEN':
+                self.brief = {"port": self.local_port, "type": self.type, "protocol": self.protocol, "process": self.process}
+            else:
+                self.brief = {"ip": self.remote_ip, "port": self.remote_port, "type": self.type, "protocol": self.protocol, "process": self.process}
+                if self.hostname: self.brief["hostname"] = self.hostname
+                if self.owner:
+                    self.brief["org"] = self.owner.org
+                    self.brief["country"] = self.owner.country
+        return self.brief
+
+    def as_dict(self):
+        if self.info is None:
+            self.info = {
+                "ip": self.remote_ip, "port": self.remote_port,
+                "local_ip": self.local_ip, "local_port": self.local_port,
+                "type": self.type, "protocol": self.protocol,
+                "process": self.process, "pid": self.pid, "status": self.status,
+                "hostname": self.hostname,
+                "asn": self.owner.asn if self.owner else None,
+                "org": self.owner.org if self.owner else None,
+                "country": self.owner.country if self.owner else None
+            }
+        return self.info
+
+def _connection_key(conn):
+    raddr = conn.raddr
+    return (
+        conn.laddr.ip if conn.laddr else None, conn.laddr.port if conn.laddr else None,
+        raddr.ip if raddr else None, raddr.port if raddr else None,
+        conn.pid, conn.status, conn.type
+    )
+
+class ConnectionTable:
+    """In-memory table of the current socket list, indexed by process,
+    remote port, local port and state.
+
+    update() diffs a fresh psutil.net_connections() snapshot against the
+    table, so process names and row dicts are only built for new sockets.
+    Cached process names are keyed on the process start time as well as the
+    PID, so a reused PID doesn't inherit the previous owner's name.
+    """
+
+    def __init__(self, protocol_map, exclude=None, enrich=None):
+        self.lock = threading.Lock()
+        self.protocol_map = protocol_map
+        self.exclude = exclude
+        self.enrich = enrich
+        self.rows = {}
+        self.excluded = set()
+        self.process_names = {}
+        self.by_process = {}
+        self.by_remote_port = {}
+        self.by_local_port = {}
+        self.by_state = {}
+        self.by_remote_ip = {}
+
+    def _index(self, index, value, key):
+        keys = index.get(value)
+        if keys is None:
+            index[value] = {key}
+        else:
+            keys.add(key)
+
+    def _unindex(self, index, value, key):
+        keys = index.get(value)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del index[value]
+
+    def _make_row(self, key, conn, process_name):
+        if conn.status == 'LISTEN':
+            protocol = self.protocol_map.get(conn.laddr.port, str(conn.laddr.port))
+        elif conn.raddr:
+            protocol = self.protocol_map.get(conn.raddr.port, "Unknown")
+        else:
+            protocol = "Unknown"
+        return ConnectionRow(
+            key, conn.pid, process_name, key[0], key[1], key[2], key[3],
+            conn.status, conn.type.name, protocol
+        )
+
+    def update(self, connections, resolve_process_name, resolve_process_start=None):
+        """Apply a snapshot. Returns (added_rows, removed_rows)."""
+        seen = set()
+        added, removed = [], []
+        starts = {}
+        with self.lock:
+            for conn in connections:
+                key = _connection_key(conn)
+                seen.add(key)
+                if key in self.rows or key in self.excluded:
+                    continue
+                pid = conn.pid
+                if pid not in starts:
+                    starts[pid] = resolve_process_start(pid) if resolve_process_start else None
+                cached = self.process_names.get(pid)
+                if cached is not None and cached[0] == starts[pid]:
+                    name = cached[1]
+                else:
+                    name = resolve_process_name(pid)
+                    self.process_names[pid] = (starts[pid], name)
+                row = self._make_row(key, conn, name)
+                if self.exclude and self.exclude(row):
+                    self.excluded.add(key)
+                    continue
+                if self.enrich:
+                    self.enrich(row)
+                self.rows[key] = row
+                self._index(self.by_process, row.process.lower(), key)
+                self._index(self.by_remote_port, row.remote_port, key)
+                self._index(self.by_local_port, row.local_port, key)
+                self._index(self.by_state, row.status, key)
+                self._index(self.by_remote_ip, row.remote_ip, key)
+                added.append(row)
+
+            for key in [k for k in self.rows if k not in seen]:
+                row = self.rows.pop(key)
+                self._unindex(self.by_process, row.process.lower(), key)
+                self._unindex(self.by_remote_port, row.remote_port, key)
+                self._unindex(self.by_local_port, row.local_port, key)
+                self._unindex(self.by_state, row.status, key)
+                self._unindex(self.by_remote_ip, row.remote_ip, key)
+                removed.append(row)
+            self.excluded &= seen
+
+            if removed:
+                live_pids = {k[4] for k in seen}
+                for pid in [p for p in self.process_names if p not in live_pids]:
+                    del self.process_names[pid]
+        return added, removed
+
+    def annotate(self, remote_ip, field, value):
+        """Set an enrichment field on every row talking to remote_ip."""
+        with self.lock:
+            for key in self.by_remote_ip.get(remote_ip, ()):
+                row = self.rows[key]
+                setattr(row, field, value)
+                row.info = None
+                row.brief = None
+
+    def rows_for_state(self, status):
+        with self.lock:
+            return [self.rows[k] for k in self.by_state.get(status, ())]
+
+    def listening_ports(self):
+        with self.lock:
+            return {self.rows[k].local_port for k in self.by_state.get('LISTEN', ())}
+
+    def query(self, status=None, process=None, remote_port=None, local_port=None, ip=None,
+              sort='process', descending=False, offset=0, limit=None):
+        with self.lock:
+            candidates = []
+            if status is not None: candidates.append(self.by_state.get(status, set()))
+            if process is not None: candidates.append(self.by_process.get(process.lower(), set()))
+            if remote_port is not None: candidates.append(self.by_remote_port.get(remote_port, set()))
+            if local_port is not None: candidates.append(self.by_local_port.get(local_port, set()))
+
+            if candidates:
+                candidates.sort(key=len)
+                keys = set(candidates[0])
+                for other in candidates[1:]:
+                    keys &= other
+                rows = [self.rows[k] for k in keys]
+            else:
+                rows = list(self.rows.values())
+
+        if ip is not None:
+            rows = [r for r in rows if r.remote_ip == ip or r.local_ip == ip]
+        if sort not in SORT_FIELDS:
+            sort = 'process'
+        numeric = sort in ('pid', 'remote_port', 'local_port')
+        def sort_key(row):
+            value = getattr(row, sort)
+            return (value is None, value or 0) if numeric else (value or '').lower()
+        rows.sort(key=sort_key, reverse=descending)
+
+        total = len(rows)
+        end = total if limit is None else offset + limit
+        return total, [r.as_dict() for r in rows[offset:end]]
+
+    def __len__(self):
+        return len(self.rows)
@@ -0,0 +1,312 @@
+import os
+import abc
+import sys
+import time
+import select
+import threading
+import collections
+
+DesktopEvent = collections.namedtuple('DesktopEvent', 'kind window class_name fullscreen is_desktop process timestamp')
+
+class DesktopMonitor(abc.ABC):
+    """Reports foreground-window and fullscreen changes as they happen.
+
+    Backends call _report() whenever the foreground window or its geometry
+    may have changed; listeners registered with on_change() receive a
+    DesktopEvent with kind 'foreground' or 'fullscreen', only on real
+    changes. Listeners run on the backend thread.
+    """
+
+    def __init__(self, ignore_windows=()):
+        self.listeners = []
+        self.ignore_windows = set(ignore_windows)
+        self.lock = threading.Lock()
+        self.foreground = None
+        self.fullscreen = False
+        self.events = 0
+
+    def on_change(self, callback):
+        self.listeners.append(callback)
+
+    def ignore(self, window):
+        self.ignore_windows.add(window)
+
+    @abc.abstractmethod
+    def start(self):
+        """Begin watching, on a thread of the backend's own."""
+
+    def stop(self):
+        pass
+
+    def _report(self, window, class_name, fullscreen, is_desktop=False, process=None):
+        if not window or window in self.ignore_windows:
+            return
+        fullscreen = bool(fullscreen) and not is_desktop
+        events = []
+        now = time.time()
+        with self.lock:
+            if window != self.foreground:
+                self.foreground = window
+                events.append(DesktopEvent('foreground', window, class_name, fullscreen, is_desktop, process, now))
+            if fullscreen != self.fullscreen:
+                self.fullscreen = fullscreen
+                events.append(DesktopEvent('fullscreen', window, class_name, fullscreen, is_desktop, process, now))
+            self.events += len(events)
+        for event in events:
+            for callback in self.listeners:
+                try: callback(event)
+                except Exception as e: print(f"Desktop Monitor: Listener failed: {e}")
+
+def process_name(pid):
+    try:
+        import psutil
+        return psutil.Process(pid).name() if pid else None
+    except Exception:
+        return None
+
+class WinEventMonitor(DesktopMonitor):
+    """SetWinEventHook backend. The hooks are out-of-context, so Windows
+    delivers them to the message loop of the thread that installed them."""
+
+    EVENT_SYSTEM_FOREGROUND = 0x0003
+    EVENT_SYSTEM_MOVESIZEEND = 0x000B
+    EVENT_SYSTEM_MINIMIZESTART = 0x0016
+    EVENT_SYSTEM_MINIMIZEEND = 0x0017
+    EVENT_OBJECT_LOCATIONCHANGE = 0x800B
+    WINEVENT_OUTOFCONTEXT = 0x0000
+    WINEVENT_SKIPOWNPROCESS = 0x0002
+    OBJID_WINDOW = 0
+    WM_QUIT = 0x0012
+    SHELL_CLASSES = ("Progman", "WorkerW", "Shell_TrayWnd")
+
+    def __init__(self, ignore_windows=()):
+        super().__init__(ignore_windows)
+        import ctypes
+        from ctypes import wintypes
+        self.ctypes = ctypes
+        self.wintypes = wintypes
+        self.user32 = ctypes.windll.user32
+        self.kernel32 = ctypes.windll.kernel32
+        self.WINEVENTPROC = ctypes.WINFUNCTYPE(
+            None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+            wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD
+        )
+        self.user32.SetWinEventHook.restype = wintypes.HANDLE
+        self.user32.SetWinEventHook.argtypes = [
+            wintypes.UINT, wintypes.UINT, wintypes.HMODULE, self.WINEVENTPROC,
+            wintypes.DWORD, wintypes.DWORD, wintypes.UINT
+        ]
+        self.user32.UnhookWinEvent.argtypes = [wintypes.HANDLE]
+        self.thread = None
+        self.thread_id = None
+        self.started = threading.Event()
+        self.process_cache = (None, None)
+
+    def describe(self, hwnd):
+        import win32gui
+        import win32con
+        import win32api
+        class_name = win32gui.GetClassName(hwnd)
+        if class_name in self.SHELL_CLASSES:
+            return class_name, False, True
+        placement = win32gui.GetWindowPlacement(hwnd)
+        if placement[1] == win32con.SW_SHOWMINIMIZED:
+            return class_name, False, False
+        is_maximized = placement[1] == win32con.SW_SHOWMAXIMIZED
+        monitor = win32api.GetMonitorInfo(win32api.MonitorFromWindow(hwnd, win32con.MONITOR_DEFAULTTONEAREST))['Monitor']
+        return class_name, is_maximized or tuple(win32gui.GetWindowRect(hwnd)) == tuple(monitor), False
+
+    def owner_process(self, hwnd):
+        if self.process_cache[0] != hwnd:
+            import win32process
+            try: pid = win32process.GetWindowThreadProcessId(hwnd)[1]
+            except Exception: pid = None
+            self.process_cache = (hwnd, process_name(pid))
+        return self.process_cache[1]
+
+    def evaluate(self):
+        hwnd = self.user32.GetForegroundWindow()
+        if not hwnd: return
+        try:
+            class_name, fullscreen, is_desktop = self.describe(hwnd)
+        except Exception:
+            return
+        self._report(hwnd, class_name, fullscreen, is_desktop, self.owner_process(hwnd))
+
+    def _callback(self, hook, event, hwnd, id_object, id_child, thread, ms_time):
+        if event == self.EVENT_OBJECT_LOCATIONCHANGE:
+            # Fires for carets and cursors too; only the foreground window's own frame matters.
+            if id_object != self.OBJID_WINDOW or id_child != 0 or hwnd != self.user32.GetForegroundWindow():
+                return
+        self.evaluate()
+
+    def _run(self):
+        self.thread_id = self.kernel32.GetCurrentThreadId()
+        proc = self.WINEVENTPROC(self._callback)
+        flags = self.WINEVENT_OUTOFCONTEXT | self.WINEVENT_SKIPOWNPROCESS
+        hooks = [
+            self.user32.SetWinEventHook(low, high, None, proc, 0, 0, flags)
+            for low, high in (
+                (self.EVENT_SYSTEM_FOREGROUND, self.EVENT_SYSTEM_FOREGROUND),
+                (self.EVENT_SYSTEM_MOVESIZEEND, self.EVENT_SYSTEM_MOVESIZEEND),
+                (self.EVENT_SYSTEM_MINIMIZESTART, self.EVENT_SYSTEM_MINIMIZEEND),
+                (self.EVENT_OBJECT_LOCATIONCHANGE, self.EVENT_OBJECT_LOCATIONCHANGE),
+            )
+        ]
+        self.started.set()
+        if not all(hooks):
+            print("Desktop Monitor: SetWinEventHook failed.")
+        self.evaluate()
+        msg = self.wintypes.MSG()
+        while self.user32.GetMessageW(self.ctypes.byref(msg), None, 0, 0) > 0:
+            self.user32.TranslateMessage(self.ctypes.byref(msg))
+            self.user32.DispatchMessageW(self.ctypes.byref(msg))
+        for hook in hooks:
+            if hook: self.user32.UnhookWinEvent(hook)
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name='desktop-monitor', daemon=True)
+        self.thread.start()
+        self.started.wait(2)
+        print("Desktop Monitor: Using WinEvent hooks.")
+
+    def stop(self):
+        if self.thread_id:
+            self.user32.PostThreadMessageW(self.thread_id, self.WM_QUIT, 0, 0)
+
+class X11Monitor(DesktopMonitor):
+    """EWMH backend: PropertyNotify on the root window's _NET_ACTIVE_WINDOW,
+    then _NET_WM_STATE and ConfigureNotify on the active window. Needs the
+    optional python-xlib package."""
+
+    def __init__(self, display_name=None, ignore_windows=()):
+        super().__init__(ignore_windows)
+        from Xlib import X, display
+        self.X = X
+        self.display = display.Display(display_name)
+        self.root = self.display.screen().root
+        atom = self.display.intern_atom
+        self.NET_ACTIVE_WINDOW = atom('_NET_ACTIVE_WINDOW')
+        self.NET_WM_STATE = atom('_NET_WM_STATE')
+        self.NET_WM_WINDOW_TYPE = atom('_NET_WM_WINDOW_TYPE')
+        self.NET_WM_PID = atom('_NET_WM_PID')
+        self.FULLSCREEN_STATES = {atom('_NET_WM_STATE_FULLSCREEN')}
+        self.MAXIMIZED_STATES = {atom('_NET_WM_STATE_MAXIMIZED_VERT'), atom('_NET_WM_STATE_MAXIMIZED_HORZ')}
+        self.DESKTOP_TYPES = {atom('_NET_WM_WINDOW_TYPE_DESKTOP'), atom('_NET_WM_WINDOW_TYPE_DOCK')}
+        self.active = None
+        self.active_process = None
+        self.thread = None
+        self.stop_pipe = os.pipe()
+        self.stopping = False
+
+    def _atoms(self, window, prop):
+        value = window.get_full_property(prop, self.X.AnyPropertyType)
+        return set(value.value) if value is not None else set()
+
+    def _watch_active(self):
+        value = self.root.get_full_property(self.NET_ACTIVE_WINDOW, self.X.AnyPropertyType)
+        wid = value.value[0] if value is not None and len(value.value) else 0
+        if self.active is not None and self.active.id != wid:
+            try: self.active.change_attributes(event_mask=self.X.NoEventMask)
+            except Exception: pass
+            self.active = None
+        if wid and self.active is None:
+            self.active = self.display.create_resource_object('window', wid)
+            self.active.change_attributes(event_mask=self.X.PropertyChangeMask | self.X.StructureNotifyMask)
+            try:
+                pid = self.active.get_full_property(self.NET_WM_PID, self.X.AnyPropertyType)
+                self.active_process = process_name(pid.value[0]) if pid is not None else None
+            except Exception:
+                self.active_process = None
+        self._evaluate()
+
+    def _evaluate(self):
+        if self.active is None:
+            self._report('root', 'desktop', False, True)
+            return
+        try:
+            window = self.active
+            wm_class = window.get_wm_class()
+            class_name = wm_class[1] if wm_class else ''
+            if self._atoms(window, self.NET_WM_WINDOW_TYPE) & self.DESKTOP_TYPES:
+                self._report(window.id, class_name, False, True, self.active_process)
+                return
+            states = self._atoms(window, self.NET_WM_STATE)
+            fullscreen = bool(states & self.FULLSCREEN_STATES) or self.MAXIMIZED_STATES <= states
+            if not fullscreen:
+                geometry = window.get_geometry()
+                origin = self.root.translate_coords(window, 0, 0)
+                screen = self.root.get_geometry()
+                fullscreen = (origin.x, origin.y, geometry.width, geometry.height) == (0, 0, screen.width, screen.height)
+            self._report(window.id, class_name, fullscreen, False, self.active_process)
+        except Exception:
+            # The window can vanish between the notify and our queries.
+            pass
+
+    def _run(self):
+        X = self.X
+        self.root.change_attributes(event_mask=X.PropertyChangeMask)
+        self._watch_active()
+        self.display.flush()
+        while not self.stopping:
+            while self.display.pending_events():
+                event = self.display.next_event()
+                if event.type == X.PropertyNotify:
+                    if event.window == self.root and event.atom == self.NET_ACTIVE_WINDOW:
+                        self._watch_active()
+                    elif self.active is not None and event.window == self.active and event.atom == self.NET_WM_STATE:
+                        self._evaluate()
+                elif event.type == X.ConfigureNotify and self.active is not None and event.window == self.active:
+                    self._evaluate()
+            self.display.flush()
+            select.select([self.display.fileno(), self.stop_pipe[0]], [], [])
+        self.display.close()
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name='desktop-monitor', daemon=True)
+        self.thread.start()
+        print("Desktop Monitor: Using X11 _NET_ACTIVE_WINDOW notifications.")
+
+    def stop(self):
+        self.stopping = True
+        try: os.write(self.stop_pipe[1], b'x')
+        except OSError: pass
+
+class ScriptedMonitor(DesktopMonitor):
+    """Fake backend. Plays (delay_seconds, window, class_name, fullscreen[, is_desktop[, process]])
+    steps on a thread, and push() reports a state immediately."""
+
+    def __init__(self, script=(), ignore_windows=()):
+        super().__init__(ignore_windows)
+        self.script = list(script)
+        self.thread = None
+        self.stopping = threading.Event()
+
+    def push(self, window, class_name, fullscreen=False, is_desktop=False, process=None):
+        self._report(window, class_name, fullscreen, is_desktop, process)
+
+    def _run(self):
+        for step in self.script:
+            if self.stopping.wait(step[0]):
+                return
+            self.push(*step[1:])
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name='desktop-monitor', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopping.set()
+
+def create_desktop_monitor(ignore_windows=()):
+    """Best event-driven backend for this platform, or None to keep polling."""
+    try:
+        if sys.platform == 'win32':
+            return WinEventMonitor(ignore_windows)
+        if os.environ.get('DISPLAY'):
+            return X11Monitor(ignore_windows=ignore_windows)
+    except ImportError:
+        print("Desktop Monitor: python-xlib not installed, falling back to polling.")
+    except Exception as e:
+        print(f"Desktop Monitor: Event backend unavailable ({e}), falling back to polling.")
+    return None
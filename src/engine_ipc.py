@@ -0,0 +1,293 @@
+import os
+import sys
+import json
+import time
+import secrets
+import tempfile
+import threading
+import queue
+from multiprocessing.connection import Listener, Client, deliver_challenge, answer_challenge
+
+IPC_FILE = 'engine_ipc.json'
+PROTOCOL = 1
+MAX_MESSAGE = 4 * 1024 * 1024
+# Pushes a subscriber may fall behind by before it is dropped.
+EVENT_BACKLOG = 64
+
+# Local control channel between the Launcher and the engine: a named pipe on
+# Windows, a Unix domain socket elsewhere. Both ends authenticate with the
+# random key the engine writes to engine_ipc.json next to app_config.json.
+# Messages are JSON (never pickle) sent with send_bytes:
+#   request   {"id": 1, "cmd": "status", "args": {}}
+#   response  {"id": 1, "ok": true, "result": ...} / {"id": 1, "ok": false, "error": "...", "kind": "..."}
+#   push      {"event": "paused", "data": {...}} on connections that sent "subscribe"
+
+def _address():
+    if sys.platform == 'win32':
+        return r'\\.\pipe\librewall_engine_' + str(os.getpid()), 'AF_PIPE'
+    return os.path.join(tempfile.gettempdir(), f'librewall-engine-{os.getpid()}.sock'), 'AF_UNIX'
+
+def _encode(message):
+    return json.dumps(message, separators=(',', ':'), default=str).encode('utf-8')
+
+class EngineControlServer:
+    """Engine side of the control channel.
+
+    commands maps a command name to a callable taking the request's args dict
+    and returning something JSON-serialisable; it runs on the connection's
+    thread, so anything touching Qt must hop to the main thread itself.
+    LookupError and ValueError come back as "not_found" / "invalid" errors.
+    publish() queues an event for every subscribed connection without
+    blocking; each subscription is written by its own thread, and one that
+    stops reading is dropped once EVENT_BACKLOG events pile up.
+    """
+
+    def __init__(self, root_dir, commands):
+        self.root_dir = root_dir
+        self.commands = dict(commands)
+        self.lock = threading.Lock()
+        self.subscribers = []
+        self.listener = None
+        self.info_path = os.path.join(root_dir, IPC_FILE)
+
+    def start(self):
+        address, family = _address()
+        authkey = secrets.token_bytes(32)
+        # No authkey on the Listener: accept() would run the handshake on the
+        # accept thread, where one stalled client holds up everyone else.
+        self.authkey = authkey
+        self.listener = Listener(address, family=family)
+        info = {"protocol": PROTOCOL, "pid": os.getpid(), "address": address, "family": family,
+                "authkey": authkey.hex(), "started_at": time.time()}
+        tmp = self.info_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(info, f)
+        os.replace(tmp, self.info_path)
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        print(f"Engine IPC: Listening on {address}")
+
+    def _accept_loop(self):
+        while self.listener is not None:
+            try:
+                conn = self.listener.accept()
+            except Exception as e:
+                if self.listener is None: return
+                print(f"Engine IPC: Accept failed: {e}")
+                continue
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        try:
+            # The same challenge exchange Listener(authkey=...) does, per connection.
+            deliver_challenge(conn, self.authkey)
+            answer_challenge(conn, self.authkey)
+        except Exception as e:
+            print(f"Engine IPC: Rejected connection: {e}")
+            try: conn.close()
+            except Exception: pass
+            return
+        try:
+            while True:
+                message = json.loads(conn.recv_bytes(MAX_MESSAGE))
+                cmd = message.get("cmd")
+                reply = {"id": message.get("id")}
+                if cmd == "subscribe":
+                    reply.update(ok=True, result={"protocol": PROTOCOL, "pid": os.getpid()})
+                    conn.send_bytes(_encode(reply))
+                    events = queue.Queue(EVENT_BACKLOG)
+                    with self.lock:
+                        self.subscribers.append((conn, events, threading.current_thread()))
+                    # This connection's thread now only writes its pushes.
+                    self._send_events(conn, events)
+                    return
+                handler = self.commands.get(cmd)
+                try:
+                    if handler is None:
+                        raise LookupError(f"unknown command '{cmd}'")
+                    reply.update(ok=True, result=handler(message.get("args") or {}))
+                except LookupError as e: reply.update(ok=False, error=str(e), kind="not_found")
+                except ValueError as e: reply.update(ok=False, error=str(e), kind="invalid")
+                except Exception as e: reply.update(ok=False, error=str(e), kind="failed")
+                conn.send_bytes(_encode(reply))
+        except (EOFError, OSError):
+            pass
+        except Exception as e:
+            print(f"Engine IPC: Dropped connection: {e}")
+        conn.close()
+
+    def _send_events(self, conn, events):
+        try:
+            while True:
+                payload = events.get()
+                if payload is None: break
+                conn.send_bytes(payload)
+        except Exception:
+            pass
+        self._drop(conn, events)
+        try: conn.close()
+        except Exception: pass
+
+    def _drop(self, conn, events):
+        """Forget a subscription and tell its thread to close it; pending pushes are discarded."""
+        with self.lock:
+            self.subscribers = [s for s in self.subscribers if s[0] is not conn]
+        try:
+            while True: events.get_nowait()
+        except queue.Empty:
+            pass
+        try: events.put_nowait(None)
+        except queue.Full: pass
+
+    def publish(self, event, data=None):
+        """Queue event for every subscriber; never blocks the caller (the Qt main thread)."""
+        payload = _encode({"event": event, "data": data, "ts": time.time()})
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for conn, events, _ in subscribers:
+            try:
+                events.put_nowait(payload)
+            except queue.Full:
+                print(f"Engine IPC: Dropping a subscriber {EVENT_BACKLOG} events behind")
+                self._drop(conn, events)
+
+    def stop(self):
+        self.publish("stopping")
+        listener, self.listener = self.listener, None
+        try:
+            with open(self.info_path, 'r') as f:
+                if json.load(f).get("pid") == os.getpid(): os.remove(self.info_path)
+        except Exception: pass
+        if listener is not None:
+            try: listener.close()
+            except Exception: pass
+        with self.lock:
+            subscribers, self.subscribers = self.subscribers, []
+        for conn, events, thread in subscribers:
+            try: events.put_nowait(None)
+            except queue.Full: pass
+        # Give "stopping" a moment to reach subscribers that are keeping up.
+        deadline = time.monotonic() + 0.5
+        for conn, events, thread in subscribers:
+            thread.join(max(0, deadline - time.monotonic()))
+
+class EngineClient:
+    """Launcher side. request() keeps one connection open and reconnects once
+    if the engine restarted in between. args is the command's args dict;
+    timeout overrides the client's default for one slow command. Raises ConnectionError when no engine is listening,
+    TimeoutError, or RuntimeError with the engine's error."""
+
+    def __init__(self, root_dir, timeout=2.0):
+        self.info_path = os.path.join(root_dir, IPC_FILE)
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.conn = None
+        self.next_id = 0
+
+    def _connect(self):
+        try:
+            with open(self.info_path, 'r') as f:
+                info = json.load(f)
+        except Exception:
+            raise ConnectionError("engine control channel not published")
+        if info.get("protocol") != PROTOCOL:
+            raise ConnectionError(f"engine speaks protocol {info.get('protocol')}, expected {PROTOCOL}")
+        try:
+            return Client(info["address"], family=info["family"], authkey=bytes.fromhex(info["authkey"]))
+        except Exception as e:
+            raise ConnectionError(f"engine not reachable: {e}")
+
+    def _close(self):
+        if self.conn is not None:
+            try: self.conn.close()
+            except Exception: pass
+            self.conn = None
+
+    def request(self, cmd, args=None, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        with self.lock:
+            for attempt in (1, 2):
+                if self.conn is None:
+                    self.conn = self._connect()
+                self.next_id += 1
+                try:
+                    self.conn.send_bytes(_encode({"id": self.next_id, "cmd": cmd, "args": args or {}}))
+                    answered = self.conn.poll(timeout)
+                    reply = json.loads(self.conn.recv_bytes(MAX_MESSAGE)) if answered else None
+                except (EOFError, OSError):
+                    self._close()
+                    if attempt == 2:
+                        raise ConnectionError("engine closed the control channel")
+                    continue
+                if reply is None:
+                    # A late reply would answer the next request; start over.
+                    self._close()
+                    raise TimeoutError(f"engine did not answer '{cmd}' within {timeout}s")
+                break
+        if not reply.get("ok"):
+            raise RuntimeError(reply.get("error") or "engine command failed")
+        return reply.get("result")
+
+    def close(self):
+        with self.lock:
+            self._close()
+
+    def subscribe(self, callback, retry=2.0):
+        """Call callback(event, data) for every push from the engine on a
+        background thread, reconnecting across engine restarts. callback gets
+        ("connected", {"pid": ...}) and ("disconnected", None) around each session."""
+        def run():
+            while True:
+                try:
+                    conn = self._connect()
+                except ConnectionError:
+                    time.sleep(retry)
+                    continue
+                try:
+                    conn.send_bytes(_encode({"id": 0, "cmd": "subscribe"}))
+                    callback("connected", json.loads(conn.recv_bytes(MAX_MESSAGE)).get("result"))
+                    while True:
+                        message = json.loads(conn.recv_bytes(MAX_MESSAGE))
+                        callback(message.get("event"), message.get("data"))
+                except Exception:
+                    pass
+                try: conn.close()
+                except Exception: pass
+                callback("disconnected", None)
+                time.sleep(retry)
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+if __name__ == "__main__":
+    # python engine_ipc.py [command] [--rounds N] | --watch
+    import argparse
+    import statistics
+    parser = argparse.ArgumentParser(description="Talk to the running engine over its control channel.")
+    parser.add_argument('command', nargs='?', default='ping')
+    parser.add_argument('--args', default='{}', help="JSON object passed as the command's args")
+    parser.add_argument('--rounds', type=int, default=1, help="repeat and report round-trip latency")
+    parser.add_argument('--watch', action='store_true', help="print pushed engine events until interrupted")
+    opts = parser.parse_args()
+    client = EngineClient(os.path.dirname(os.path.abspath(__file__)))
+    if opts.watch:
+        client.subscribe(lambda event, data: print(f"{time.strftime('%H:%M:%S')} {event} {json.dumps(data)}"))
+        try:
+            while True: time.sleep(1)
+        except KeyboardInterrupt:
+            sys.exit(0)
+    try:
+        args = json.loads(opts.args)
+        result = client.request(opts.command, args)
+        times = []
+        for _ in range(max(0, opts.rounds - 1)):
+            started = time.perf_counter()
+            client.request(opts.command, args)
+            times.append((time.perf_counter() - started) * 1000)
+    except Exception as e:
+        print(f"Engine IPC: {e}")
+        sys.exit(1)
+    print(json.dumps(result, indent=2))
+    if times:
+        times.sort()
+        print(f"{len(times)} round trips: median {statistics.median(times):.3f} ms, "
+              f"p99 {times[min(len(times) - 1, int(len(times) * 0.99))]:.3f} ms, max {times[-1]:.3f} ms")
@@ -0,0 +1,187 @@
+import sys
+import time
+import heapq
+import threading
+
+class ScheduledTask:
+    __slots__ = ('name', 'func', 'interval', 'paused_interval', 'wants_run',
+                 'due', 'state', 'wakeups', 'runs', 'skips', 'errors', 'cpu', 'last_run', 'generation',
+                 'running', 'catch_up')
+
+    def __init__(self, name, func, interval, paused_interval, wants_run):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.paused_interval = paused_interval
+        self.wants_run = wants_run
+        self.due = 0.0
+        self.state = 'running'
+        self.wakeups = 0
+        self.runs = 0
+        self.skips = 0
+        self.errors = 0
+        self.cpu = 0.0
+        self.last_run = None
+        self.generation = 0
+        self.running = False
+        self.catch_up = False
+
+    def as_dict(self):
+        return {
+            "state": self.state, "interval": self.interval, "paused_interval": self.paused_interval,
+            "wakeups": self.wakeups, "runs": self.runs, "skips": self.skips, "errors": self.errors,
+            "cpu_ms": round(self.cpu * 1000, 3),
+            "last_run": self.last_run
+        }
+
+class EngineScheduler:
+    """Single thread that runs every periodic engine job.
+
+    A task runs each `interval` seconds while the wallpaper is live. While
+    paused it runs every `paused_interval` seconds, or not at all if that is
+    None. `wants_run` (optional) is checked before each run; when it returns
+    False the task is parked until wake(name) is called, so e.g. the websocket
+    push costs nothing with no clients. On resume every task runs at once,
+    in registration order, so consumers get a fresh snapshot instead of
+    whatever was current when the pause started; a task that is mid-run at
+    that moment runs again as soon as it finishes.
+    """
+
+    def __init__(self):
+        self.lock = threading.Condition()
+        self.tasks = {}
+        self.queue = []
+        self.sequence = 0
+        self.paused = False
+        self.pause_reason = None
+        self.thread = None
+        self.running = False
+        self.wakeups = 0
+
+    def register(self, name, func, interval, paused_interval=None, wants_run=None):
+        with self.lock:
+            task = ScheduledTask(name, func, interval, paused_interval, wants_run)
+            old = self.tasks.get(name)
+            if old is not None:
+                task.generation = old.generation + 1
+            self.tasks[name] = task
+            self._schedule(task, time.monotonic())
+            self.lock.notify()
+        return task
+
+    def unregister(self, name):
+        with self.lock:
+            task = self.tasks.pop(name, None)
+            if task is not None:
+                task.generation += 1
+
+    def _current_interval(self, task):
+        return task.paused_interval if self.paused else task.interval
+
+    def _schedule(self, task, due):
+        task.generation += 1
+        if due is None:
+            task.state = 'suspended'
+            return
+        task.due = due
+        task.state = 'slowed' if self.paused else 'running'
+        self.sequence += 1
+        heapq.heappush(self.queue, (due, self.sequence, task.name, task.generation))
+
+    def wake(self, name):
+        """Run a parked task on the next scheduler pass."""
+        with self.lock:
+            task = self.tasks.get(name)
+            if task is not None and task.state in ('idle', 'suspended') and self._current_interval(task) is not None:
+                self._schedule(task, time.monotonic())
+                self.lock.notify()
+
+    def set_paused(self, paused, reason=None):
+        with self.lock:
+            if paused == self.paused:
+                return
+            self.paused = paused
+            self.pause_reason = reason if paused else None
+            now = time.monotonic()
+            for task in self.tasks.values():
+                # The run in progress saw the old state; _run() reschedules it right after.
+                task.catch_up = task.running and not paused
+                if paused:
+                    self._schedule(task, None if task.paused_interval is None else now + task.paused_interval)
+                else:
+                    self._schedule(task, now)
+            self.lock.notify()
+
+    def start(self):
+        with self.lock:
+            if self.running:
+                return
+            self.running = True
+        self.thread = threading.Thread(target=self._run, name='engine-scheduler', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        with self.lock:
+            self.running = False
+            self.lock.notify()
+
+    def _next_task(self):
+        with self.lock:
+            while self.running:
+                if self.queue:
+                    due, _, name, generation = self.queue[0]
+                    task = self.tasks.get(name)
+                    if task is None or task.generation != generation:
+                        heapq.heappop(self.queue)
+                        continue
+                    delay = due - time.monotonic()
+                    if delay <= 0:
+                        heapq.heappop(self.queue)
+                        task.running = True
+                        return task
+                    self.lock.wait(delay)
+                else:
+                    self.lock.wait()
+                self.wakeups += 1
+            return None
+
+    def _run(self):
+        while True:
+            task = self._next_task()
+            if task is None:
+                return
+            task.wakeups += 1
+            with self.lock:
+                # Checked under the lock so a wake() racing with this cannot be lost.
+                if task.wants_run is not None and not task.wants_run():
+                    task.running = False
+                    task.skips += 1
+                    task.generation += 1
+                    task.state = 'idle'
+                    continue
+            start = time.thread_time()
+            try:
+                task.func()
+            except Exception as e:
+                task.errors += 1
+                print(f"Engine Scheduler: Task '{task.name}' failed: {e}", file=sys.stderr)
+            task.cpu += time.thread_time() - start
+            task.runs += 1
+            task.last_run = time.time()
+            with self.lock:
+                task.running = False
+                catch_up, task.catch_up = task.catch_up, False
+                if self.tasks.get(task.name) is task and task.state != 'suspended':
+                    interval = self._current_interval(task)
+                    now = time.monotonic()
+                    due = None if interval is None else now + interval
+                    self._schedule(task, now if catch_up else due)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "paused": self.paused,
+                "pause_reason": self.pause_reason,
+                "wakeups": self.wakeups,
+                "tasks": {name: task.as_dict() for name, task in self.tasks.items()}
+            }
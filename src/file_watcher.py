@@ -0,0 +1,389 @@
+import os
+import sys
+import time
+import queue
+import struct
+import threading
+from dataclasses import dataclass
+import api_config
+
+# Typed invalidation events published by FileWatcher.
+THEME_ADDED = 'theme_added'        # a theme folder appeared in wallpapers/
+THEME_REMOVED = 'theme_removed'    # ...or went away
+THEME_CHANGED = 'theme_changed'    # its config.json was written
+ASSET_CHANGED = 'asset_changed'    # any other file inside a theme folder
+CONFIG_CHANGED = 'config_changed'  # app_config.json
+RESCAN = 'rescan'                  # events were lost; drop everything
+
+COALESCE = 0.2
+MAX_DELAY = 1.0
+POLL_INTERVAL = 2.0
+IGNORED_SUFFIXES = ('.tmp', '.part', '.crdownload', '~')
+
+@dataclass(frozen=True, slots=True)
+class WatchEvent:
+    kind: str
+    theme_id: str = None
+    path: str = None
+
+class FileWatcher:
+    """Watches wallpapers/ and app_config.json and tells subscribers what
+    changed, so caches can trust what they hold instead of stat()ing on
+    every read.
+
+    Backends: inotify on Linux, ReadDirectoryChangesW on Windows, a
+    polling snapshot diff elsewhere or when the native one cannot start.
+    Raw events are coalesced until COALESCE seconds pass without one (at
+    most MAX_DELAY), classified into WatchEvents and handed to every
+    subscriber as one list, on the watcher's dispatch thread.
+    """
+
+    def __init__(self, root_dir, backend=None, coalesce=COALESCE, poll_interval=POLL_INTERVAL):
+        self.root_dir = os.path.abspath(root_dir)
+        self.wallpapers_dir = os.path.join(self.root_dir, api_config.WALLPAPERS_DIR)
+        self.app_config_path = os.path.join(self.root_dir, api_config.APP_CONFIG_FILE)
+        self.requested_backend = backend
+        self.backend = None
+        self.coalesce = coalesce
+        self.poll_interval = poll_interval
+        self.raw = queue.Queue()
+        self.lock = threading.Lock()
+        self.subscribers = []
+        self.themes = set()
+        self.stop_event = threading.Event()
+        self.stats = {"raw_events": 0, "batches": 0, "published": 0, "rescans": 0}
+
+    def subscribe(self, callback):
+        """callback(events) with a list of WatchEvent per coalesced burst."""
+        with self.lock:
+            self.subscribers.append(callback)
+
+    def start(self):
+        """Start watching; returns the backend name actually in use."""
+        self.themes = set(self._list_themes())
+        backends = {'inotify': InotifyBackend, 'win32': Win32Backend, 'poll': PollingBackend}
+        name = self.requested_backend or ('inotify' if sys.platform.startswith('linux') else
+                                          'win32' if sys.platform == 'win32' else 'poll')
+        try:
+            self.backend = backends[name](self)
+            self.backend.start()
+        except Exception as e:
+            if name == 'poll': raise
+            print(f"File Watcher: {name} unavailable, polling every {self.poll_interval}s: {e}")
+            self.backend = PollingBackend(self)
+            self.backend.start()
+        threading.Thread(target=self._dispatch_loop, daemon=True).start()
+        print(f"File Watcher: Watching {self.wallpapers_dir} ({self.backend.name})")
+        return self.backend.name
+
+    def stop(self):
+        self.stop_event.set()
+        if self.backend is not None:
+            self.backend.stop()
+
+    def fall_back(self, reason):
+        """Called by a native backend that died: poll from now on and make
+        every cache start over, since events may have been missed."""
+        if self.stop_event.is_set(): return
+        print(f"File Watcher: {self.backend.name} failed ({reason}), switching to polling")
+        self.backend = PollingBackend(self)
+        self.backend.start()
+        self.push(None)
+
+    def push(self, path):
+        """Queue one raw change (an absolute path), or None for 'events were lost'."""
+        self.raw.put(path)
+
+    def _list_themes(self):
+        try:
+            return [e.name for e in os.scandir(self.wallpapers_dir) if e.is_dir()]
+        except OSError:
+            return []
+
+    def _dispatch_loop(self):
+        while not self.stop_event.is_set():
+            try:
+                first = self.raw.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            pending = {first}
+            deadline = time.monotonic() + MAX_DELAY
+            while time.monotonic() < deadline:
+                try: pending.add(self.raw.get(timeout=self.coalesce))
+                except queue.Empty: break
+            events = self._classify(pending)
+            with self.lock:
+                self.stats["raw_events"] += len(pending)
+                self.stats["batches"] += 1
+                self.stats["published"] += len(events)
+                if events and events[0].kind == RESCAN: self.stats["rescans"] += 1
+                subscribers = list(self.subscribers)
+            if not events: continue
+            for callback in subscribers:
+                try: callback(events)
+                except Exception as e: print(f"File Watcher: Subscriber failed: {e}")
+
+    def _classify(self, paths):
+        if None in paths:
+            self.themes = set(self._list_themes())
+            return [WatchEvent(RESCAN)]
+        events, touched, changed, assets = [], set(), set(), {}
+        app_config = os.path.normcase(self.app_config_path)
+        for path in paths:
+            if os.path.normcase(path) == app_config:
+                events.append(WatchEvent(CONFIG_CHANGED, path=self.app_config_path))
+                continue
+            rel = os.path.relpath(path, self.wallpapers_dir)
+            if rel.startswith('..') or os.path.isabs(rel):
+                continue
+            if rel == '.':
+                # wallpapers/ itself was created, moved or removed.
+                self.themes = set(self._list_themes())
+                return [WatchEvent(RESCAN)]
+            if rel.endswith(IGNORED_SUFFIXES):
+                continue
+            parts = rel.split(os.sep)
+            theme_id = parts[0]
+            touched.add(theme_id)
+            if len(parts) == 2 and parts[1] == 'config.json':
+                changed.add(theme_id)
+            elif len(parts) > 1:
+                assets.setdefault(theme_id, set()).add(path)
+        for theme_id in sorted(touched):
+            exists = os.path.isdir(os.path.join(self.wallpapers_dir, theme_id))
+            if exists and theme_id not in self.themes:
+                self.themes.add(theme_id)
+                events.append(WatchEvent(THEME_ADDED, theme_id))
+            elif not exists and theme_id in self.themes:
+                self.themes.discard(theme_id)
+                events.append(WatchEvent(THEME_REMOVED, theme_id))
+            elif exists:
+                if theme_id in changed:
+                    events.append(WatchEvent(THEME_CHANGED, theme_id, os.path.join(self.wallpapers_dir, theme_id, 'config.json')))
+                for path in sorted(assets.get(theme_id, ())):
+                    events.append(WatchEvent(ASSET_CHANGED, theme_id, path))
+        return events
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.stats, backend=self.backend.name if self.backend else None, themes=len(self.themes))
+
+class PollingBackend:
+    """Diffs a (mtime_ns, size) snapshot of wallpapers/ and app_config.json."""
+    name = 'poll'
+
+    def __init__(self, watcher):
+        self.watcher = watcher
+        self.stop_event = threading.Event()
+
+    def _snapshot(self):
+        files = {}
+        def walk(path):
+            try:
+                entries = list(os.scandir(path))
+            except OSError:
+                return
+            for entry in entries:
+                try:
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                files[entry.path] = (st.st_mtime_ns, st.st_size)
+                if entry.is_dir(follow_symlinks=False):
+                    walk(entry.path)
+        walk(self.watcher.wallpapers_dir)
+        try:
+            st = os.stat(self.watcher.app_config_path)
+            files[self.watcher.app_config_path] = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            pass
+        return files
+
+    def start(self):
+        threading.Thread(target=self._run, args=(self._snapshot(),), daemon=True).start()
+
+    def _run(self, previous):
+        while not self.stop_event.wait(self.watcher.poll_interval):
+            current = self._snapshot()
+            for path in previous.keys() | current.keys():
+                if previous.get(path) != current.get(path):
+                    self.watcher.push(path)
+            previous = current
+
+    def stop(self):
+        self.stop_event.set()
+
+IN_MODIFY, IN_ATTRIB, IN_CLOSE_WRITE = 0x2, 0x4, 0x8
+IN_MOVED_FROM, IN_MOVED_TO, IN_CREATE, IN_DELETE = 0x40, 0x80, 0x100, 0x200
+IN_DELETE_SELF, IN_MOVE_SELF = 0x400, 0x800
+IN_Q_OVERFLOW, IN_IGNORED, IN_ISDIR = 0x4000, 0x8000, 0x40000000
+IN_ONLYDIR = 0x01000000
+INOTIFY_MASK = (IN_CLOSE_WRITE | IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+                | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+
+class InotifyBackend:
+    """One inotify watch per directory under wallpapers/, plus the root
+    directory for app_config.json (renamed into place, so watched by name)."""
+    name = 'inotify'
+
+    def __init__(self, watcher):
+        import ctypes
+        import ctypes.util
+        self.ctypes = ctypes
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.watcher = watcher
+        self.fd = None
+        self.dirs = {}
+        self.stop_event = threading.Event()
+
+    def _add(self, path):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), INOTIFY_MASK)
+        if wd < 0:
+            errno = self.ctypes.get_errno()
+            raise OSError(errno, f"inotify_add_watch {path}: {os.strerror(errno)}")
+        self.dirs[wd] = path
+
+    def _add_tree(self, path):
+        """Watch path and everything below it; report files that appeared
+        before the watch was in place."""
+        self._add(path)
+        for dirpath, dirnames, filenames in os.walk(path):
+            for name in dirnames:
+                self._add(os.path.join(dirpath, name))
+            for name in filenames:
+                self.watcher.push(os.path.join(dirpath, name))
+
+    def start(self):
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(self.ctypes.get_errno(), "inotify_init1 failed")
+        try:
+            self._add(self.watcher.root_dir)
+            if os.path.isdir(self.watcher.wallpapers_dir):
+                self._add_tree(self.watcher.wallpapers_dir)
+        except Exception:
+            os.close(self.fd)
+            raise
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        import select
+        try:
+            while not self.stop_event.is_set():
+                ready, _, _ = select.select([self.fd], [], [], 0.5)
+                if not ready: continue
+                try:
+                    buf = os.read(self.fd, 65536)
+                except BlockingIOError:
+                    continue
+                self._handle(buf)
+        except Exception as e:
+            if not self.stop_event.is_set():
+                self.stop()
+                self.watcher.fall_back(e)
+
+    def _handle(self, buf):
+        offset = 0
+        while offset + 16 <= len(buf):
+            wd, mask, _, length = struct.unpack_from('iIII', buf, offset)
+            name = buf[offset + 16:offset + 16 + length].rstrip(b'\0')
+            offset += 16 + length
+            if mask & IN_Q_OVERFLOW:
+                self.watcher.push(None)
+                continue
+            if mask & IN_IGNORED:
+                self.dirs.pop(wd, None)
+                continue
+            parent = self.dirs.get(wd)
+            if parent is None: continue
+            path = os.path.join(parent, os.fsdecode(name)) if name else parent
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                if parent != self.watcher.root_dir or path == self.watcher.wallpapers_dir:
+                    self._add_tree(path)
+            if parent == self.watcher.root_dir and path not in (self.watcher.app_config_path, self.watcher.wallpapers_dir):
+                continue
+            self.watcher.push(path)
+
+    def stop(self):
+        self.stop_event.set()
+        fd, self.fd = self.fd, None
+        if fd is not None:
+            try: os.close(fd)
+            except OSError: pass
+
+FILE_LIST_DIRECTORY = 0x1
+FILE_SHARE_ALL = 0x1 | 0x2 | 0x4
+OPEN_EXISTING = 3
+FILE_FLAG_BACKUP_SEMANTICS = 0x02000000
+FILE_NOTIFY_FILTER = 0x1 | 0x2 | 0x8 | 0x10 | 0x40   # file name, dir name, size, last write, creation
+
+class Win32Backend:
+    """ReadDirectoryChangesW on wallpapers/ (whole subtree) and on the root
+    directory (for app_config.json), each on its own thread."""
+    name = 'ReadDirectoryChangesW'
+
+    def __init__(self, watcher):
+        import ctypes
+        from ctypes import wintypes
+        self.ctypes = ctypes
+        self.kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+        self.kernel32.CreateFileW.restype = wintypes.HANDLE
+        self.kernel32.CreateFileW.argtypes = (wintypes.LPCWSTR, wintypes.DWORD, wintypes.DWORD, wintypes.LPVOID,
+                                              wintypes.DWORD, wintypes.DWORD, wintypes.HANDLE)
+        self.kernel32.ReadDirectoryChangesW.argtypes = (wintypes.HANDLE, wintypes.LPVOID, wintypes.DWORD, wintypes.BOOL,
+                                                        wintypes.DWORD, ctypes.POINTER(wintypes.DWORD),
+                                                        wintypes.LPVOID, wintypes.LPVOID)
+        self.kernel32.CancelIoEx.argtypes = (wintypes.HANDLE, wintypes.LPVOID)
+        self.kernel32.CloseHandle.argtypes = (wintypes.HANDLE,)
+        self.watcher = watcher
+        self.handles = []
+        self.stop_event = threading.Event()
+
+    def _open(self, path):
+        handle = self.kernel32.CreateFileW(path, FILE_LIST_DIRECTORY, FILE_SHARE_ALL, None, OPEN_EXISTING,
+                                           FILE_FLAG_BACKUP_SEMANTICS, None)
+        if handle is None or handle == self.ctypes.c_void_p(-1).value:
+            raise self.ctypes.WinError(self.ctypes.get_last_error())
+        self.handles.append(handle)
+        return handle
+
+    def start(self):
+        watches = [(self._open(self.watcher.root_dir), self.watcher.root_dir, False)]
+        if os.path.isdir(self.watcher.wallpapers_dir):
+            watches.append((self._open(self.watcher.wallpapers_dir), self.watcher.wallpapers_dir, True))
+        for handle, path, subtree in watches:
+            threading.Thread(target=self._run, args=(handle, path, subtree), daemon=True).start()
+
+    def _run(self, handle, base, subtree):
+        from ctypes import wintypes
+        buf = self.ctypes.create_string_buffer(64 * 1024)
+        returned = wintypes.DWORD()
+        while not self.stop_event.is_set():
+            ok = self.kernel32.ReadDirectoryChangesW(handle, buf, len(buf), subtree, FILE_NOTIFY_FILTER,
+                                                     self.ctypes.byref(returned), None, None)
+            if self.stop_event.is_set(): return
+            if not ok:
+                self.stop()
+                self.watcher.fall_back(self.ctypes.WinError(self.ctypes.get_last_error()))
+                return
+            if returned.value == 0:
+                # The kernel buffer overflowed; what changed is unknown.
+                self.watcher.push(None)
+                continue
+            data = buf.raw[:returned.value]
+            offset = 0
+            while True:
+                next_offset, _, length = struct.unpack_from('III', data, offset)
+                name = data[offset + 12:offset + 12 + length].decode('utf-16-le')
+                path = os.path.join(base, name)
+                if subtree or path in (self.watcher.app_config_path, self.watcher.wallpapers_dir):
+                    self.watcher.push(path)
+                if not next_offset: break
+                offset += next_offset
+
+    def stop(self):
+        self.stop_event.set()
+        handles, self.handles = self.handles, []
+        for handle in handles:
+            self.kernel32.CancelIoEx(handle, None)
+            self.kernel32.CloseHandle(handle)
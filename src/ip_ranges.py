@@ -0,0 +1,237 @@
+import os
+import sys
+import mmap
+import array
+import bisect
+import socket
+import struct
+import functools
+import collections
+
+IP_RANGES_DIR = 'ipdb'
+IP_RANGES_FILE = 'ip_ranges.bin'
+
+FILE_MAGIC = b'LWIP'
+FILE_VERSION = 1
+# magic, version, reserved, v4 ranges, v6 ranges, values, value blob bytes
+FILE_HEADER = struct.Struct('<4sHHIIII')
+FILE_HEADER_SIZE = 32
+
+# Column order of the iptoasn.com "ip2asn-combined.tsv" dump.
+DEFAULT_COLUMNS = ('start', 'end', 'asn', 'country', 'org')
+
+IpInfo = collections.namedtuple('IpInfo', 'asn country org')
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+def _v4_key(ip):
+    return int.from_bytes(socket.inet_aton(ip), 'big')
+
+def _v6_key(ip):
+    # Only the routing half of the address is indexed: published ASN/geo
+    # ranges never split a /64.
+    return int.from_bytes(socket.inet_pton(socket.AF_INET6, ip)[:8], 'big')
+
+def _parse_address(text):
+    text = text.strip()
+    if text.isdigit():
+        value = int(text)
+        return (4, value) if value <= 0xFFFFFFFF else (6, value >> 64)
+    if ':' in text:
+        if text.lower().startswith('::ffff:') and '.' in text:
+            return 4, _v4_key(text[7:])
+        return 6, _v6_key(text)
+    return 4, _v4_key(text)
+
+def compile_ranges(source_path, output_path, columns=DEFAULT_COLUMNS):
+    """Compile a CSV/TSV range database into the binary lookup file."""
+    index = {name: i for i, name in enumerate(columns)}
+    ranges = {4: [], 6: []}
+    values, value_ids = [], {}
+    skipped = 0
+
+    with open(source_path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            line = line.rstrip('\r\n')
+            if not line or line.startswith('#'):
+                continue
+            fields = line.split('\t') if '\t' in line else line.split(',')
+            try:
+                family, start = _parse_address(fields[index['start']])
+                end_family, end = _parse_address(fields[index['end']])
+            except (OSError, ValueError, IndexError):
+                skipped += 1
+                continue
+            if family != end_family or end < start:
+                skipped += 1
+                continue
+            asn = fields[index['asn']].strip() if 'asn' in index and len(fields) > index['asn'] else ''
+            if asn in ('0', 'None', 'Not routed'):
+                continue
+            country = fields[index['country']].strip() if 'country' in index and len(fields) > index['country'] else ''
+            org = fields[index['org']].strip().strip('"') if 'org' in index and len(fields) > index['org'] else ''
+            value = f"{asn}\t{country}\t{org}"
+            value_id = value_ids.get(value)
+            if value_id is None:
+                value_id = value_ids[value] = len(values)
+                values.append(value)
+            ranges[family].append((start, end, value_id))
+
+    sections = []
+    for family, code in ((4, 'I'), (6, 'Q')):
+        rows = sorted(ranges[family])
+        merged = []
+        for start, end, value_id in rows:
+            if merged and start <= merged[-1][1]:
+                skipped += 1
+                continue
+            merged.append((start, end, value_id))
+        ranges[family] = merged
+        sections.append(array.array(code, (r[0] for r in merged)))
+        sections.append(array.array(code, (r[1] for r in merged)))
+        sections.append(array.array('I', (r[2] for r in merged)))
+
+    # First v4 range index per /16 prefix, so a lookup only bisects inside
+    # one bucket instead of across the whole table.
+    v4_starts = sections[0]
+    buckets = array.array('I', bytes(4 * 65537))
+    position = 0
+    for prefix in range(65537):
+        bound = prefix << 16
+        while position < len(v4_starts) and v4_starts[position] < bound:
+            position += 1
+        buckets[prefix] = position
+    sections.append(buckets)
+
+    blob = bytearray()
+    offsets = array.array('I', [0])
+    for value in values:
+        blob += value.encode('utf-8')
+        offsets.append(len(blob))
+    sections.append(offsets)
+
+    if sys.byteorder != 'little':
+        for section in sections:
+            section.byteswap()
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    temp_path = output_path + '.tmp'
+    with open(temp_path, 'wb') as out:
+        out.write(FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, 0, len(ranges[4]), len(ranges[6]), len(values), len(blob)))
+        out.write(bytes(FILE_HEADER_SIZE - FILE_HEADER.size))
+        for section in sections:
+            out.write(bytes(_align(out.tell()) - out.tell()))
+            out.write(section.tobytes())
+        out.write(bytes(blob))
+    os.replace(temp_path, output_path)
+    print(f" Compiled {len(ranges[4])} IPv4 and {len(ranges[6])} IPv6 ranges ({len(values)} owners, {skipped} rows skipped) into {output_path}")
+    return len(ranges[4]), len(ranges[6])
+
+class IpRangeIndex:
+    """Memory-mapped sorted range index with an LRU front cache.
+
+    lookup(ip) returns an IpInfo(asn, country, org) or None. Start/end
+    arrays are exposed as memoryview casts over the mapping, so bisect runs
+    over them in C without copying the file into Python objects.
+    """
+
+    def __init__(self, path, cache_size=65536):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, v4_count, v6_count, value_count, blob_len = FILE_HEADER.unpack_from(self.map, 0)
+        if magic != FILE_MAGIC or version != FILE_VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a compiled IP range file")
+
+        view = memoryview(self.map)
+        offset = FILE_HEADER_SIZE
+        def section(code, count):
+            nonlocal offset
+            offset = _align(offset)
+            size = struct.calcsize(code) * count
+            part = view[offset:offset + size]
+            offset += size
+            if sys.byteorder != 'little':
+                swapped = array.array(code, part.tobytes())
+                swapped.byteswap()
+                return swapped
+            return part.cast(code)
+
+        self.v4_starts = section('I', v4_count)
+        self.v4_ends = section('I', v4_count)
+        self.v4_values = section('I', v4_count)
+        self.v6_starts = section('Q', v6_count)
+        self.v6_ends = section('Q', v6_count)
+        self.v6_values = section('I', v6_count)
+        self.v4_buckets = section('I', 65537)
+        self.value_offsets = section('I', value_count + 1)
+        self.blob_offset = offset
+        self.blob_len = blob_len
+        self.values = {}
+        self.lookup = functools.lru_cache(maxsize=cache_size)(self._lookup)
+
+    def _value(self, value_id):
+        info = self.values.get(value_id)
+        if info is None:
+            start = self.blob_offset + self.value_offsets[value_id]
+            end = self.blob_offset + self.value_offsets[value_id + 1]
+            asn, country, org = self.map[start:end].decode('utf-8').split('\t')
+            info = self.values[value_id] = IpInfo(asn, country, org)
+        return info
+
+    def _lookup(self, ip):
+        try:
+            if ':' in ip and not (ip.startswith('::ffff:') and '.' in ip):
+                key = _v6_key(ip)
+                i = bisect.bisect_right(self.v6_starts, key) - 1
+                if i < 0 or key > self.v6_ends[i]:
+                    return None
+                return self._value(self.v6_values[i])
+            key = _v4_key(ip[7:] if ':' in ip else ip)
+        except (OSError, ValueError, TypeError):
+            return None
+        prefix = key >> 16
+        lo = self.v4_buckets[prefix]
+        i = bisect.bisect_right(self.v4_starts, key, lo - 1 if lo else 0, self.v4_buckets[prefix + 1]) - 1
+        if i < 0 or key > self.v4_ends[i]:
+            return None
+        return self._value(self.v4_values[i])
+
+    def close(self):
+        for part in ('v4_starts', 'v4_ends', 'v4_values', 'v6_starts', 'v6_ends', 'v6_values', 'v4_buckets', 'value_offsets'):
+            view = getattr(self, part, None)
+            if isinstance(view, memoryview):
+                view.release()
+        try: self.map.close()
+        except Exception: pass
+        self.file.close()
+
+def load_default_index(root_dir):
+    path = os.path.join(root_dir, IP_RANGES_DIR, IP_RANGES_FILE)
+    if not os.path.isfile(path):
+        return None
+    try:
+        index = IpRangeIndex(path)
+        print(f"Network Monitor: Loaded IP owner database from {path}")
+        return index
+    except Exception as e:
+        print(f"Network Monitor: Could not load IP owner database: {e}")
+        return None
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] != 'compile':
+        print("Usage: python ip_ranges.py compile <ranges.csv|tsv> [output.bin] [--columns start,end,asn,country,org]")
+        sys.exit(1)
+    source = sys.argv[2]
+    output = os.path.join(os.path.dirname(os.path.abspath(__file__)), IP_RANGES_DIR, IP_RANGES_FILE)
+    columns = DEFAULT_COLUMNS
+    rest = sys.argv[3:]
+    if '--columns' in rest:
+        i = rest.index('--columns')
+        columns = tuple(c.strip() for c in rest[i + 1].split(','))
+        rest = rest[:i] + rest[i + 2:]
+    if rest:
+        output = rest[0]
+    compile_ranges(source, output, columns)
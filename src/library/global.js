@@ -453,6 +453,10 @@ const WidgetLoader = {
         };
     },
 
+    escapeHtml(text) {
+        return String(text).replace(/[&<>"']/g, c => ({ '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;' })[c]);
+    },
+
     formatBits(bits, perSecond = false) {
         if (!bits || bits === 0) return '0 ' + (perSecond ? 'bps' : 'b');
         const k = 1000;
@@ -509,7 +513,8 @@ const WidgetLoader = {
                     html += 'IP Address'.padEnd(22) + 'Protocol'.padEnd(10) + 'Type'.padEnd(15) + 'Process\n';
                     data.active_connections.forEach(item => {
                         let ip = (item.ip + ':' + item.port).padEnd(22);
-                        html += `${ip}${item.protocol.padEnd(10)}${item.type.padEnd(15)}${item.process}\n`;
+                        const host = item.hostname ? `  ${item.hostname}` : '';
+                        html += `${ip}${item.protocol.padEnd(10)}${item.type.padEnd(15)}${item.process}${host}\n`;
                     });
                 }
                 activeList.textContent = html;
@@ -528,6 +533,7 @@ const WidgetLoader = {
                             `<span class="ip">${item.ip_port.padEnd(26)}</span>` +
                             `<span class="protocol">${item.protocol.padEnd(10)}</span>` +
                             `<span class="process">${item.process}</span>` +
+                            (item.hostname ? `<span class="hostname">  ${this.escapeHtml(item.hostname)}</span>` : '') +
                             `</div>`;
                     });
                 }
@@ -8,37 +8,61 @@ if sys.stdout is None or sys.stderr is None:
 
     sys.stdout = NullWriter()
     sys.stderr = NullWriter()
+from startup_profiler import StartupProfiler
+STARTUP = StartupProfiler('engine')
+STARTUP.begin('imports')
 import api_config
 import ctypes
 import win32gui
 import win32con
 import win32api
+import win32process
 import http.server
 import socketserver
 import threading
 import socket
 import json
 import time
-import collections
-import datetime
-from port_map import PORT_PROTOCOL_MAP
-import subprocess
-import zlib 
-import base64
-try:
-    from frontend import engine_assets
-    HAS_EMBEDDED_ASSETS = True
-    print("> Loaded high-performance embedded engine assets.")
-except ImportError:
-    HAS_EMBEDDED_ASSETS = False
-    print("> No embedded engine assets found. Running in dev (file-system) mode.")
+import urllib.parse
+from engine_scheduler import EngineScheduler
+from desktop_monitor import create_desktop_monitor, process_name
+from playback_policy import PlaybackPolicy, load_rules, NO_LIMITS, QUALITY_ORDER
+from render_profiles import PROFILE_ORDER, PROFILE_FOR_QUALITY
+from resource_usage import process_tree_memory, memory_delta
+from theme_preloader import ThemePreloader, on_battery, DEFAULT_BUDGET_MB
+from memory_budget import MemoryBudget, MB
+from screen_layout import compute_layout
+from engine_ipc import EngineControlServer
+from config_service import ConfigService, ThemeConfig
+from file_watcher import FileWatcher
+# Mode-specific modules (QtWebEngine, embedded page assets, the network
+# monitor and psutil) are imported on first use; see load_web_stack() and
+# start_global_widgets(). check_import_budget.py keeps it that way.
+network_monitor = None
+engine_assets = None
+HAS_EMBEDDED_ASSETS = False
+WEB_STACK_LOADED = False
+
+if getattr(sys, 'frozen', False):
+    SCRIPT_DIR = os.path.dirname(sys.executable)
+else:
+    SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+print(f"Engine Server Root detected as: {SCRIPT_DIR}")
+
+WALLPAPERS_ROOT_DIR = api_config.WALLPAPERS_DIR
+CONFIG = ConfigService(SCRIPT_DIR)
+APP_CONFIG_PATH = CONFIG.app_config_path
+
+def set_dpi_awareness():
+    try:
+        ctypes.windll.shcore.SetProcessDpiAwareness(2)
+    except: 
+        try: ctypes.windll.user32.SetProcessDPIAware()
+        except: pass
+
 def get_real_screen_scale():
     try:
-        try:
-            ctypes.windll.shcore.SetProcessDpiAwareness(2)
-        except: 
-            try: ctypes.windll.user32.SetProcessDPIAware()
-            except: pass
         shcore = ctypes.windll.shcore
         user32 = ctypes.windll.user32
 
@@ -80,6 +104,7 @@ def get_reliable_windows_id():
                     return cached_id
             except Exception: pass
 
+        import subprocess
         startupinfo = subprocess.STARTUPINFO()
         startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
         startupinfo.wShowWindow = subprocess.SW_HIDE
@@ -112,27 +137,19 @@ def get_reliable_windows_id():
         print(f"[ERROR] Unable to get reliable ID: {e}")
         return "error-generating-id"
 
-current_scale = get_real_screen_scale()
-
-os.environ["QTWEBENGINE_CHROMIUM_FLAGS"] = (
-    f"--force-device-scale-factor={current_scale} "
-    "--high-dpi-support=1 "
-    "--enable-use-zoom-for-dsf=true "
-    "--disable-renderer-backgrounding "
-    "--disable-backgrounding-occluded-windows "
-    "--disable-features=CalculateNativeWinOcclusion"
-    "--autoplay-policy=no-user-gesture-required"
-    "--autoplay-policy=no-user-gesture-required "
-    "--gpu-preference=high-performance " 
-    "--enable-gpu-rasterization "        
-    "--disable-gpu-driver-bug-workarounds " 
-    "--use-angle=d3d11 "
-)
+with STARTUP.phase('theme_probe'):
+    STARTUP_CONFIG = CONFIG.active_theme_config()
+    # LIBREWALL_ENGINE_MODE only forces which imports happen up front (used by
+    # check_import_budget.py); the window still follows the theme.
+    STARTUP_MODE = os.environ.get('LIBREWALL_ENGINE_MODE') or STARTUP_CONFIG.render_mode
+STARTUP.end('imports', mode=STARTUP_MODE)
+set_dpi_awareness()
 
 os.environ["QT_ENABLE_HIGHDPI_SCALING"] = "0"
 os.environ["QT_SCALE_FACTOR"] = "1"
 
-from PyQt6.QtCore import QUrl, Qt, QTimer
+STARTUP.begin('qt_imports')
+from PyQt6.QtCore import QUrl, Qt, QTimer, QObject, QRect, pyqtSignal
 # Fix for flickering issues (Switch from Direct3D11 to OpenGL)
 try:
     from PyQt6.QtQuick import QQuickWindow, QSGRendererInterface
@@ -140,12 +157,48 @@ try:
 except ImportError:
     print("Warning: PyQt6.QtQuick or QSGRendererInterface not found. Skipping graphics API switch.")
 
-from PyQt6.QtWidgets import QApplication, QMainWindow, QMenu, QSystemTrayIcon
+from PyQt6.QtWidgets import QApplication, QMainWindow, QMenu, QSystemTrayIcon, QLabel
 from PyQt6.QtGui import QAction, QIcon
-from PyQt6.QtWebEngineWidgets import QWebEngineView
-
-from PyQt6.QtWebEngineCore import QWebEnginePage, QWebEngineProfile 
-from PyQt6.QtGui import QAction
+STARTUP.end('qt_imports')
+
+def load_web_stack():
+    """Import QtWebEngine and the embedded page assets, which only the web and
+    app modes use. Runs at import time for those modes and on the first hot
+    switch from a video theme otherwise (QApplication is created with
+    AA_ShareOpenGLContexts so WebEngine can still start then)."""
+    global WEB_STACK_LOADED, QWebEngineView, QWebEnginePage, QWebEngineProfile
+    global CustomWebEngineView, AuthWebEnginePage, engine_assets, HAS_EMBEDDED_ASSETS
+    if WEB_STACK_LOADED: return
+    with STARTUP.phase('dpi_probe'):
+        current_scale = get_real_screen_scale()
+
+    os.environ["QTWEBENGINE_CHROMIUM_FLAGS"] = (
+        f"--force-device-scale-factor={current_scale} "
+        "--high-dpi-support=1 "
+        "--enable-use-zoom-for-dsf=true "
+        "--disable-renderer-backgrounding "
+        "--disable-backgrounding-occluded-windows "
+        "--disable-features=CalculateNativeWinOcclusion"
+        "--autoplay-policy=no-user-gesture-required"
+        "--autoplay-policy=no-user-gesture-required "
+        "--gpu-preference=high-performance " 
+        "--enable-gpu-rasterization "        
+        "--disable-gpu-driver-bug-workarounds " 
+        "--use-angle=d3d11 "
+    )
+
+    with STARTUP.phase('webengine_imports'):
+        from PyQt6.QtWebEngineWidgets import QWebEngineView
+        from PyQt6.QtWebEngineCore import QWebEnginePage, QWebEngineProfile
+        try:
+            from frontend import engine_assets
+            HAS_EMBEDDED_ASSETS = True
+            print("> Loaded high-performance embedded engine assets.")
+        except ImportError:
+            HAS_EMBEDDED_ASSETS = False
+            print("> No embedded engine assets found. Running in dev (file-system) mode.")
+    CustomWebEngineView, AuthWebEnginePage = create_web_classes()
+    WEB_STACK_LOADED = True
 
 user32   = ctypes.windll.user32
 kernel32 = ctypes.windll.kernel32
@@ -164,44 +217,71 @@ def check_single_instance(mutex_name=r"Global\librewall_engine"):
         sys.exit(0)
     return True
 
-if getattr(sys, 'frozen', False):
-    SCRIPT_DIR = os.path.dirname(sys.executable)
-else:
-    SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-
-print(f"Engine Server Root detected as: {SCRIPT_DIR}")
-
 HTTP_PORT = api_config.ENGINE_HTTP_PORT
 WS_PORT = api_config.ENGINE_WS_PORT
 
-WALLPAPERS_ROOT_DIR = api_config.WALLPAPERS_DIR
-APP_CONFIG_PATH = os.path.join(SCRIPT_DIR, api_config.APP_CONFIG_FILE)
-
-STATS_LOCK = threading.Lock()
-CURRENT_STATS = {
-    "upload_bps": 0, "download_bps": 0, "total_sent": 0, "total_recv": 0
-}
-TRAFFIC_LOCK = threading.Lock()
-LIVE_TRAFFIC_LOG = collections.deque(maxlen=50) 
-SEEN_CONNECTIONS = set()
-PROCESS_HIDE_LIST = [
-    'librewall.exe', 'engine.exe'
-]
-APP_CONFIG_LOCK = threading.Lock()
+NETWORK_SETTINGS = {}
+ENGINE_SCHEDULER = EngineScheduler()
+DESKTOP_MONITOR_MODE = 'auto'
+PLAYBACK_RULES = None
+BATTERY_SAVER = False
+PLAYBACK_POLICY = None
+DEEP_SUSPEND_SETTINGS = {}
+RENDER_SETTINGS_TIMEOUT = api_config.RENDER_SETTINGS_TIMEOUT
+GLOBAL_WIDGETS_STARTED = False
+PRELOAD_SETTINGS = {}
+SCREEN_LAYOUT = 'primary'
+THEME_PRELOADER = None
+MEMORY_BUDGET = MemoryBudget()
+ENGINE_IPC = None
+FILE_WATCHER = None
+
+def parse_render_settings(data):
+    """Theme settings that can be applied to the running wallpaper in place
+    (see WallpaperWindow.apply_render_settings). Raises ValueError."""
+    if not isinstance(data, dict):
+        raise ValueError("expected a JSON object")
+    settings = {}
+    if 'fpsLimit' in data:
+        settings['fpsLimit'] = max(0, int(data['fpsLimit']))
+    if 'qualityPreset' in data:
+        if data['qualityPreset'] not in QUALITY_ORDER:
+            raise ValueError(f"qualityPreset must be one of {', '.join(QUALITY_ORDER)}")
+        settings['qualityPreset'] = data['qualityPreset']
+    if 'videoProfile' in data:
+        if data['videoProfile'] not in PROFILE_ORDER:
+            raise ValueError(f"videoProfile must be one of {', '.join(PROFILE_ORDER)}")
+        settings['videoProfile'] = data['videoProfile']
+    if 'muteAudio' in data:
+        settings['muteAudio'] = bool(data['muteAudio'])
+    if 'volume' in data:
+        settings['volume'] = min(100, max(0, int(data['volume'])))
+    if not settings:
+        raise ValueError("no live render settings given")
+    return settings
+
+def start_global_widgets(auth_token):
+    """Start the network monitor and its WebSocket server. Runs once per
+    process; a hot switch to a theme with Global Widgets calls it again."""
+    global GLOBAL_WIDGETS_STARTED, network_monitor
+    if GLOBAL_WIDGETS_STARTED: return
+    GLOBAL_WIDGETS_STARTED = True
+    import psutil
+    import network_monitor
+    current_proc_name = psutil.Process(os.getpid()).name()
+    print("Starting Global Widget Threads...")
+    network_monitor.AUTH_TOKEN = auth_token
+    network_monitor.init_monitor(SCRIPT_DIR, current_proc_name, NETWORK_SETTINGS)
+    network_monitor.start_monitor_threads(ENGINE_SCHEDULER, current_proc_name, WS_PORT)
+    try:
+        if CONFIG.app_config().ws_port != WS_PORT:
+            CONFIG.update_app_config(ws_port=WS_PORT)
+    except Exception as e: print(f"Could not record ws_port: {e}")
 
 class MyHandler(http.server.SimpleHTTPRequestHandler):
 
     def get_current_wallpaper_path(self):
-        default_theme = 'defolt'
-        try:
-            with APP_CONFIG_LOCK:
-                with open(APP_CONFIG_PATH, 'r') as f:
-                    app_config = json.load(f)
-                    theme_name = app_config.get('active_theme', default_theme)
-        except Exception as e:
-            print(f"Warning: Could not read 'app_config.json'. Falling back to '{default_theme}'. Error: {e}")
-            theme_name = default_theme
-        return os.path.join(SCRIPT_DIR, WALLPAPERS_ROOT_DIR, theme_name)
+        return CONFIG.active_theme_path()
 
     def do_GET(self):
         clean_path = self.path.split('?')[0] 
@@ -213,19 +293,9 @@ class MyHandler(http.server.SimpleHTTPRequestHandler):
 
             if clean_path == '/':
 
-                config_path = os.path.join(current_wallpaper_path, 'config.json')
-                is_html_render = False
-                target_html_file = 'index.html' 
-
-                try:
-                    if os.path.exists(config_path):
-                        with open(config_path, 'r') as f:
-                            theme_config = json.load(f)
-                            if theme_config.get('htmlrender') is True:
-                                is_html_render = True
-                                target_html_file = theme_config.get('htmlWidgetFile', 'index.html')
-                except Exception as e:
-                    print(f"Error checking theme config for htmlrender: {e}")
+                theme_config = CONFIG.active_theme_config()
+                is_html_render = theme_config.html_render
+                target_html_file = theme_config.html_widget_file
 
                 if is_html_render:
 
@@ -258,16 +328,16 @@ class MyHandler(http.server.SimpleHTTPRequestHandler):
                         return
 
             elif clean_path == '/config':
-                file_path = os.path.join(current_wallpaper_path, 'config.json')
+                # Compiled config: annotation keys stripped, served from the config cache.
                 try:
-                    with open(file_path, 'rb') as f:
-                        self.send_response(200)
-                        self.send_header('Content-type', 'application/json')
-                        self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
-                        self.end_headers()
-                        self.wfile.write(f.read())
-                except FileNotFoundError: self.send_error(404, f"config.json not found.")
-                except Exception as e: self.send_error(500, f"Error reading config: {e}")
+                    payload = CONFIG.theme_config(os.path.basename(current_wallpaper_path)).payload
+                except LookupError: self.send_error(404, f"config.json not found."); return
+                except Exception as e: self.send_error(500, f"Error reading config: {e}"); return
+                self.send_response(200)
+                self.send_header('Content-type', 'application/json')
+                self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
+                self.end_headers()
+                self.wfile.write(payload)
                 return
 
             elif clean_path == '/widget.json':
@@ -315,7 +385,7 @@ class MyHandler(http.server.SimpleHTTPRequestHandler):
             elif clean_path == '/app_config.json':
                 file_path = APP_CONFIG_PATH
                 try:
-                    with APP_CONFIG_LOCK:
+                    with CONFIG.lock:
                         with open(file_path, 'rb') as f:
                             self.send_response(200)
                             self.send_header('Content-type', 'application/json')
@@ -326,13 +396,45 @@ class MyHandler(http.server.SimpleHTTPRequestHandler):
                 except Exception as e: self.send_error(500, f"Error reading app_config: {e}")
                 return
 
+            elif clean_path == '/engine/scheduler':
+                payload = json.dumps(ENGINE_SCHEDULER.snapshot()).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-type', 'application/json')
+                self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
+                self.end_headers()
+                self.wfile.write(payload)
+                return
+
+            elif clean_path == '/engine/policy':
+                if PLAYBACK_POLICY is None:
+                    self.send_error(404, "Playback policy is not running.")
+                    return
+                payload = json.dumps(PLAYBACK_POLICY.snapshot()).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-type', 'application/json')
+                self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
+                self.end_headers()
+                self.wfile.write(payload)
+                return
+
+            elif network_monitor is not None and clean_path in network_monitor.QUERY_ROUTES:
+                try:
+                    params = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+                    payload = json.dumps(network_monitor.QUERY_ROUTES[clean_path](params)).encode('utf-8')
+                    self.send_response(200)
+                    self.send_header('Content-type', 'application/json')
+                    self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
+                    self.end_headers()
+                    self.wfile.write(payload)
+                except LookupError as e: self.send_error(404, str(e))
+                except ValueError as e: self.send_error(400, f"Invalid query: {e}")
+                except Exception as e: self.send_error(500, f"Error querying network monitor: {e}")
+                return
+
             elif clean_path == '/model':
-                config_path = os.path.join(current_wallpaper_path, 'config.json')
                 mime_type = 'model/gltf-binary'
-                model_from_config = None
                 try:
-                    with open(config_path, 'r') as f:
-                        model_from_config = json.load(f).get('modelFile')
+                    model_from_config = CONFIG.theme_config(os.path.basename(current_wallpaper_path)).model_file
                 except Exception as e:
                     self.send_error(500, f"Error reading config.json: {e}")
                     return
@@ -368,6 +470,14 @@ class MyHandler(http.server.SimpleHTTPRequestHandler):
             self.send_error(500, f"Error resolving path: {e}")
             return
 
+        cached = THEME_PRELOADER.lookup(file_path) if THEME_PRELOADER is not None and file_path else None
+        if cached is not None:
+            self.send_response(200)
+            self.send_header('Content-type', mime_type)
+            self.end_headers()
+            self.wfile.write(cached)
+            return
+
         try:
             with open(file_path, 'rb') as f:
                 self.send_response(200)
@@ -394,9 +504,33 @@ def create_handler_class(window_ref, app_ref, port_num, token_from_main):
             self.send_error(403, "Forbidden: Invalid Auth Token"); return False
 
         def do_GET(self):
-            public_paths = ['/', '/reload', '/quit', '/port']
+            public_paths = ['/', '/reload', '/restart', '/quit', '/port', '/engine/status']
+            if self.path.split('?')[0] == '/engine/metrics':
+                if not self.check_auth(): return
+                samples = 'samples=1' in self.path
+                self.send_response(200)
+                self.send_header('Content-type', 'application/json')
+                self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
+                self.end_headers()
+                self.wfile.write(json.dumps(engine_metrics(self.window, samples)).encode('utf-8'))
+                return
+            if self.path == '/engine/suspend':
+                if not self.check_auth(): return
+                self.send_response(200)
+                self.send_header('Content-type', 'application/json')
+                self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
+                self.end_headers()
+                self.wfile.write(json.dumps(self.window.suspend_report).encode('utf-8'))
+                return
             if self.path in public_paths:
                 if self.path == '/reload':
+                    # Hot switch to the active theme in app_config; /restart re-execs the engine.
+                    # The caller just wrote app_config.json; don't wait for the watcher to say so.
+                    CONFIG.invalidate(CONFIG.app_config_path)
+                    self.window.main_thread.invoke(self.window.switch_theme)
+                    self.send_response(200); self.end_headers(); self.wfile.write(b'Switching theme...')
+                    return
+                elif self.path == '/restart':
                     self.app.is_restarting = True
                     QTimer.singleShot(0, self.app.quit)
                     self.send_response(200); self.end_headers(); self.wfile.write(b'Restarting application...')
@@ -412,6 +546,13 @@ def create_handler_class(window_ref, app_ref, port_num, token_from_main):
                     self.end_headers()
                     self.wfile.write(json.dumps({'http_port': self.http_port}).encode('utf-8'))
                     return
+                elif self.path == '/engine/status':
+                    self.send_response(200)
+                    self.send_header('Content-type', 'application/json')
+                    self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
+                    self.end_headers()
+                    self.wfile.write(json.dumps(self.window.status()).encode('utf-8'))
+                    return
                 elif self.path == '/': pass
             else:
                 if not self.check_auth(): return
@@ -419,6 +560,36 @@ def create_handler_class(window_ref, app_ref, port_num, token_from_main):
 
         def do_POST(self):
             if not self.check_auth(): return
+            if self.path == '/apply_render_settings':
+                # Same as the reload_settings IPC command, for authenticated HTTP clients.
+                started = time.perf_counter()
+                try:
+                    content_length = int(self.headers['Content-Length'])
+                    settings = parse_render_settings(json.loads(self.rfile.read(content_length)))
+                except Exception as e:
+                    self.send_error(400, f"Bad render settings: {e}")
+                    return
+                result = apply_render_settings_sync(self.window, settings, started)
+                self.send_response(200)
+                self.send_header('Content-type', 'application/json')
+                self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
+                self.end_headers()
+                self.wfile.write(json.dumps(result).encode('utf-8'))
+                return
+            if self.path == '/preload_theme':
+                try:
+                    content_length = int(self.headers['Content-Length'])
+                    report = preload_theme(self.window, json.loads(self.rfile.read(content_length)).get('themeId'))
+                except LookupError as e:
+                    self.send_error(404, str(e)); return
+                except Exception as e:
+                    self.send_error(400, f"Bad preload request: {e}"); return
+                self.send_response(200)
+                self.send_header('Content-type', 'application/json')
+                self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
+                self.end_headers()
+                self.wfile.write(json.dumps(report).encode('utf-8'))
+                return
             if self.path == '/save_widget_positions':
                 try:
                     content_length = int(self.headers['Content-Length'])
@@ -458,6 +629,83 @@ def create_handler_class(window_ref, app_ref, port_num, token_from_main):
             self.send_error(404, "Not Found")
     return CustomHandler
 
+def apply_render_settings_sync(window, settings, started):
+    """Apply parsed render settings on the main thread and wait for the report."""
+    finished = threading.Event()
+    result = {}
+    def done(report):
+        result.update(report)
+        finished.set()
+    window.main_thread.invoke(lambda: window.apply_render_settings(settings, started, done))
+    if not finished.wait(RENDER_SETTINGS_TIMEOUT):
+        return {"live": False, "error": "timed out waiting for the wallpaper"}
+    return result
+
+def preload_theme(window, theme_id):
+    """Warm theme_id's assets for a quick switch; the IPC "preload_theme" command and /preload_theme."""
+    if THEME_PRELOADER is None:
+        return {"state": "disabled"}
+    if window.is_paused:
+        return {"state": "refused", "reason": "wallpaper paused"}
+    if on_battery():
+        return {"state": "refused", "reason": "on battery"}
+    return THEME_PRELOADER.warm(str(theme_id or ''))
+
+def publish_event(event, data=None):
+    if ENGINE_IPC is not None:
+        ENGINE_IPC.publish(event, data)
+
+def create_control_commands(window):
+    """Commands served on the engine_ipc control channel."""
+    def ping(args):
+        return {"pid": os.getpid()}
+
+    def activate_theme(args):
+        theme = str(args.get('theme') or '')
+        CONFIG.theme_config(theme)
+        if CONFIG.app_config().active_theme != theme:
+            CONFIG.update_app_config(active_theme=theme)
+        window.main_thread.invoke(window.switch_theme)
+        return {"state": "switching", "theme": theme}
+
+    def reload_settings(args):
+        started = time.perf_counter()
+        return apply_render_settings_sync(window, parse_render_settings(args.get('settings')), started)
+
+    def pause(args):
+        paused = args.get('paused')
+        if not isinstance(paused, bool):
+            raise ValueError("'paused' must be true or false")
+        if paused:
+            window.main_thread.invoke(lambda: window.pause_wallpaper("launcher"))
+        else:
+            window.main_thread.invoke(lambda: window.resume_wallpaper("launcher"))
+        return {"paused": paused}
+
+    return {
+        "ping": ping, "status": lambda args: window.status(), "activate_theme": activate_theme,
+        "reload_settings": reload_settings, "pause": pause,
+        "preload_theme": lambda args: preload_theme(window, args.get('theme')),
+        "metrics": lambda args: engine_metrics(window, samples=bool(args.get('samples')))
+    }
+
+def engine_metrics(window, samples=False):
+    """Everything the engine measures about itself; the IPC "metrics" command and /engine/metrics."""
+    try: memory = process_tree_memory()
+    except Exception: memory = None
+    video = window.video_widget
+    return {
+        "scheduler": ENGINE_SCHEDULER.snapshot(),
+        "policy": PLAYBACK_POLICY.snapshot() if PLAYBACK_POLICY is not None else None,
+        "memory": memory,
+        "suspend": window.suspend_report,
+        "preload": THEME_PRELOADER.snapshot() if THEME_PRELOADER is not None else None,
+        "file_watcher": FILE_WATCHER.snapshot() if FILE_WATCHER is not None else None,
+        "memory_budget": MEMORY_BUDGET.snapshot(),
+        "video_cache": video.cache_report() if video is not None else None,
+        "video_telemetry": video.telemetry_report(samples) if video is not None else None
+    }
+
 def start_server(port, handler_class):
     server = socketserver.ThreadingTCPServer(("localhost", port), handler_class)
     server_thread = threading.Thread(target=server.serve_forever)
@@ -465,47 +713,69 @@ def start_server(port, handler_class):
     server_thread.start()
     print(f"Internal HTTP server running at http://localhost:{port}")
 
-class CustomWebEngineView(QWebEngineView):
-    def __init__(self, window):
-        super().__init__()
-        self.window = window
-        self.context_menu = QMenu(self)
-        reload_action = self.context_menu.addAction("Reload Wallpaper")
-        self.context_menu.addSeparator()
-        self.pause_action = self.context_menu.addAction("Pause Wallpaper")
-        self.resume_action = self.context_menu.addAction("Resume Wallpaper")
-        self.context_menu.addSeparator()
+class MainThreadInvoker(QObject):
+    """Runs callables handed over from worker threads on the Qt main thread."""
+    invoke_requested = pyqtSignal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.invoke_requested.connect(self._run, Qt.ConnectionType.QueuedConnection)
+
+    def _run(self, func):
+        func()
+
+    def invoke(self, func):
+        self.invoke_requested.emit(func)
+
+def create_web_classes():
+    """Browser classes for the web and app modes; built by load_web_stack()
+    once QtWebEngine is imported."""
+    class CustomWebEngineView(QWebEngineView):
+        def __init__(self, window):
+            super().__init__()
+            self.window = window
+            self.context_menu = QMenu(self)
+            reload_action = self.context_menu.addAction("Reload Wallpaper")
+            self.context_menu.addSeparator()
+            self.pause_action = self.context_menu.addAction("Pause Wallpaper")
+            self.resume_action = self.context_menu.addAction("Resume Wallpaper")
+            self.context_menu.addSeparator()
         
-        # Only show Edit Widgets if Global Widgets are enabled and not in Video Mode (implied by this class usage)
-        if self.window.enable_global_widget:
-            edit_widgets_action = self.context_menu.addAction("Edit Widgets")
-            edit_widgets_action.triggered.connect(self.toggle_edit_mode)
+            # Only show Edit Widgets if Global Widgets are enabled and not in Video Mode (implied by this class usage)
+            self.edit_widgets_action = self.context_menu.addAction("Edit Widgets")
+            self.edit_widgets_action.triggered.connect(self.toggle_edit_mode)
             
-        reload_action.triggered.connect(self.reload_page)
-        self.pause_action.triggered.connect(self.window.pause_wallpaper)
-        self.resume_action.triggered.connect(self.window.resume_wallpaper)
+            reload_action.triggered.connect(self.reload_page)
+            self.pause_action.triggered.connect(self.window.pause_wallpaper)
+            self.resume_action.triggered.connect(self.window.resume_wallpaper)
 
-    def contextMenuEvent(self, event):
-        if self.window.is_paused:
-            self.pause_action.setEnabled(False); self.resume_action.setEnabled(True)
-        else:
-            self.pause_action.setEnabled(True); self.resume_action.setEnabled(False)
-        self.context_menu.exec(event.globalPos())
-    def toggle_edit_mode(self):
-        print("Context menu: Triggering Edit Mode")
-        self.page().runJavaScript("if (typeof window.enterEditMode === 'function') { window.enterEditMode(); }")
-    def reload_page(self): 
-        print("Context menu reload: Triggering app restart.")
-        self.window.app.is_restarting = True
-        QTimer.singleShot(0, self.window.app.quit)
+        def contextMenuEvent(self, event):
+            if self.window.is_paused:
+                self.pause_action.setEnabled(False); self.resume_action.setEnabled(True)
+            else:
+                self.pause_action.setEnabled(True); self.resume_action.setEnabled(False)
+            # A hot theme switch can turn Global Widgets on or off.
+            self.edit_widgets_action.setVisible(self.window.enable_global_widget)
+            self.context_menu.exec(event.globalPos())
+        def toggle_edit_mode(self):
+            print("Context menu: Triggering Edit Mode")
+            self.page().runJavaScript("if (typeof window.enterEditMode === 'function') { window.enterEditMode(); }")
+        def reload_page(self): 
+            print("Context menu reload: Reloading theme in place.")
+            QTimer.singleShot(0, self.window.switch_theme)
+
+    class AuthWebEnginePage(QWebEnginePage):
 
-class AuthWebEnginePage(QWebEnginePage):
+        def __init__(self, profile, parent, user_agent):
+            super().__init__(profile, parent) 
 
-    def __init__(self, profile, parent, user_agent):
-        super().__init__(profile, parent) 
+            print("Setting custom User-Agent for browser...")
+            self.profile().setHttpUserAgent(user_agent)
 
-        print("Setting custom User-Agent for browser...")
-        self.profile().setHttpUserAgent(user_agent)
+    return CustomWebEngineView, AuthWebEnginePage
+
+if STARTUP_MODE != 'video':
+    load_web_stack()
 
 class WallpaperWindow(QMainWindow):
     def __init__(self, app_ref, url, auth_token, enable_global_widget=False): 
@@ -517,93 +787,170 @@ class WallpaperWindow(QMainWindow):
         self.enable_global_widget = enable_global_widget
 
         self.device_id = None
+        self.url = url
+        self.auth_token = auth_token
+        self.video_widget = None
+        self.browser = None
+        self.web_profile = None
+        self.theme_path = None
+        self.surface_ready = False
+        self.switch_generation = 0
+        self.switch_started = None
+        self.switch_report = None
+        self.screens = []
+        # Playback and suspend state; build_surface() below already reads it.
+        self.main_thread = MainThreadInvoker(self)
+        self.playback_decision = None
+        self.foreground_process = (None, None)
+        self.fullscreen_check_error = None
+        suspend = {"enabled": True, "delay_seconds": 300}
+        if isinstance(DEEP_SUSPEND_SETTINGS, dict): suspend.update(DEEP_SUSPEND_SETTINGS)
+        self.deep_suspend_delay = max(5, float(suspend["delay_seconds"])) if suspend.get("enabled") else None
+        self.deep_suspended = False
+        self.restoring = False
+        self.restore_generation = 0
+        # A discarded page reloaded hidden behind the still: None, 'loading' or 'ready'.
+        self.prewarm_state = None
+        self.last_fullscreen = False
+        self.still_label = None
+        self.suspend_memory = None
+        self.suspend_report = {"state": "live"}
+        self.render_settings_report = None
+        self.suspend_timer = QTimer(self)
+        self.suspend_timer.setSingleShot(True)
+        self.suspend_timer.timeout.connect(self.enter_deep_suspend)
+
+        self.build_surface(MyHandler.get_current_wallpaper_path(None))
 
+        self.setWindowFlags(Qt.WindowType.FramelessWindowHint)
+        self.window_handle = int(self.winId())
+        self.update_geometry()
+        self.show()
+        self.app.screenAdded.connect(self.on_screens_changed)
+        self.app.screenRemoved.connect(self.on_screens_changed)
+        self.app.primaryScreenChanged.connect(self.on_screens_changed)
 
-        active_theme_path = MyHandler.get_current_wallpaper_path(None)
-        theme_config_path = os.path.join(active_theme_path, 'config.json')
-
-        use_video = False
-        video_file = None
-        fps_limit = 60
-        mute_audio = True
+        QTimer.singleShot(100, self.setup_window_layer)
+        self.check_timer = QTimer(self)
+        self.check_timer.timeout.connect(self.check_fullscreen)
+        PLAYBACK_POLICY.on_change(lambda _: self.main_thread.invoke(lambda: self.apply_playback_decision(PLAYBACK_POLICY.decision)))
+        self.desktop_monitor = create_desktop_monitor([self.window_handle]) if DESKTOP_MONITOR_MODE != 'poll' else None
+        if self.desktop_monitor is not None:
+            self.desktop_monitor.on_change(self.on_desktop_event)
+            self.desktop_monitor.start()
+        else:
+            self.check_timer.start(2000)
 
-        if os.path.exists(theme_config_path):
-            try:
-                with open(theme_config_path, 'r') as f:
-                    config = json.load(f)
-
-                    if config.get('videorender') is True:
-                        use_video = True
-                        video_file = config.get('media')
-                        fps_limit = config.get('fpsLimit', 60)
-                        mute_audio = config.get('muteAudio', True)
-                        volume = config.get('volume', 70)
-
-                    if config.get('htmlrender') is True:
-                        self.is_app_mode = True
-                        print("Mode: App/Widget (Respecting Taskbar)")
-                        self.device_id = get_reliable_windows_id()
-                        print(f"App Mode Detected. ID Generated: {self.device_id}")
-
-            except Exception as e: print(f"Config Read Error: {e}")
-
-        if use_video and video_file:
-            print(f"Mode: Native Video Engine (MPV) [FPS: {fps_limit}, Mute: {mute_audio}]")
+    def read_theme_config(self, theme_path):
+        theme_id = os.path.basename(theme_path)
+        try:
+            return CONFIG.theme_config(theme_id)
+        except Exception as e:
+            print(f"Config Read Error: {e}")
+            return ThemeConfig(theme_id=theme_id)
+
+    def build_surface(self, theme_path):
+        """Point the window at the theme in theme_path, creating the mpv widget or
+        the browser on first use and reusing them (and the web profile) after."""
+        config = self.read_theme_config(theme_path)
+        self.theme_path = theme_path
+        self.surface_ready = False
+        self.is_app_mode = config.html_render
+        if self.is_app_mode:
+            print("Mode: App/Widget (Respecting Taskbar)")
+            if self.device_id is None:
+                with STARTUP.phase('device_id'):
+                    self.device_id = get_reliable_windows_id()
+                print(f"App Mode Detected. ID Generated: {self.device_id}")
+
+        video_file = config.media if config.render_mode == 'video' else None
+        if video_file:
+            fps_limit = config.fps_limit
+            mute_audio = config.mute_audio
+            volume = config.volume
+            render_profile = config.render_profile
+            print(f"Mode: Native Video Engine (MPV) [FPS: {fps_limit}, Mute: {mute_audio}, Profile: {render_profile}]")
             self.is_video_mode = True
-            full_video_path = os.path.join(active_theme_path, video_file)
-
-            from video_widget import NativeVideoWidget
-
-            self.video_widget = NativeVideoWidget(
-                full_video_path, 
-                self, 
-                fps_limit=fps_limit, 
-                mute_audio=mute_audio,
-                volume=volume
-            )
-            self.setCentralWidget(self.video_widget)
+            full_video_path = os.path.join(theme_path, video_file)
+            if self.browser is not None:
+                # Drop the old scene; the view, page and profile stay for the next web theme.
+                self.browser.setUrl(QUrl("about:blank"))
+            if self.video_widget is None:
+                from video_widget import NativeVideoWidget
+                self.video_widget = NativeVideoWidget(
+                    full_video_path,
+                    self,
+                    fps_limit=fps_limit,
+                    mute_audio=mute_audio,
+                    volume=volume,
+                    render_profile=render_profile,
+                    memory_budget=MEMORY_BUDGET
+                )
+                if self.playback_decision is not None:
+                    self.video_widget.set_profile_cap(PROFILE_FOR_QUALITY.get(self.playback_decision.quality))
+            else:
+                self.video_widget.load(full_video_path, fps_limit=fps_limit, mute_audio=mute_audio, volume=volume,
+                                       render_profile=render_profile)
+            self.video_widget.set_paused(self.is_paused)
+            ENGINE_SCHEDULER.wake('video_telemetry')
+            self.show_surface(self.video_widget)
+            self.surface_ready = True
+            # Deferred to the event loop so the rest of startup lands in the trace.
+            QTimer.singleShot(0, lambda: STARTUP.finish(SCRIPT_DIR, mode=self.surface_mode(), theme=os.path.basename(theme_path)))
         else:
             if not self.is_app_mode:
                 print("Mode: Web Engine (Full Screen)")
-
             self.is_video_mode = False
-            self.browser = CustomWebEngineView(self)
-
-            storage_path = os.path.join(SCRIPT_DIR, "browser_data")
-            if not os.path.exists(storage_path):
-                try: os.makedirs(storage_path)
-                except: pass
-            self.web_profile = QWebEngineProfile("LibrewallProfile", self)
-            self.web_profile.setPersistentStoragePath(storage_path)
-            self.web_profile.setCachePath(storage_path)
-            self.web_profile.setPersistentCookiesPolicy(
-                QWebEngineProfile.PersistentCookiesPolicy.ForcePersistentCookies
-            )
-
-            self.auth_page = AuthWebEnginePage(self.web_profile, self.browser, auth_token)
-            self.browser.setPage(self.auth_page)
-            self.browser.loadFinished.connect(self.on_load_finished)
-            self.browser.setUrl(QUrl(url))
-            self.browser.setStyleSheet("background-color: black;") 
-            self.setStyleSheet("background-color: black;")
-            self.setCentralWidget(self.browser)
-
-        self.setWindowFlags(Qt.WindowType.FramelessWindowHint)
-        self.window_handle = int(self.winId())
-
+            if self.video_widget is not None:
+                self.video_widget.release()
+            if self.browser is None:
+                self.create_browser()
+            self.show_surface(self.browser)
+            self.browser.setUrl(QUrl(self.url))
+
+    def create_browser(self):
+        load_web_stack()
+        self.browser = CustomWebEngineView(self)
+
+        storage_path = os.path.join(SCRIPT_DIR, "browser_data")
+        if not os.path.exists(storage_path):
+            try: os.makedirs(storage_path)
+            except: pass
+        self.web_profile = QWebEngineProfile("LibrewallProfile", self)
+        self.web_profile.setPersistentStoragePath(storage_path)
+        self.web_profile.setCachePath(storage_path)
+        self.web_profile.setPersistentCookiesPolicy(
+            QWebEngineProfile.PersistentCookiesPolicy.ForcePersistentCookies
+        )
+
+        self.auth_page = AuthWebEnginePage(self.web_profile, self.browser, self.auth_token)
+        self.browser.setPage(self.auth_page)
+        self.browser.loadFinished.connect(self.on_load_finished)
+        self.browser.setStyleSheet("background-color: black;") 
+        self.setStyleSheet("background-color: black;")
+
+    def show_surface(self, widget):
+        current = self.centralWidget()
+        if current is not widget:
+            if current is not None:
+                # takeCentralWidget() keeps the old surface alive for the next switch.
+                self.takeCentralWidget()
+                current.hide()
+            self.setCentralWidget(widget)
+        widget.show()
+
+    def update_geometry(self):
         screen = self.app.primaryScreen()
-
-        if self.is_app_mode:
-
-            self.rect = screen.availableGeometry()
-        else:
-
-            self.rect = screen.geometry()
+        others = [s for s in self.app.screens() if s is not screen]
+        # App mode keeps to the primary screen's work area.
+        layout = 'primary' if self.is_app_mode else SCREEN_LAYOUT
+        (x, y, width, height), self.screens = compute_layout(screen, others, layout, available=self.is_app_mode)
+        self.rect = QRect(x, y, width, height)
 
         self.screen_width = self.rect.width()
         self.screen_height = self.rect.height()
 
-        if not self.is_app_mode:
+        if not self.is_app_mode and len(self.screens) == 1:
             try:
                  hDC = user32.GetDC(0)
                  phy_w = user32.GetDeviceCaps(hDC, 118); phy_h = user32.GetDeviceCaps(hDC, 117) 
@@ -613,17 +960,121 @@ class WallpaperWindow(QMainWindow):
 
                  self.rect.setWidth(self.screen_width)
                  self.rect.setHeight(self.screen_height)
+                 self.screens[0].update(width=self.screen_width, height=self.screen_height)
             except: pass
 
         self.setGeometry(self.rect)
-        self.show()
+        self.apply_screen_layout()
 
+    def apply_screen_layout(self):
+        mode = SCREEN_LAYOUT if len(self.screens) > 1 else 'primary'
+        if self.is_video_mode:
+            self.video_widget.set_screen_layout(mode, self.screens, self.rect.width(), self.rect.height())
+        elif self.browser is not None:
+            layout = json.dumps({"mode": mode, "screens": self.screens})
+            self.browser.page().runJavaScript(f"if (window.applyScreenLayout) applyScreenLayout({layout});")
+
+    def on_screens_changed(self, *args):
+        print(f"Screens changed: {len(self.app.screens())} connected")
+        self.update_geometry()
         QTimer.singleShot(100, self.setup_window_layer)
-        self.check_timer = QTimer(self)
-        self.check_timer.timeout.connect(self.check_fullscreen)
-        self.check_timer.start(2000)
+
+    def switch_theme(self):
+        """Hot theme switch: load the active theme from app_config into this
+        window, keeping the process, HTTP server, web profile and monitors.
+        Falls back to a full restart if the new surface cannot be built."""
+        self.switch_started = time.perf_counter()
+        self.switch_generation += 1
+        theme_path = MyHandler.get_current_wallpaper_path(None)
+        print(f"Switching theme to {os.path.basename(theme_path)}")
+        was_app_mode = self.is_app_mode
+        self.suspend_timer.stop()
+        if self.deep_suspended or self.restoring:
+            self.deep_suspended = False
+            self.restoring = False
+            self.prewarm_state = None
+            self.restore_generation += 1
+            if not self.is_video_mode:
+                self.browser.page().setLifecycleState(QWebEnginePage.LifecycleState.Active)
+            if self.still_label is not None:
+                self.still_label.hide()
+                self.still_label.clear()
+            self.suspend_report = {"state": "live"}
+        try:
+            config = self.read_theme_config(theme_path)
+            self.enable_global_widget = config.wants_global_widgets
+            if self.enable_global_widget:
+                start_global_widgets(self.auth_token)
+            self.build_surface(theme_path)
+        except Exception as e:
+            print(f"Theme switch failed, restarting engine: {e}")
+            self.app.is_restarting = True
+            QTimer.singleShot(0, self.app.quit)
+            return
+        if self.is_app_mode != was_app_mode:
+            self.update_geometry()
+        else:
+            self.apply_screen_layout()
+        QTimer.singleShot(100, self.setup_window_layer)
+        if self.is_paused and self.deep_suspend_delay is not None:
+            self.suspend_timer.start(int(self.deep_suspend_delay * 1000))
+        self.switch_report = {
+            "theme": os.path.basename(theme_path),
+            "mode": self.surface_mode(),
+            "generation": self.switch_generation,
+            "build_ms": round((time.perf_counter() - self.switch_started) * 1000, 1),
+            "ready_ms": None
+        }
+        if self.surface_ready:
+            self.finish_switch()
+
+    def finish_switch(self):
+        if self.switch_report is None or self.switch_report["ready_ms"] is not None: return
+        self.switch_report["ready_ms"] = round((time.perf_counter() - self.switch_started) * 1000, 1)
+        print(f"Theme Switch: {self.switch_report['theme']} ({self.switch_report['mode']}) ready in {self.switch_report['ready_ms']:.0f} ms")
+        publish_event("theme", dict(self.switch_report))
+        if THEME_PRELOADER is not None:
+            # The page keeps fetching the model and media after loadFinished.
+            QTimer.singleShot(10000, lambda theme=self.switch_report['theme']: THEME_PRELOADER.release(theme))
+
+    def surface_mode(self):
+        if self.is_video_mode: return "video"
+        return "app" if self.is_app_mode else "web"
+
+    def status(self):
+        return {
+            "pid": os.getpid(),
+            "theme": os.path.basename(self.theme_path) if self.theme_path else None,
+            "mode": self.surface_mode(),
+            "ready": self.surface_ready,
+            "paused": self.is_paused,
+            "generation": self.switch_generation,
+            "switch": self.switch_report,
+            "render_settings": self.render_settings_report,
+            "render_profile": self.video_widget.effective_profile() if self.is_video_mode else None,
+            "video_cache": self.video_widget.cache_report() if self.is_video_mode else None,
+            "suspend": self.suspend_report,
+            "preload": THEME_PRELOADER.snapshot() if THEME_PRELOADER is not None else None,
+            "screen_layout": SCREEN_LAYOUT if len(self.screens) > 1 else 'primary',
+            "screens": self.screens
+        }
 
     def on_load_finished(self, ok):
+        if self.is_video_mode: return
+        if ok and not self.restoring and not self.deep_suspended:
+            self.surface_ready = True
+            STARTUP.finish(SCRIPT_DIR, mode=self.surface_mode(), theme=os.path.basename(self.theme_path))
+            self.finish_switch()
+            if self.is_paused:
+                self.browser.page().runJavaScript("if (window.pauseAnimation) pauseAnimation();")
+        if self.restoring:
+            self.browser.show()
+            QTimer.singleShot(150, lambda gen=self.restore_generation: self.finish_restore(gen))
+        elif self.deep_suspended and self.prewarm_state == 'loading':
+            # Still paused; hold the first frame until resume reveals it.
+            self.prewarm_state = 'ready' if ok else None
+            self.browser.page().runJavaScript("if (window.pauseAnimation) pauseAnimation();")
+            print(f"Deep Suspend: Page prewarmed in {(time.perf_counter() - self.prewarm_started) * 1000:.0f} ms")
 
         if self.is_app_mode and ok and self.device_id:
             js_code = f'window.deviceid = "{self.device_id}";'
@@ -656,24 +1107,153 @@ class WallpaperWindow(QMainWindow):
             })();
             """
             self.browser.page().runJavaScript(js_patch)
+        if ok and not self.is_video_mode and self.playback_decision is not None:
+            self.apply_render_limits()
+        if ok and len(self.screens) > 1:
+            self.apply_screen_layout()
 
-    def pause_wallpaper(self):
+    def pause_wallpaper(self, reason=None):
         if not self.is_paused:
-            print("Status: Paused ⏸️")
+            print(f"Status: Paused ⏸️ ({reason})" if reason else "Status: Paused ⏸️")
             self.is_paused = True
+            ENGINE_SCHEDULER.set_paused(True, reason or "manual")
             if self.is_video_mode:
                 self.video_widget.set_paused(True)
             else:
                 self.browser.page().runJavaScript("pauseAnimation();")
-    def resume_wallpaper(self):
+            if self.deep_suspend_delay is not None:
+                self.suspend_timer.start(int(self.deep_suspend_delay * 1000))
+            publish_event("paused", {"paused": True, "reason": reason or "manual"})
+    def resume_wallpaper(self, reason=None):
         if self.is_paused:
-            print("Status: Live ▶️")
+            print(f"Status: Live ▶️ ({reason})" if reason else "Status: Live ▶️")
             self.is_paused = False
-            if self.is_video_mode:
+            ENGINE_SCHEDULER.set_paused(False)
+            self.suspend_timer.stop()
+            if self.deep_suspended:
+                self.leave_deep_suspend()
+            elif self.is_video_mode:
                 self.video_widget.set_paused(False)
             else:
                 self.browser.page().runJavaScript("resumeAnimation();")
             self.show(); QTimer.singleShot(50, self.setup_window_layer)
+            publish_event("paused", {"paused": False, "reason": reason or "manual"})
+
+    def show_still(self, pixmap):
+        if self.still_label is None:
+            self.still_label = QLabel(self)
+            self.still_label.setStyleSheet("background-color: black;")
+            self.still_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.still_label.setGeometry(0, 0, self.width(), self.height())
+        if pixmap is not None and not pixmap.isNull():
+            self.still_label.setPixmap(pixmap.scaled(
+                self.still_label.size(), Qt.AspectRatioMode.IgnoreAspectRatio, Qt.TransformationMode.SmoothTransformation
+            ))
+        self.still_label.show()
+        self.still_label.raise_()
+
+    def enter_deep_suspend(self):
+        """Second pause tier: swap the renderer for a still frame and free it."""
+        if self.deep_suspended and self.prewarm_state is not None:
+            # Prewarmed, but the resume never came; free the page again.
+            self.drop_prewarm()
+            return
+        if not self.is_paused or self.deep_suspended: return
+        try: before = process_tree_memory()
+        except Exception: before = None
+        if self.is_video_mode:
+            # The poster stays up until mpv plays again from the same position.
+            self.show_still(self.video_widget.suspend())
+            self.video_widget.hide()
+        else:
+            self.show_still(self.browser.grab())
+            self.browser.hide()
+            # A discarded page drops its renderer process, GPU textures and JS heap;
+            # setting it Active again reloads the same URL.
+            self.browser.page().setLifecycleState(QWebEnginePage.LifecycleState.Discarded)
+        self.deep_suspended = True
+        self.suspend_memory = before
+        self.suspend_report = {"state": "suspended", "suspended_at": time.time()}
+        if self.is_video_mode and self.video_widget.suspend_info:
+            self.suspend_report["video"] = dict(self.video_widget.suspend_info)
+        print(f"Status: Deep suspend 💤 (paused for {self.deep_suspend_delay:.0f}s)")
+        publish_event("suspend", dict(self.suspend_report))
+        if before is not None:
+            QTimer.singleShot(3000, self.measure_suspend_savings)
+
+    def measure_suspend_savings(self):
+        if not self.deep_suspended or self.suspend_memory is None: return
+        try: reclaimed = memory_delta(self.suspend_memory, process_tree_memory())
+        except Exception: return
+        self.suspend_report.update({
+            "rss_reclaimed_mb": round(reclaimed["rss"] / 1048576, 1),
+            "vram_reclaimed_mb": None if reclaimed["vram"] is None else round(reclaimed["vram"] / 1048576, 1),
+            "processes_closed": reclaimed["processes"]
+        })
+        vram = "n/a" if reclaimed["vram"] is None else f"{reclaimed['vram'] / 1048576:.1f} MB"
+        print(f"Deep Suspend: Reclaimed {reclaimed['rss'] / 1048576:.1f} MB RSS, VRAM {vram}, {reclaimed['processes']} helper process(es) closed")
+
+    def leave_deep_suspend(self):
+        self.deep_suspended = False
+        self.restoring = True
+        self.restore_generation += 1
+        self.restore_started = time.perf_counter()
+        generation = self.restore_generation
+        if self.is_video_mode:
+            self.video_widget.set_paused(False)
+            self.video_widget.resume(on_ready=lambda ms: self.main_thread.invoke(lambda: self.finish_restore(generation, ms)))
+            self.video_widget.show()
+            # In case mpv never reports playback (missing file, broken libmpv).
+            QTimer.singleShot(5000, lambda: self.finish_restore(generation))
+        elif self.prewarm_state == 'ready':
+            self.suspend_report["prewarmed"] = True
+            self.browser.page().runJavaScript("if (window.resumeAnimation) resumeAnimation();")
+            self.browser.show()
+            self.finish_restore(generation)
+        else:
+            # The page reloads (or is still prewarming) behind the still and is
+            # revealed from on_load_finished.
+            self.suspend_report["prewarmed"] = self.prewarm_state == 'loading'
+            if self.prewarm_state is None:
+                self.browser.page().setLifecycleState(QWebEnginePage.LifecycleState.Active)
+            QTimer.singleShot(5000, lambda: self.finish_restore(generation))
+        self.prewarm_state = None
+
+    def update_prewarm(self, fullscreen):
+        """Reload a discarded page hidden behind the still as soon as the
+        fullscreen app that paused it goes away, so the resume that follows
+        only has to reveal it. Dropped again if a fullscreen app comes back."""
+        was_fullscreen, self.last_fullscreen = self.last_fullscreen, fullscreen
+        if not self.deep_suspended or self.is_video_mode: return
+        if fullscreen and self.prewarm_state is not None:
+            self.drop_prewarm()
+        elif was_fullscreen and not fullscreen and self.prewarm_state is None:
+            self.prewarm_state = 'loading'
+            self.prewarm_started = time.perf_counter()
+            self.browser.page().setLifecycleState(QWebEnginePage.LifecycleState.Active)
+            # Freed again if no resume follows within the suspend delay.
+            if self.deep_suspend_delay is not None:
+                self.suspend_timer.start(int(self.deep_suspend_delay * 1000))
+
+    def drop_prewarm(self):
+        self.prewarm_state = None
+        self.suspend_timer.stop()
+        self.browser.page().setLifecycleState(QWebEnginePage.LifecycleState.Discarded)
+
+    def finish_restore(self, generation, first_frame_ms=None):
+        if not self.restoring or generation != self.restore_generation: return
+        self.restoring = False
+        if not self.is_video_mode: self.browser.show()
+        if self.still_label is not None:
+            self.still_label.hide()
+            self.still_label.clear()
+        restore_ms = (time.perf_counter() - self.restore_started) * 1000
+        self.suspend_report.update({"state": "live", "restore_ms": round(restore_ms, 1)})
+        if self.is_video_mode:
+            # None means the 5 s fallback fired before mpv reported playback.
+            self.suspend_report["first_frame_ms"] = None if first_frame_ms is None else round(first_frame_ms, 1)
+        print(f"Deep Suspend: Restored in {restore_ms:.0f} ms")
+        publish_event("suspend", dict(self.suspend_report))
 
     def setup_window_layer(self):
         try:
@@ -698,10 +1278,14 @@ class WallpaperWindow(QMainWindow):
                 print(f"Attaching to Desktop (WorkerW: {workerw})")
                 win32gui.SetParent(self.window_handle, workerw)
 
+                # WorkerW spans the virtual desktop, whose origin is left/above
+                # the primary screen when another monitor sits there.
+                origin_x = win32api.GetSystemMetrics(win32con.SM_XVIRTUALSCREEN)
+                origin_y = win32api.GetSystemMetrics(win32con.SM_YVIRTUALSCREEN)
                 win32gui.SetWindowPos(
                     self.window_handle, 
                     0, 
-                    self.rect.x(), self.rect.y(), self.rect.width(), self.rect.height(), 
+                    self.rect.x() - origin_x, self.rect.y() - origin_y, self.rect.width(), self.rect.height(), 
                     win32con.SWP_NOZORDER | win32con.SWP_NOACTIVATE
                 )
             else:
@@ -723,210 +1307,109 @@ class WallpaperWindow(QMainWindow):
         try:
             fg_window = win32gui.GetForegroundWindow()
             if not fg_window or fg_window == self.window_handle: return
+            if self.foreground_process[0] != fg_window:
+                self.foreground_process = (fg_window, process_name(win32process.GetWindowThreadProcessId(fg_window)[1]))
             class_name = win32gui.GetClassName(fg_window)
-            if class_name in ["Progman", "WorkerW", "Shell_TrayWnd"]:
-                if self.is_paused: 
-                    print("Status: Live ▶️ (Back to desktop)"); self.browser.page().runJavaScript("resumeAnimation();"); self.is_paused = False
-                    self.show(); QTimer.singleShot(50, self.setup_window_layer)
+            is_desktop = class_name in ["Progman", "WorkerW", "Shell_TrayWnd"]
+            should_pause = False
+            if not is_desktop:
+                placement = win32gui.GetWindowPlacement(fg_window)
+                is_maximized = placement[1] == win32con.SW_SHOWMAXIMIZED
+                (left, top, right, bottom) = win32gui.GetWindowRect(fg_window)
+                monitor = win32api.GetMonitorInfo(win32api.MonitorFromWindow(fg_window, win32con.MONITOR_DEFAULTTONEAREST))['Monitor']
+                is_fullscreen = (left, top, right, bottom) == tuple(monitor)
+                should_pause = is_maximized or is_fullscreen
+            PLAYBACK_POLICY.update(fullscreen=should_pause, desktop=is_desktop, foreground_class=class_name,
+                                   foreground_process=self.foreground_process[1])
+            self.update_prewarm(should_pause)
+            self.fullscreen_check_error = None
+        except Exception as e:
+            # Polled every two seconds; report each new failure once.
+            if str(e) != self.fullscreen_check_error:
+                self.fullscreen_check_error = str(e)
+                print(f"Fullscreen check failed: {e}")
+    def on_desktop_event(self, event):
+        PLAYBACK_POLICY.update(fullscreen=event.fullscreen, desktop=event.is_desktop,
+                               foreground_class=event.class_name, foreground_process=event.process)
+        self.main_thread.invoke(lambda: self.update_prewarm(event.fullscreen))
+    def apply_playback_decision(self, decision):
+        previous = self.playback_decision or NO_LIMITS
+        if decision == previous: return
+        self.playback_decision = decision
+        if THEME_PRELOADER is not None and (decision.paused or PLAYBACK_POLICY.signals.get('on_battery')):
+            THEME_PRELOADER.cancel(f"policy: {', '.join(decision.reasons) or 'on battery'}")
+        if decision.paused and not self.is_paused:
+            self.pause_wallpaper(f"Rule: {', '.join(decision.reasons)}")
+        elif not decision.paused and previous.paused and self.is_paused:
+            self.resume_wallpaper("Back to desktop" if PLAYBACK_POLICY.signals.get('desktop') else "Resuming from app")
+        if (decision.fps_cap, decision.quality) != (previous.fps_cap, previous.quality):
+            self.apply_render_limits()
+    def apply_render_limits(self):
+        decision = self.playback_decision or NO_LIMITS
+        if self.is_video_mode:
+            self.video_widget.set_fps_cap(decision.fps_cap)
+            self.video_widget.set_profile_cap(PROFILE_FOR_QUALITY.get(decision.quality))
+        elif self.browser is not None:
+            limits = json.dumps({"fpsCap": decision.fps_cap, "quality": decision.quality})
+            self.browser.page().runJavaScript(f"if (window.applyPlaybackLimits) applyPlaybackLimits({limits});")
+    def apply_render_settings(self, settings, started, done):
+        """Apply parse_render_settings() output to the running wallpaper and call
+        done(report) once it has taken effect. report["live"] is False when the page
+        cannot be retuned in place and the caller should fall back to /reload."""
+        def finish(live, applied, deferred, extra=None):
+            report = {"live": live, "applied": applied, "deferred": deferred,
+                      "latency_ms": round((time.perf_counter() - started) * 1000, 2)}
+            if extra: report.update(extra)
+            self.render_settings_report = report
+            print(f"Render Settings: {'Applied ' + ', '.join(applied) if live else 'Live update not possible'} in {report['latency_ms']} ms")
+            done(report)
+            publish_event("render_settings", report)
+
+        if self.is_video_mode:
+            try:
+                if 'fpsLimit' in settings:
+                    self.video_widget.set_fps_limit(settings['fpsLimit'])
+                if 'muteAudio' in settings or 'volume' in settings:
+                    self.video_widget.set_audio(settings.get('muteAudio'), settings.get('volume'))
+                if 'qualityPreset' in settings or 'videoProfile' in settings:
+                    # Which one wins depends on both keys; the Launcher has saved them already.
+                    CONFIG.invalidate(os.path.join(self.theme_path, 'config.json'))
+                    self.video_widget.set_render_profile(self.read_theme_config(self.theme_path).render_profile)
+            except Exception as e:
+                finish(False, [], [], {"error": str(e)})
                 return
-            placement = win32gui.GetWindowPlacement(fg_window)
-            is_maximized = placement[1] == win32con.SW_SHOWMAXIZED
-            (left, top, right, bottom) = win32gui.GetWindowRect(fg_window)
-            is_fullscreen = (left == 0 and top == 0 and right == self.screen_width and bottom == self.screen_height)
-            should_pause = is_maximized or is_fullscreen
-            if should_pause and not self.is_paused:
-                print(f"Status: Paused ⏸️ (App maximized/fullscreen)"); self.browser.page().runJavaScript("pauseAnimation();"); self.is_paused = True
-            elif not should_pause and self.is_paused:
-                print("Status: Live ▶️ (Resuming from app)"); self.browser.page().runJavaScript("resumeAnimation();"); self.is_paused = False
-                self.show(); QTimer.singleShot(50, self.setup_window_layer)
-        except Exception as e: pass
+            finish(True, list(settings), [], {"fps_limit": self.video_widget.effective_fps_limit(),
+                                              "render_profile": self.video_widget.effective_profile()})
+            return
+        if self.browser is None:
+            finish(False, [], [])
+            return
+        if self.deep_suspended or self.restoring:
+            # The discarded page re-reads /config from disk when it comes back.
+            finish(True, [], list(settings))
+            return
+        def on_result(result):
+            if not isinstance(result, dict):
+                finish(False, [], [])
+                return
+            finish(True, result.get('applied', []), result.get('deferred', []),
+                   {"fps_limit": result.get('fpsLimit'), "pixel_ratio": result.get('pixelRatio'), "page_ms": result.get('applyMs')})
+        js = f"window.applyRenderSettings ? window.applyRenderSettings({json.dumps(settings)}) : null"
+        self.browser.page().runJavaScript(js, on_result)
     def closeEvent(self, event):
-        if self.is_video_mode:
+        if self.desktop_monitor is not None:
+            self.desktop_monitor.stop()
+        if self.video_widget is not None:
             self.video_widget.stop()
         super().closeEvent(event)
 
-def network_stats_updater():
-    import psutil
-    print("Network Monitor: Starting stats updater thread...")
-    last_io = psutil.net_io_counters()
-    while True:
-        try:
-            time.sleep(1)
-            new_io = psutil.net_io_counters()
-            upload_speed_bits = (new_io.bytes_sent - last_io.bytes_sent) * 8
-            download_speed_bits = (new_io.bytes_recv - last_io.bytes_recv) * 8
-            with STATS_LOCK:
-                CURRENT_STATS["upload_bps"] = upload_speed_bits
-                CURRENT_STATS["download_bps"] = download_speed_bits
-                CURRENT_STATS["total_sent"] = new_io.bytes_sent
-                CURRENT_STATS["total_recv"] = new_io.bytes_recv
-            last_io = new_io
-        except Exception as e:
-            print(f"Error in stats updater thread: {e}", file=sys.stderr)
-            time.sleep(5)
-
-def get_process_name(pid):
-    import psutil
-    try:
-        if pid is None or pid == 0: return "System"
-        return psutil.Process(pid).name()
-    except (psutil.NoSuchProcess, psutil.AccessDenied): return "Access Denied"
-    except Exception: return "N/A"
-
-def live_traffic_updater(current_process_name):
-    import psutil
-    print("Network Monitor: Starting live traffic updater thread...")
-    loopback_ips = ('127.0.0.1', '::1')
-    while True:
-        try:
-            connections = psutil.net_connections(kind='inet')
-            listening_ports = {c.laddr.port for c in connections if c.status == 'LISTEN'}
-            new_log_entries = []
-            for conn in connections:
-                if not conn.raddr or conn.status not in ('ESTABLISHED', 'SYN_SENT'): continue
-
-                process = get_process_name(conn.pid)
-                if process == current_process_name:
-                    is_loopback = conn.laddr.ip in loopback_ips or conn.raddr.ip in loopback_ips
-                    if is_loopback:
-                        continue 
-
-                conn_key = (conn.laddr, conn.raddr, conn.pid, conn.status)
-                if conn_key not in SEEN_CONNECTIONS:
-                    SEEN_CONNECTIONS.add(conn_key)
-                    is_server_port = conn.laddr.port in listening_ports
-                    is_attempt = conn.status == 'SYN_SENT'
-                    if is_server_port:
-                        conn_type = "AT-IN" if is_attempt else "INCOMING"
-                        protocol = PORT_PROTOCOL_MAP.get(conn.laddr.port, "Unknown")
-                        ip_port = f"{conn.raddr.ip}:{conn.raddr.port}>{conn.laddr.port}"
-                    else:
-                        conn_type = "AT-OUT" if is_attempt else "OUTGOING"
-                        protocol = PORT_PROTOCOL_MAP.get(conn.raddr.port, "Unknown")
-                        ip_port = f"{conn.raddr.ip}:{conn.raddr.port}"
-                    log_entry = {
-                        "timestamp": datetime.datetime.now().strftime('%H:%M:%S.%f')[:-3],
-                        "type": conn_type, "ip_port": ip_port,
-                        "protocol": protocol, "process": process
-                    }
-                    new_log_entries.append(log_entry)
-
-            if new_log_entries:
-                with TRAFFIC_LOCK:
-                    for entry in new_log_entries:
-                        LIVE_TRAFFIC_LOG.append(entry)
-
-            if len(SEEN_CONNECTIONS) > 2000:
-                SEEN_CONNECTIONS.clear()
-                current_conns = psutil.net_connections(kind='inet')
-                for c in current_conns:
-                     if c.raddr and c.status in ('ESTABLISHED', 'SYN_SENT'):
-                         SEEN_CONNECTIONS.add((c.laddr, c.raddr, c.pid, c.status))
-            time.sleep(0.2)
-        except Exception as e:
-            print(f"Error in traffic updater thread: {e}", file=sys.stderr)
-            time.sleep(5)
-
-def get_network_data(current_process_name):
-    with STATS_LOCK: stats = CURRENT_STATS.copy()
-    with TRAFFIC_LOCK: live_traffic = list(LIVE_TRAFFIC_LOG)
-
-    active_connections_raw, listening_ports_raw = [], []
-    loopback_ips = ('1.27.0.0.1', '::1')
-    try:
-        connections = psutil.net_connections(kind='inet')
-        for conn in connections:
-            process_name = get_process_name(conn.pid)
-
-            if process_name == current_process_name:
-                is_loopback = False
-                if conn.laddr: is_loopback = is_loopback or conn.laddr.ip in loopback_ips
-                if conn.raddr: is_loopback = is_loopback or conn.raddr.ip in loopback_ips
-                if is_loopback:
-                    continue 
-
-            if conn.status == 'ESTABLISHED' and conn.raddr:
-                remote_protocol = PORT_PROTOCOL_MAP.get(conn.raddr.port, "Unknown")
-                proc_lower = process_name.lower()
-                if any(hn in proc_lower for hn in PROCESS_HIDE_LIST) and remote_protocol == "HTTPS":
-                    continue
-                active_connections_raw.append({
-                    "ip": conn.raddr.ip, "port": conn.raddr.port,
-                    "type": conn.type.name, "protocol": remote_protocol, "process": process_name
-                })
-            elif conn.status == 'LISTEN':
-                protocol = PORT_PROTOCOL_MAP.get(conn.laddr.port, str(conn.laddr.port))
-                listening_ports_raw.append({
-                    "port": conn.laddr.port, "type": conn.type.name,
-                    "protocol": protocol, "process": process_name
-                })
-    except (psutil.AccessDenied, psutil.ZombieProcess, psutil.NoSuchProcess): pass
-    except Exception as e: print(f"Error getting connections: {e}", file=sys.stderr)
-
-    stats.update({
-        "active_connections": active_connections_raw,
-        "listening_ports": listening_ports_raw,
-        "live_traffic_log": live_traffic,
-        "active_count": len(active_connections_raw),   
-        "listening_count": len(listening_ports_raw) 
-    })
-    return stats
-
-WEBSOCKET_CLIENTS = set()
-async def ws_register(websocket): WEBSOCKET_CLIENTS.add(websocket)
-async def ws_unregister(websocket): WEBSOCKET_CLIENTS.remove(websocket)
-
-async def ws_data_push_loop(current_process_name):
-    import asyncio
-    while True:
-        if WEBSOCKET_CLIENTS:
-            data = get_network_data(current_process_name) 
-            data_json = json.dumps(data)
-            await asyncio.gather(
-                *[client.send(data_json) for client in WEBSOCKET_CLIENTS], return_exceptions=True
-            )
-        await asyncio.sleep(0.2)
-
-async def ws_handler(websocket):
-    global AUTH_TOKEN
-    try:
-        user_agent = websocket.request.headers['User-Agent']
-        if user_agent != AUTH_TOKEN:
-            print(f"WebSocket Auth FAILED. Closing connection.")
-            await websocket.close(1008, "Invalid Auth Token")
-            return
-    except KeyError:
-        print(f"WebSocket Auth FAILED (No User-Agent). Closing connection.")
-        await websocket.close(1008, "Missing Auth Token")
-        return
-
-    await ws_register(websocket)
-    try: await websocket.wait_closed()
-    finally: await ws_unregister(websocket)
-
-async def main_websocket_server(current_process_name):
-    import asyncio
-    import websockets
-    print(f"Network Monitor: Starting data push loop...")
-    asyncio.create_task(ws_data_push_loop(current_process_name)) 
-
-    global ws_port 
-    print(f"Network Monitor: WebSocket server starting at ws://localhost:{ws_port}")
-    async with websockets.serve(ws_handler, "localhost", ws_port):
-        await asyncio.Future()
-
-def start_websocket_thread(current_process_name):
-    try:
-        import asyncio
-        import websockets
-        asyncio.run(main_websocket_server(current_process_name)) 
-    except Exception as e:
-        print(f"Network Monitor: WebSocket thread failed: {e}")
-
 if __name__ == "__main__":
     import secrets
     import string
-    app = QApplication(sys.argv)
+    with STARTUP.phase('qapplication'):
+        # Lets a video-mode engine import QtWebEngine later, on a hot switch to a web theme.
+        QApplication.setAttribute(Qt.ApplicationAttribute.AA_ShareOpenGLContexts)
+        app = QApplication(sys.argv)
 
     icon_path = os.path.join(SCRIPT_DIR, 'icon.ico') 
     if os.path.exists(icon_path):
@@ -936,56 +1419,82 @@ if __name__ == "__main__":
         myappid = api_config.APP_USER_MODEL_ID
         ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID(myappid)
     except: pass
-    check_single_instance()
+    with STARTUP.phase('single_instance'):
+        check_single_instance()
     AUTH_TOKEN = ''.join(secrets.choice(string.ascii_letters + string.digits) for _ in range(50))
     os.environ["QTWEBENGINE_REMOTE_DEBUGGING"] = "9222"
 
-    import secrets
-    import string
-
-    try: 
-        import psutil
-        current_proc_name = psutil.Process(os.getpid()).name()
-    except: sys.exit(1)
-
-    current_wallpaper_path = MyHandler.get_current_wallpaper_path(None)
-    config_path = os.path.join(current_wallpaper_path, 'config.json')
-
-    enable_global_widget = False
-    try:
-        with open(config_path, 'r') as f:
-            c = json.load(f)
-            if c.get("htmlrender") is True:
-                enable_global_widget = False
-                print("HTML Render Mode detected: Global Widgets forcibly DISABLED.")
-            elif c.get("Enable_Global_Widget") == True or c.get("Enable_Network_Widget") == True:
-                enable_global_widget = True
-    except: pass
+    enable_global_widget = STARTUP_CONFIG.wants_global_widgets
+    if STARTUP_CONFIG.html_render:
+        print("HTML Render Mode detected: Global Widgets forcibly DISABLED.")
 
     http_port = HTTP_PORT
     ws_port = WS_PORT if enable_global_widget else 0
 
     try:
-        with APP_CONFIG_LOCK:
-            c = {}
-            if os.path.exists(APP_CONFIG_PATH):
-                with open(APP_CONFIG_PATH, 'r') as f: c = json.load(f)
-            c['port'] = http_port
-            if enable_global_widget: c['ws_port'] = ws_port
-            elif 'ws_port' in c: del c['ws_port']
-            with open(APP_CONFIG_PATH, 'w') as f: json.dump(c, f, indent=2)
-    except: pass
+        with STARTUP.phase('app_config'):
+            c = CONFIG.app_config()
+            NETWORK_SETTINGS = {k: v for k, v in (('traffic_log', c.traffic_log), ('reverse_dns', c.reverse_dns)) if v is not None}
+            DESKTOP_MONITOR_MODE = c.desktop_monitor
+            PLAYBACK_RULES = c.playback_rules
+            BATTERY_SAVER = c.battery_saver
+            DEEP_SUSPEND_SETTINGS = c.deep_suspend
+            PRELOAD_SETTINGS = c.preload
+            SCREEN_LAYOUT = c.screen_layout
+            MEMORY_BUDGET = MemoryBudget(c.memory_budget_mb * MB)
+            CONFIG.update_app_config(port=http_port, ws_port=ws_port if enable_global_widget else None)
+    except Exception as e: print(f"Could not update app_config: {e}")
 
     server_url = f"http://localhost:{http_port}"
     app.is_restarting = False
-    window = WallpaperWindow(app_ref=app, url=server_url, auth_token=AUTH_TOKEN, enable_global_widget=enable_global_widget)
-    start_server(http_port, create_handler_class(window, app, http_port, AUTH_TOKEN))
+    PLAYBACK_POLICY = PlaybackPolicy(load_rules(PLAYBACK_RULES, BATTERY_SAVER))
+    preload = {"enabled": True, "budget_mb": DEFAULT_BUDGET_MB}
+    if isinstance(PRELOAD_SETTINGS, dict): preload.update(PRELOAD_SETTINGS)
+    if preload.get("enabled"):
+        THEME_PRELOADER = ThemePreloader(CONFIG, int(float(preload["budget_mb"]) * 1048576), MEMORY_BUDGET)
+    if PLAYBACK_POLICY.needs_ticks():
+        paused_interval = 2.0 if PLAYBACK_POLICY.needs_ticks_while_paused() else None
+        ENGINE_SCHEDULER.register('playback_policy', PLAYBACK_POLICY.poll_system, 2.0, paused_interval=paused_interval)
+    with STARTUP.phase('window'):
+        window = WallpaperWindow(app_ref=app, url=server_url, auth_token=AUTH_TOKEN, enable_global_widget=enable_global_widget)
+    def on_config_change(path, config):
+        global SCREEN_LAYOUT
+        if path == CONFIG.app_config_path and config.screen_layout != SCREEN_LAYOUT:
+            print(f"Screen layout changed to '{config.screen_layout}'")
+            SCREEN_LAYOUT = config.screen_layout
+            window.main_thread.invoke(window.on_screens_changed)
+    CONFIG.subscribe(on_config_change)
+    def sample_video_telemetry():
+        if window.is_video_mode and window.video_widget is not None:
+            window.video_widget.sample_telemetry()
+    # Parked outside video mode; build_surface wakes it.
+    ENGINE_SCHEDULER.register('video_telemetry', sample_video_telemetry, 2.0,
+                              wants_run=lambda: window.is_video_mode and window.video_widget is not None)
+    with STARTUP.phase('file_watcher'):
+        try:
+            FILE_WATCHER = FileWatcher(SCRIPT_DIR)
+            FILE_WATCHER.start()
+            CONFIG.watch(FILE_WATCHER)
+            if THEME_PRELOADER is not None:
+                THEME_PRELOADER.watch(FILE_WATCHER)
+        except Exception as e:
+            print(f"File Watcher: Unavailable, polling app_config.json instead: {e}")
+            FILE_WATCHER = None
+            ENGINE_SCHEDULER.register('config_poll', CONFIG.poll, 2.0, paused_interval=10.0)
+    with STARTUP.phase('http_server'):
+        start_server(http_port, create_handler_class(window, app, http_port, AUTH_TOKEN))
+    with STARTUP.phase('control_channel'):
+        try:
+            ENGINE_IPC = EngineControlServer(SCRIPT_DIR, create_control_commands(window))
+            ENGINE_IPC.start()
+        except Exception as e:
+            print(f"Engine IPC: Control channel unavailable, Launcher falls back to HTTP: {e}")
+            ENGINE_IPC = None
 
     if enable_global_widget:
-        print("Starting Global Widget Threads...")
-        threading.Thread(target=network_stats_updater, daemon=True).start()
-        threading.Thread(target=live_traffic_updater, args=(current_proc_name,), daemon=True).start()
-        threading.Thread(target=start_websocket_thread, args=(current_proc_name,), daemon=True).start()
+        with STARTUP.phase('global_widgets'):
+            start_global_widgets(AUTH_TOKEN)
+    ENGINE_SCHEDULER.start()
 
     tray_icon = QSystemTrayIcon(app)
     tray_icon_path = os.path.join(SCRIPT_DIR, '1.ico')
@@ -995,10 +1504,13 @@ if __name__ == "__main__":
         tray_icon.setIcon(app.windowIcon())
     
     tray_menu = QMenu()
+    # The Launcher can pause and resume over the control channel too.
+    tray_menu.aboutToShow.connect(lambda: pause_action.setText("Resume Wallpaper" if window.is_paused else "Pause Wallpaper"))
     
     def open_launcher():
         launcher_exe = os.path.join(SCRIPT_DIR, 'librewall.exe')
         launcher_py = os.path.join(SCRIPT_DIR, 'Launcher.py')
+        import subprocess
         detach_flags = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
         try:
             if os.path.exists(launcher_exe):
@@ -1030,10 +1542,7 @@ if __name__ == "__main__":
     tray_menu.addAction(pause_action)
     
     reload_action = QAction("Reload Wallpaper", app)
-    def reload_wallpaper():
-        app.is_restarting = True
-        app.quit()
-    reload_action.triggered.connect(reload_wallpaper)
+    reload_action.triggered.connect(window.switch_theme)
     tray_menu.addAction(reload_action)
     
     tray_menu.addSeparator()
@@ -1047,8 +1556,19 @@ if __name__ == "__main__":
     tray_icon.show()
 
     print(f"Engine Running on {server_url}")
+    STARTUP.mark('event_loop')
+    # Write the trace even if the first page never finishes loading.
+    QTimer.singleShot(60000, lambda: STARTUP.finish(SCRIPT_DIR, mode=window.surface_mode(), timed_out=True))
     exit_code = app.exec()
 
+    if ENGINE_IPC is not None:
+        ENGINE_IPC.stop()
+    if FILE_WATCHER is not None:
+        FILE_WATCHER.stop()
+    ENGINE_SCHEDULER.stop()
+    if network_monitor is not None:
+        network_monitor.shutdown_monitor()
+
     if mutex_handle:
         try:
             kernel32.CloseHandle(mutex_handle)
@@ -1057,7 +1577,7 @@ if __name__ == "__main__":
 
     if app.is_restarting:
         print("Restarting...")
-        import time
+        import subprocess
         time.sleep(1.0)
         subprocess.Popen([sys.executable] + [os.path.abspath(sys.argv[0])], cwd=SCRIPT_DIR)
         os._exit(0)
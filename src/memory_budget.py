@@ -0,0 +1,70 @@
+import threading
+
+DEFAULT_BUDGET_MB = 768
+MB = 1024 * 1024
+
+class MemoryBudget:
+    """RAM the engine's in-memory caches may hold between them (the theme
+    preloader's warm slot, the video demuxer cache). Each consumer keeps one
+    named reservation; reserve() replaces it and grants what is left if the
+    full amount is not available."""
+
+    def __init__(self, total_bytes=DEFAULT_BUDGET_MB * MB):
+        self.total = int(total_bytes)
+        self.lock = threading.Lock()
+        self.reservations = {}
+
+    def available(self, name=None):
+        """Bytes name could hold, counting what it already reserved."""
+        with self.lock:
+            others = sum(v for k, v in self.reservations.items() if k != name)
+        return max(0, self.total - others)
+
+    def reserve(self, name, wanted):
+        """Set name's reservation to wanted bytes or as much as fits; returns the grant."""
+        with self.lock:
+            others = sum(v for k, v in self.reservations.items() if k != name)
+            granted = max(0, min(int(wanted), self.total - others))
+            self.reservations[name] = granted
+            return granted
+
+    def release(self, name):
+        with self.lock:
+            self.reservations.pop(name, None)
+
+    def snapshot(self):
+        with self.lock:
+            used = sum(self.reservations.values())
+            return {"total_mb": round(self.total / MB), "used_mb": round(used / MB, 1),
+                    "reservations_mb": {k: round(v / MB, 1) for k, v in self.reservations.items()}}
+
+# Demuxer cache sizing for NativeVideoWidget.
+MEMORY_LOOP_MAX = 256 * MB      # largest file worth holding entirely
+STREAM_READAHEAD_SECS = 10
+STREAM_MIN = 16 * MB
+STREAM_MAX = 96 * MB
+STREAM_BACK = 8 * MB
+STREAM_DEFAULT_BITRATE = 40_000_000   # bits/s assumed until mpv knows the duration
+
+def plan_demuxer_cache(file_size, budget_bytes, bitrate=None):
+    """mpv cache options for a file: a loop that fits in budget_bytes is read
+    into the demuxer cache once and served from memory on every loop
+    ("memory"); anything else gets a bounded forward/back window sized from
+    its bitrate ("stream"). Returns (strategy, options, reserved bytes)."""
+    needed = int(file_size * 1.05) + 4 * MB
+    if file_size and needed <= min(MEMORY_LOOP_MAX, budget_bytes):
+        # Bytes are either ahead of or behind the playhead, so resident memory
+        # stays around the file size although both limits allow all of it.
+        return "memory", {
+            'cache': 'yes', 'demuxer-seekable-cache': 'yes',
+            'demuxer-max-bytes': str(needed), 'demuxer-max-back-bytes': str(needed),
+            # Read ahead to the end so the loop's seek back lands in the cache.
+            'demuxer-readahead-secs': '86400',
+        }, needed
+    window = (bitrate or STREAM_DEFAULT_BITRATE) // 8 * STREAM_READAHEAD_SECS
+    forward = max(STREAM_MIN, min(STREAM_MAX, window, max(STREAM_MIN, budget_bytes - STREAM_BACK)))
+    return "stream", {
+        'cache': 'yes', 'demuxer-seekable-cache': 'auto',
+        'demuxer-max-bytes': str(forward), 'demuxer-max-back-bytes': str(STREAM_BACK),
+        'demuxer-readahead-secs': str(STREAM_READAHEAD_SECS),
+    }, forward + STREAM_BACK
@@ -0,0 +1,297 @@
+import os
+import sys
+import json
+import time
+import threading
+from port_map import PORT_PROTOCOL_MAP
+from traffic_history import TrafficHistory, HISTORY_DIR
+from connection_table import ConnectionTable
+from traffic_log import TrafficEventLog, TRAFFIC_LOG_DIR
+from rdns import ReverseDnsCache
+from ip_ranges import load_default_index
+
+STATS_LOCK = threading.Lock()
+CURRENT_STATS = {
+    "upload_bps": 0, "download_bps": 0, "total_sent": 0, "total_recv": 0
+}
+TRAFFIC_HISTORY = None
+CONNECTION_TABLE = None
+TRAFFIC_LOG = None
+REVERSE_DNS = None
+IP_RANGES = None
+PROCESS_HIDE_LIST = [
+    'librewall.exe', 'engine.exe'
+]
+LOOPBACK_IPS = ('127.0.0.1', '::1')
+AUTH_TOKEN = None
+SCHEDULER = None
+WS_LOOP = None
+LAST_IO = None
+LAST_IO_TIME = 0.0
+
+class PsutilSource:
+    """Live system data. Benchmarks swap SOURCE for a synthetic one."""
+
+    def net_connections(self):
+        import psutil
+        return psutil.net_connections(kind='inet')
+
+    def net_io_counters(self):
+        import psutil
+        return psutil.net_io_counters()
+
+    def process_name(self, pid):
+        import psutil
+        try:
+            if pid is None or pid == 0: return "System"
+            return psutil.Process(pid).name()
+        except (psutil.NoSuchProcess, psutil.AccessDenied): return "Access Denied"
+        except Exception: return "N/A"
+
+    def process_start(self, pid):
+        import psutil
+        try:
+            if pid is None or pid == 0: return None
+            return psutil.Process(pid).create_time()
+        except Exception: return None
+
+SOURCE = PsutilSource()
+
+def get_process_name(pid):
+    return SOURCE.process_name(pid)
+
+def get_process_start(pid):
+    return SOURCE.process_start(pid)
+
+def create_connection_table(current_process_name):
+    def is_own_loopback(row):
+        return row.process == current_process_name and (row.local_ip in LOOPBACK_IPS or row.remote_ip in LOOPBACK_IPS)
+    def enrich(row):
+        if not row.remote_ip: return
+        if REVERSE_DNS is not None:
+            row.hostname = REVERSE_DNS.lookup(row.remote_ip)
+        if IP_RANGES is not None:
+            row.owner = IP_RANGES.lookup(row.remote_ip)
+    return ConnectionTable(PORT_PROTOCOL_MAP, exclude=is_own_loopback, enrich=enrich)
+
+def create_reverse_dns(settings):
+    options = settings if isinstance(settings, dict) else {}
+    resolver = ReverseDnsCache(
+        workers=int(options.get('workers', 4)),
+        positive_ttl=int(options.get('positive_ttl', 3600)),
+        negative_ttl=int(options.get('negative_ttl', 300)),
+        max_entries=int(options.get('max_entries', 4096)),
+        lookups_per_tick=int(options.get('lookups_per_tick', 16))
+    )
+    def attach(ip, hostname):
+        CONNECTION_TABLE.annotate(ip, 'hostname', hostname)
+        TRAFFIC_LOG.annotate_recent(ip, hostname)
+    resolver.on_resolved(attach)
+    print("Network Monitor: Reverse DNS enrichment enabled.")
+    return resolver
+
+def init_monitor(root_dir, current_process_name, app_config=None):
+    """Create the shared monitor state under root_dir. app_config supplies the
+    optional 'traffic_log' and 'reverse_dns' sections."""
+    global CONNECTION_TABLE, TRAFFIC_LOG, REVERSE_DNS, IP_RANGES, TRAFFIC_HISTORY, LAST_IO
+    app_config = app_config or {}
+    LAST_IO = None
+    log_settings = app_config.get('traffic_log') if isinstance(app_config.get('traffic_log'), dict) else {}
+    CONNECTION_TABLE = create_connection_table(current_process_name)
+    TRAFFIC_LOG = TrafficEventLog(os.path.join(root_dir, TRAFFIC_LOG_DIR), log_settings)
+    REVERSE_DNS = create_reverse_dns(app_config['reverse_dns']) if app_config.get('reverse_dns') else None
+    IP_RANGES = load_default_index(root_dir)
+    try:
+        TRAFFIC_HISTORY = TrafficHistory(os.path.join(root_dir, HISTORY_DIR))
+    except Exception as e:
+        print(f"Network Monitor: Traffic history disabled: {e}")
+
+def shutdown_monitor():
+    if TRAFFIC_HISTORY is not None:
+        try: TRAFFIC_HISTORY.close()
+        except Exception: pass
+    if TRAFFIC_LOG is not None:
+        try: TRAFFIC_LOG.close()
+        except Exception: pass
+    if REVERSE_DNS is not None:
+        REVERSE_DNS.shutdown()
+
+def stats_tick():
+    global LAST_IO, LAST_IO_TIME
+    new_io = SOURCE.net_io_counters()
+    now = time.monotonic()
+    last_io, elapsed = LAST_IO, max(now - LAST_IO_TIME, 0.001)
+    LAST_IO, LAST_IO_TIME = new_io, now
+    if last_io is None: return
+    # Rates are per elapsed second, so a slowed tick while paused still reports bps.
+    upload_speed_bits = int((new_io.bytes_sent - last_io.bytes_sent) * 8 / elapsed)
+    download_speed_bits = int((new_io.bytes_recv - last_io.bytes_recv) * 8 / elapsed)
+    with STATS_LOCK:
+        CURRENT_STATS["upload_bps"] = upload_speed_bits
+        CURRENT_STATS["download_bps"] = download_speed_bits
+        CURRENT_STATS["total_sent"] = new_io.bytes_sent
+        CURRENT_STATS["total_recv"] = new_io.bytes_recv
+    if TRAFFIC_HISTORY is not None:
+        TRAFFIC_HISTORY.record(time.time(), upload_speed_bits, download_speed_bits, new_io.bytes_sent, new_io.bytes_recv)
+
+def traffic_tick():
+    connections = SOURCE.net_connections()
+    if REVERSE_DNS is not None:
+        REVERSE_DNS.begin_tick()
+    added, _ = CONNECTION_TABLE.update(connections, get_process_name, get_process_start)
+    if added:
+        listening_ports = CONNECTION_TABLE.listening_ports()
+        for row in added:
+            if row.remote_ip is None or row.status not in ('ESTABLISHED', 'SYN_SENT'): continue
+            is_attempt = row.status == 'SYN_SENT'
+            if row.local_port in listening_ports:
+                conn_type = "AT-IN" if is_attempt else "INCOMING"
+                protocol = PORT_PROTOCOL_MAP.get(row.local_port, "Unknown")
+            else:
+                conn_type = "AT-OUT" if is_attempt else "OUTGOING"
+                protocol = row.protocol
+            TRAFFIC_LOG.append(conn_type, row.remote_ip, row.remote_port, row.local_port, protocol, row.process, hostname=row.hostname)
+    return len(added)
+
+def get_network_data(current_process_name):
+    with STATS_LOCK: stats = CURRENT_STATS.copy()
+    live_traffic = [event.as_dict() for event in TRAFFIC_LOG.recent(50)]
+
+    active_connections_raw, listening_ports_raw = [], []
+    try:
+        for row in CONNECTION_TABLE.rows_for_state('ESTABLISHED'):
+            if row.remote_ip is None: continue
+            proc_lower = row.process.lower()
+            if row.protocol == "HTTPS" and any(hn in proc_lower for hn in PROCESS_HIDE_LIST):
+                continue
+            active_connections_raw.append(row.summary())
+        for row in CONNECTION_TABLE.rows_for_state('LISTEN'):
+            listening_ports_raw.append(row.summary())
+    except Exception as e: print(f"Error getting connections: {e}", file=sys.stderr)
+
+    stats.update({
+        "active_connections": active_connections_raw,
+        "listening_ports": listening_ports_raw,
+        "live_traffic_log": live_traffic,
+        "active_count": len(active_connections_raw),
+        "listening_count": len(listening_ports_raw)
+    })
+    return stats
+
+def build_push_payload(current_process_name):
+    return json.dumps(get_network_data(current_process_name))
+
+def _param(params, name, cast=str):
+    value = params.get(name, [None])[0]
+    return cast(value) if value not in (None, '') else None
+
+def query_history(params):
+    if TRAFFIC_HISTORY is None:
+        raise LookupError("Traffic history is not enabled.")
+    seconds = max(1, min(_param(params, 'seconds', int) or 86400, 86400))
+    resolution = TRAFFIC_HISTORY.resolution_for(seconds, max(1, _param(params, 'resolution', int) or 60))
+    return {
+        'fields': ['timestamp', 'upload_bps', 'download_bps', 'total_sent', 'total_recv'],
+        'seconds': seconds,
+        'resolution': resolution,
+        'samples': TRAFFIC_HISTORY.query(seconds=seconds, resolution=resolution)
+    }
+
+def query_connections(params):
+    if CONNECTION_TABLE is None:
+        raise LookupError("Network monitor is not enabled.")
+    limit = _param(params, 'limit', int)
+    total, rows = CONNECTION_TABLE.query(
+        status=_param(params, 'state'), process=_param(params, 'process'),
+        remote_port=_param(params, 'remote_port', int), local_port=_param(params, 'local_port', int),
+        ip=_param(params, 'ip'), sort=_param(params, 'sort') or 'process',
+        descending=_param(params, 'order') == 'desc',
+        offset=max(0, _param(params, 'offset', int) or 0),
+        limit=None if limit is None else max(0, min(limit, 1000))
+    )
+    return {'total': total, 'count': len(rows), 'connections': rows}
+
+def query_traffic_log(params):
+    if TRAFFIC_LOG is None:
+        raise LookupError("Network monitor is not enabled.")
+    events = TRAFFIC_LOG.query(
+        start=_param(params, 'since', float), end=_param(params, 'until', float),
+        process=_param(params, 'process'), ip=_param(params, 'ip'), protocol=_param(params, 'protocol'),
+        limit=max(1, min(_param(params, 'limit', int) or 500, 5000))
+    )
+    return {'count': len(events), 'events': [e.as_dict() for e in events]}
+
+QUERY_ROUTES = {
+    '/net/history': query_history,
+    '/net/connections': query_connections,
+    '/net/traffic_log': query_traffic_log,
+}
+
+WEBSOCKET_CLIENTS = set()
+PUSH_PENDING = None
+async def ws_register(websocket):
+    WEBSOCKET_CLIENTS.add(websocket)
+    if SCHEDULER is not None: SCHEDULER.wake('ws_push')
+async def ws_unregister(websocket): WEBSOCKET_CLIENTS.discard(websocket)
+
+async def ws_broadcast(data_json):
+    import asyncio
+    await asyncio.gather(
+        *[client.send(data_json) for client in list(WEBSOCKET_CLIENTS)], return_exceptions=True
+    )
+
+def push_tick(current_process_name):
+    """Build the widget payload on the scheduler thread and hand the sends to the websocket loop."""
+    global PUSH_PENDING
+    import asyncio
+    if WS_LOOP is None or not WEBSOCKET_CLIENTS: return
+    # Skip a tick rather than queue a second payload behind a slow client.
+    if PUSH_PENDING is not None and not PUSH_PENDING.done(): return
+    PUSH_PENDING = asyncio.run_coroutine_threadsafe(ws_broadcast(build_push_payload(current_process_name)), WS_LOOP)
+
+async def ws_handler(websocket):
+    try:
+        user_agent = websocket.request.headers['User-Agent']
+        if user_agent != AUTH_TOKEN:
+            print("WebSocket Auth FAILED. Closing connection.")
+            await websocket.close(1008, "Invalid Auth Token")
+            return
+    except KeyError:
+        print("WebSocket Auth FAILED (No User-Agent). Closing connection.")
+        await websocket.close(1008, "Missing Auth Token")
+        return
+
+    await ws_register(websocket)
+    try: await websocket.wait_closed()
+    finally: await ws_unregister(websocket)
+
+async def main_websocket_server(ws_port):
+    global WS_LOOP
+    import asyncio
+    import websockets
+    WS_LOOP = asyncio.get_running_loop()
+    print(f"Network Monitor: WebSocket server starting at ws://localhost:{ws_port}")
+    async with websockets.serve(ws_handler, "localhost", ws_port):
+        await asyncio.Future()
+
+def start_websocket_thread(ws_port):
+    try:
+        import asyncio
+        asyncio.run(main_websocket_server(ws_port))
+    except Exception as e:
+        print(f"Network Monitor: WebSocket thread failed: {e}")
+
+def register_tasks(scheduler, current_process_name):
+    """Register the periodic network work. While the wallpaper is paused the
+    stats and connection scans slow down and the widget push stops."""
+    global SCHEDULER
+    SCHEDULER = scheduler
+    scheduler.register('net_stats', stats_tick, 1.0, paused_interval=5.0)
+    scheduler.register('net_traffic', traffic_tick, 0.2, paused_interval=2.0)
+    scheduler.register('ws_push', lambda: push_tick(current_process_name), 0.2,
+                       wants_run=lambda: bool(WEBSOCKET_CLIENTS))
+
+def start_monitor_threads(scheduler, current_process_name, ws_port):
+    print("Network Monitor: Registering scheduled tasks...")
+    register_tasks(scheduler, current_process_name)
+    threading.Thread(target=start_websocket_thread, args=(ws_port,), daemon=True).start()
@@ -0,0 +1,227 @@
+import sys
+import time
+import threading
+import collections
+
+ACTIONS = ('pause', 'resume', 'fps_cap', 'quality')
+QUALITY_ORDER = ('low', 'medium', 'high', 'ultra')
+SYSTEM_CONDITIONS = ('on_battery', 'battery_below', 'cpu_above', 'memory_above', 'idle_above')
+
+# Equivalent of the old hard-coded check_fullscreen behaviour.
+DEFAULT_RULES = [
+    {"name": "fullscreen", "when": {"fullscreen": True}, "action": "pause"}
+]
+
+# Added by app_config "battery_saver": a cheaper render profile (video) /
+# quality preset (web) while running on battery.
+BATTERY_SAVER_RULE = {"name": "battery", "when": {"on_battery": True}, "action": "quality", "value": "medium",
+                      "hold": 5, "release": 5}
+BATTERY_CONDITIONS = ('on_battery', 'battery_below')
+
+PlaybackDecision = collections.namedtuple('PlaybackDecision', 'paused fps_cap quality reasons')
+NO_LIMITS = PlaybackDecision(False, None, None, ())
+
+class PolicyRule:
+    """One entry of app_config "playback_rules".
+
+    when: conditions that must all hold - fullscreen, desktop, on_battery
+    (bools), foreground / foreground_class (name or list of names),
+    battery_below, cpu_above, memory_above, idle_above (numbers).
+    hold / release: seconds the conditions must stay true / false before the
+    rule switches on / off. margin: how far a numeric threshold is relaxed
+    while the rule is on, so a value hovering at the limit does not flap.
+    """
+    __slots__ = ('name', 'when', 'action', 'value', 'hold', 'release', 'margin', 'active', 'changing_since')
+
+    def __init__(self, spec):
+        self.name = str(spec.get('name') or spec.get('action'))
+        self.when = dict(spec.get('when') or {})
+        self.action = spec.get('action')
+        if self.action not in ACTIONS:
+            raise ValueError(f"unknown action '{self.action}'")
+        self.value = spec.get('value')
+        if self.action == 'fps_cap':
+            self.value = int(self.value)
+            if self.value <= 0: raise ValueError("fps_cap needs a positive value")
+        elif self.action == 'quality' and self.value not in QUALITY_ORDER:
+            raise ValueError(f"quality must be one of {', '.join(QUALITY_ORDER)}")
+        self.hold = float(spec.get('hold', 0))
+        self.release = float(spec.get('release', 0))
+        self.margin = float(spec.get('margin', 5))
+        for key in ('foreground', 'foreground_class'):
+            if key in self.when:
+                names = self.when[key]
+                self.when[key] = {n.lower() for n in ([names] if isinstance(names, str) else names)}
+        self.active = False
+        self.changing_since = None
+
+    def uses_system_signals(self):
+        return any(key in self.when for key in SYSTEM_CONDITIONS)
+
+    def uses_battery_only(self):
+        """True if the battery is the only system signal this rule reads."""
+        return not any(key in self.when for key in SYSTEM_CONDITIONS if key not in BATTERY_CONDITIONS)
+
+    def matches(self, signals):
+        margin = self.margin if self.active else 0
+        for key, expected in self.when.items():
+            if key in ('fullscreen', 'desktop', 'on_battery'):
+                if bool(signals.get(key)) != bool(expected): return False
+                continue
+            if key in ('foreground', 'foreground_class'):
+                value = signals.get('foreground_process' if key == 'foreground' else key)
+                if not value or value.lower() not in expected: return False
+                continue
+            if key == 'battery_below':
+                value = signals.get('battery_percent')
+                if value is None or value >= expected + margin: return False
+                continue
+            signal = {'cpu_above': 'cpu_percent', 'memory_above': 'memory_percent', 'idle_above': 'idle_seconds'}.get(key)
+            if signal is None: return False
+            value = signals.get(signal)
+            if value is None or value <= expected - margin: return False
+        return True
+
+    def step(self, signals, now):
+        """Advance the hold/release timers. Returns True if the rule is on."""
+        wanted = self.matches(signals)
+        if wanted == self.active:
+            self.changing_since = None
+            return self.active
+        delay = self.hold if wanted else self.release
+        if self.changing_since is None:
+            self.changing_since = now
+        if now - self.changing_since >= delay:
+            self.active = wanted
+            self.changing_since = None
+        return self.active
+
+def load_rules(specs, battery_saver=False):
+    """Build rules from app_config; invalid entries are reported and skipped."""
+    if specs is None:
+        specs = DEFAULT_RULES
+    specs = list(specs) if isinstance(specs, list) else []
+    if battery_saver:
+        specs.append(BATTERY_SAVER_RULE)
+    rules = []
+    for spec in specs:
+        try:
+            rules.append(PolicyRule(spec))
+        except Exception as e:
+            print(f"Playback Policy: Skipping rule {spec!r}: {e}")
+    return rules
+
+class PlaybackPolicy:
+    """Turns desktop and system signals into a PlaybackDecision.
+
+    Signals are merged by update(); the decision is recomputed on every
+    update and listeners are told only when it changes. Time comes from
+    the injectable clock, so a test can drive the engine with simulated
+    signals and timestamps.
+    """
+
+    def __init__(self, rules, clock=time.monotonic):
+        self.rules = rules
+        self.clock = clock
+        self.signals = {}
+        self.decision = NO_LIMITS
+        self.listeners = []
+        self.lock = threading.Lock()
+        # False once sampling found no battery (a desktop); it won't grow one.
+        self.has_battery = None
+
+    def on_change(self, callback):
+        self.listeners.append(callback)
+
+    def needs_ticks(self):
+        """True if some rule depends on elapsed time or system signals, so
+        evaluate() must also run periodically rather than only on events."""
+        return any(rule.uses_system_signals() or rule.hold or rule.release for rule in self.rules)
+
+    def needs_ticks_while_paused(self):
+        """Only a pause or resume rule can change anything while the wallpaper is paused."""
+        return any(rule.action in ('pause', 'resume') and (rule.uses_system_signals() or rule.hold or rule.release)
+                   for rule in self.rules)
+
+    def update(self, now=None, **signals):
+        with self.lock:
+            self.signals.update(signals)
+            decision, changed = self._evaluate(now)
+        if changed: self._notify(decision)
+        return decision
+
+    def evaluate(self, now=None):
+        with self.lock:
+            decision, changed = self._evaluate(now)
+        if changed: self._notify(decision)
+        return decision
+
+    def _notify(self, decision):
+        for callback in self.listeners:
+            try: callback(decision)
+            except Exception as e: print(f"Playback Policy: Listener failed: {e}", file=sys.stderr)
+
+    def _evaluate(self, now):
+        now = self.clock() if now is None else now
+        paused, forced_resume, fps_cap, quality, reasons = False, False, None, None, []
+        for rule in self.rules:
+            if not rule.step(self.signals, now): continue
+            reasons.append(rule.name)
+            if rule.action == 'pause': paused = True
+            elif rule.action == 'resume': forced_resume = True
+            elif rule.action == 'fps_cap': fps_cap = rule.value if fps_cap is None else min(fps_cap, rule.value)
+            elif rule.action == 'quality':
+                if quality is None or QUALITY_ORDER.index(rule.value) < QUALITY_ORDER.index(quality):
+                    quality = rule.value
+        decision = PlaybackDecision(paused and not forced_resume, fps_cap, quality, tuple(reasons))
+        changed = decision != self.decision
+        self.decision = decision
+        return decision, changed
+
+    def poll_system(self):
+        """Scheduler task: refresh system signals (if any rule reads them) and re-evaluate.
+        Without a battery, rules that only read the battery don't need sampling."""
+        sampled = [rule for rule in self.rules if rule.uses_system_signals()]
+        if self.has_battery is False:
+            sampled = [rule for rule in sampled if not rule.uses_battery_only()]
+        if sampled:
+            signals = sample_system_signals()
+            if self.has_battery is None: self.has_battery = signals.pop('has_battery')
+            else: signals.pop('has_battery')
+            return self.update(**signals)
+        return self.evaluate()
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "decision": self.decision._asdict(),
+                "signals": dict(self.signals),
+                "rules": [{"name": r.name, "action": r.action, "value": r.value, "active": r.active} for r in self.rules]
+            }
+
+def get_idle_seconds():
+    """Seconds since the last keyboard/mouse input, or None where unsupported."""
+    if sys.platform != 'win32':
+        return None
+    import ctypes
+    class LASTINPUTINFO(ctypes.Structure):
+        _fields_ = [('cbSize', ctypes.c_uint), ('dwTime', ctypes.c_uint)]
+    info = LASTINPUTINFO()
+    info.cbSize = ctypes.sizeof(info)
+    if not ctypes.windll.user32.GetLastInputInfo(ctypes.byref(info)):
+        return None
+    return ((ctypes.windll.kernel32.GetTickCount() - info.dwTime) & 0xFFFFFFFF) / 1000.0
+
+def sample_system_signals():
+    import psutil
+    signals = {
+        'cpu_percent': psutil.cpu_percent(interval=None),
+        'memory_percent': psutil.virtual_memory().percent,
+        'idle_seconds': get_idle_seconds()
+    }
+    try: battery = psutil.sensors_battery()
+    except Exception: battery = None
+    signals['on_battery'] = battery is not None and not battery.power_plugged
+    signals['battery_percent'] = battery.percent if battery is not None else None
+    signals['has_battery'] = battery is not None
+    return signals
@@ -0,0 +1,126 @@
+import socket
+import threading
+import time
+import collections
+import ipaddress
+from concurrent.futures import ThreadPoolExecutor
+
+def system_resolver(ip):
+    return socket.gethostbyaddr(ip)[0]
+
+class ReverseDnsCache:
+    """Non-blocking reverse-DNS enrichment for connection endpoints.
+
+    lookup() never waits: it answers from the TTL cache and, on a miss,
+    queues the address on a small resolver pool unless it is already in
+    flight or this tick's lookup budget is spent. Results (including
+    failures, cached for negative_ttl) are pushed to on_resolved listeners.
+    The resolver callable is injectable so it can be swapped for a stub.
+    """
+
+    def __init__(self, resolver=system_resolver, workers=4, positive_ttl=3600, negative_ttl=300,
+                 max_entries=4096, lookups_per_tick=16):
+        self.resolver = resolver
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.lookups_per_tick = lookups_per_tick
+        self.lock = threading.Lock()
+        self.cache = collections.OrderedDict()
+        self.inflight = {}
+        self.deferred = collections.OrderedDict()
+        self.listeners = []
+        self.budget = lookups_per_tick
+        self.stats = {'hits': 0, 'misses': 0, 'resolved': 0, 'failed': 0, 'deferred': 0}
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='rdns')
+
+    def on_resolved(self, callback):
+        self.listeners.append(callback)
+
+    def begin_tick(self):
+        """Refill the lookup budget and spend it on addresses deferred last tick."""
+        with self.lock:
+            self.budget = self.lookups_per_tick
+            while self.deferred and self.budget > 0:
+                ip, _ = self.deferred.popitem(last=False)
+                entry = self.cache.get(ip)
+                if ip in self.inflight or (entry is not None and entry[1] >= time.monotonic()):
+                    continue
+                if not self._is_resolvable(ip):
+                    self._store(ip, None, time.monotonic() + self.positive_ttl)
+                    continue
+                self.budget -= 1
+                self.stats['misses'] += 1
+                self.inflight[ip] = self.executor.submit(self._resolve, ip)
+
+    def peek(self, ip):
+        with self.lock:
+            entry = self.cache.get(ip)
+            if entry is None or entry[1] < time.monotonic():
+                return None
+            return entry[0]
+
+    def lookup(self, ip):
+        if not ip:
+            return None
+        now = time.monotonic()
+        with self.lock:
+            entry = self.cache.get(ip)
+            if entry is not None and entry[1] >= now:
+                self.cache.move_to_end(ip)
+                self.stats['hits'] += 1
+                return entry[0]
+            if ip in self.inflight:
+                return None
+            if self.budget <= 0:
+                self.stats['deferred'] += 1
+                self.deferred[ip] = None
+                if len(self.deferred) > self.max_entries:
+                    self.deferred.popitem(last=False)
+                return None
+            if not self._is_resolvable(ip):
+                self._store(ip, None, now + self.positive_ttl)
+                return None
+            self.budget -= 1
+            self.stats['misses'] += 1
+            self.inflight[ip] = self.executor.submit(self._resolve, ip)
+        return None
+
+    def _is_resolvable(self, ip):
+        try:
+            addr = ipaddress.ip_address(ip)
+        except ValueError:
+            return False
+        return not (addr.is_loopback or addr.is_unspecified or addr.is_multicast or addr.is_link_local)
+
+    def _store(self, ip, name, expires):
+        self.cache[ip] = (name, expires)
+        self.cache.move_to_end(ip)
+        while len(self.cache) > self.max_entries:
+            self.cache.popitem(last=False)
+
+    def _resolve(self, ip):
+        try:
+            name = self.resolver(ip) or None
+        except Exception:
+            name = None
+        ttl = self.positive_ttl if name else self.negative_ttl
+        with self.lock:
+            self._store(ip, name, time.monotonic() + ttl)
+            self.inflight.pop(ip, None)
+            self.stats['resolved' if name else 'failed'] += 1
+        if name:
+            for callback in self.listeners:
+                try: callback(ip, name)
+                except Exception as e: print(f"Network Monitor: rDNS listener failed: {e}")
+        return name
+
+    def snapshot_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+            stats['cached'] = len(self.cache)
+            stats['inflight'] = len(self.inflight)
+        return stats
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
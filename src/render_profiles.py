@@ -0,0 +1,49 @@
+# mpv option sets for NativeVideoWidget, cheapest first. Every profile sets
+# the same keys so switching profiles on a running player leaves nothing of
+# the previous one behind. All of them can be changed at runtime; the
+# vd-lavc-* decoder options take effect from the next decoder init (the
+# next loop or load).
+
+PROFILE_ORDER = ('minimal', 'efficiency', 'balanced', 'ultra')
+
+RENDER_PROFILES = {
+    # The old hard-coded setup: high-quality scalers, debanding and
+    # interpolation resampled to the display's refresh rate.
+    'ultra': {
+        'scale': 'spline36', 'cscale': 'spline36', 'dscale': 'mitchell', 'dither-depth': 'auto',
+        'correct-downscaling': 'yes', 'linear-downscaling': 'yes', 'sigmoid-upscaling': 'yes',
+        'deband': 'yes', 'video-sync': 'display-resample', 'interpolation': 'yes', 'tscale': 'oversample',
+        'framedrop': 'vo', 'vd-lavc-fast': 'no', 'vd-lavc-skiploopfilter': 'default',
+    },
+    # Same sharp upscaler, none of the per-frame extras; frames are shown at
+    # the video's own rate.
+    'balanced': {
+        'scale': 'spline36', 'cscale': 'bilinear', 'dscale': 'mitchell', 'dither-depth': 'auto',
+        'correct-downscaling': 'yes', 'linear-downscaling': 'no', 'sigmoid-upscaling': 'no',
+        'deband': 'no', 'video-sync': 'audio', 'interpolation': 'no', 'tscale': 'oversample',
+        'framedrop': 'vo', 'vd-lavc-fast': 'no', 'vd-lavc-skiploopfilter': 'default',
+    },
+    'efficiency': {
+        'scale': 'bilinear', 'cscale': 'bilinear', 'dscale': 'bilinear', 'dither-depth': 'no',
+        'correct-downscaling': 'no', 'linear-downscaling': 'no', 'sigmoid-upscaling': 'no',
+        'deband': 'no', 'video-sync': 'audio', 'interpolation': 'no', 'tscale': 'oversample',
+        'framedrop': 'vo', 'vd-lavc-fast': 'no', 'vd-lavc-skiploopfilter': 'default',
+    },
+    # Also cheapens software decoding; may show artifacts on some codecs.
+    'minimal': {
+        'scale': 'bilinear', 'cscale': 'bilinear', 'dscale': 'bilinear', 'dither-depth': 'no',
+        'correct-downscaling': 'no', 'linear-downscaling': 'no', 'sigmoid-upscaling': 'no',
+        'deband': 'no', 'video-sync': 'audio', 'interpolation': 'no', 'tscale': 'oversample',
+        'framedrop': 'decoder+vo', 'vd-lavc-fast': 'yes', 'vd-lavc-skiploopfilter': 'nonref',
+    },
+}
+
+# A theme's qualityPreset (and a policy "quality" rule) picks the profile
+# unless the theme sets videoProfile itself.
+PROFILE_FOR_QUALITY = {'low': 'minimal', 'medium': 'efficiency', 'high': 'balanced', 'ultra': 'ultra'}
+
+def effective_profile(profile, cap=None):
+    """profile, lowered to cap (a profile name or None)."""
+    if cap in PROFILE_ORDER and PROFILE_ORDER.index(cap) < PROFILE_ORDER.index(profile):
+        return cap
+    return profile
@@ -0,0 +1,99 @@
+import os
+import sys
+import time
+
+def _process_tree(pid=None):
+    import psutil
+    root = psutil.Process(pid or os.getpid())
+    processes = [root]
+    try: processes += root.children(recursive=True)
+    except psutil.Error: pass
+    return processes
+
+def dedicated_vram(pids):
+    """Dedicated GPU memory in use by pids, from the Windows "GPU Process
+    Memory" performance counters. None where they are unavailable."""
+    if sys.platform != 'win32':
+        return None
+    try:
+        import win32pdh
+        paths = win32pdh.ExpandCounterPath(r"\GPU Process Memory(*)\Dedicated Usage")
+        prefixes = tuple(f"pid_{pid}_" for pid in pids)
+        wanted = [p for p in paths if p.split('(', 1)[1].startswith(prefixes)]
+        if not wanted:
+            return 0
+        query = win32pdh.OpenQuery()
+        try:
+            counters = [win32pdh.AddCounter(query, path) for path in wanted]
+            win32pdh.CollectQueryData(query)
+            return sum(win32pdh.GetFormattedCounterValue(c, win32pdh.PDH_FMT_LARGE)[1] for c in counters)
+        finally:
+            win32pdh.CloseQuery(query)
+    except Exception:
+        return None
+
+def process_tree_memory(pid=None):
+    """RSS of this process plus its children (QtWebEngine renderer and GPU
+    processes), and their dedicated VRAM where the OS reports it."""
+    import psutil
+    rss, pids = 0, []
+    for process in _process_tree(pid):
+        try:
+            rss += process.memory_info().rss
+            pids.append(process.pid)
+        except psutil.Error:
+            pass
+    return {"rss": rss, "vram": dedicated_vram(pids), "processes": len(pids)}
+
+def memory_delta(before, after):
+    """Bytes reclaimed between two process_tree_memory() samples."""
+    vram = None
+    if before.get("vram") is not None and after.get("vram") is not None:
+        vram = before["vram"] - after["vram"]
+    return {"rss": before["rss"] - after["rss"], "vram": vram, "processes": before["processes"] - after["processes"]}
+
+def gpu_utilization(pids, interval):
+    """Summed 3D/video engine utilization (%) of pids over interval seconds,
+    from the Windows "GPU Engine" counters. None where they are unavailable."""
+    if sys.platform != 'win32':
+        return None
+    try:
+        import win32pdh
+        paths = win32pdh.ExpandCounterPath(r"\GPU Engine(*)\Utilization Percentage")
+        prefixes = tuple(f"pid_{pid}_" for pid in pids)
+        wanted = [p for p in paths if p.split('(', 1)[1].startswith(prefixes)]
+        if not wanted:
+            return 0.0
+        query = win32pdh.OpenQuery()
+        try:
+            counters = [win32pdh.AddCounter(query, path) for path in wanted]
+            win32pdh.CollectQueryData(query)
+            time.sleep(interval)
+            win32pdh.CollectQueryData(query)
+            return sum(win32pdh.GetFormattedCounterValue(c, win32pdh.PDH_FMT_DOUBLE)[1] for c in counters)
+        finally:
+            win32pdh.CloseQuery(query)
+    except Exception:
+        return None
+
+def process_tree_usage(pid=None, interval=5.0):
+    """CPU % (100 = one core), GPU % and memory of a process tree over interval seconds."""
+    import psutil
+    processes = _process_tree(pid)
+    def cpu_seconds():
+        total = 0.0
+        for process in processes:
+            try:
+                times = process.cpu_times()
+                total += times.user + times.system
+            except psutil.Error:
+                pass
+        return total
+    before = cpu_seconds()
+    gpu = gpu_utilization([p.pid for p in processes], interval)
+    if gpu is None:
+        time.sleep(interval)
+    cpu = (cpu_seconds() - before) / interval * 100
+    memory = process_tree_memory(pid)
+    return {"cpu_percent": round(cpu, 1), "gpu_percent": None if gpu is None else round(gpu, 1),
+            "rss": memory["rss"], "vram": memory["vram"], "processes": memory["processes"]}
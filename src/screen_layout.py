@@ -0,0 +1,87 @@
+import os
+import sys
+import hashlib
+import tempfile
+
+LAYOUTS = ('primary', 'span', 'mirror')
+
+def monitor_scale(x, y):
+    """DPI scale (1.0 = 96 DPI) of the monitor containing physical point x, y."""
+    if sys.platform != 'win32':
+        return 1.0
+    try:
+        import ctypes
+        from ctypes import wintypes
+        h_monitor = ctypes.windll.user32.MonitorFromPoint(wintypes.POINT(int(x), int(y)), 2)
+        dpi_x = ctypes.c_uint()
+        dpi_y = ctypes.c_uint()
+        ctypes.windll.shcore.GetDpiForMonitor(h_monitor, 0, ctypes.byref(dpi_x), ctypes.byref(dpi_y))
+        return dpi_x.value / 96.0
+    except Exception:
+        return 1.0
+
+def compute_layout(primary, others, mode, available=False):
+    """Window rect and per-screen rects for one wallpaper window.
+
+    primary / others are QScreens. 'primary' covers the primary screen only;
+    'span' and 'mirror' cover the bounding box of every screen with a single
+    window. Screen rects are in physical pixels relative to the window.
+    Returns ((x, y, width, height), [screen dicts]).
+    """
+    screens = [primary] + (list(others) if mode in ('span', 'mirror') else [])
+    rects = []
+    for screen in screens:
+        g = screen.availableGeometry() if available else screen.geometry()
+        rects.append((g.x(), g.y(), g.width(), g.height()))
+    left = min(r[0] for r in rects)
+    top = min(r[1] for r in rects)
+    right = max(r[0] + r[2] for r in rects)
+    bottom = max(r[1] + r[3] for r in rects)
+    entries = []
+    for i, (screen, (x, y, w, h)) in enumerate(zip(screens, rects)):
+        entries.append({
+            "name": screen.name(), "primary": i == 0,
+            "x": x - left, "y": y - top, "width": w, "height": h,
+            "scale": monitor_scale(x + w // 2, y + h // 2)
+        })
+    return (left, top, right - left, bottom - top), entries
+
+def mirror_shader(screens, width, height):
+    """mpv user shader (GLSL, hooked on MAIN) that turns the decoded frame into
+    a width x height canvas holding a copy, scaled and cropped to fill, on
+    every screen. It runs on the GPU after hardware decoding, so the video is
+    decoded once, stays in video memory and keeps its audio track; the player
+    needs keepaspect=no so the canvas maps 1:1 onto the window."""
+    lines = [
+        "//!HOOK MAIN", "//!BIND HOOKED", f"//!WIDTH {int(width)}", f"//!HEIGHT {int(height)}",
+        "//!DESC librewall mirror layout", "",
+        "bool lw_inside(vec2 p, vec4 rect) {",
+        "    return all(greaterThanEqual(p, rect.xy)) && all(lessThan(p, rect.xy + rect.zw));",
+        "}", "",
+        "vec4 lw_screen_copy(vec2 p, vec4 rect) {",
+        "    float fill = max(rect.z / HOOKED_size.x, rect.w / HOOKED_size.y);",
+        "    vec2 crop = (HOOKED_size * fill - rect.zw) * 0.5;",
+        "    return HOOKED_tex((p - rect.xy + crop) / (HOOKED_size * fill));",
+        "}", "",
+        "vec4 hook() {",
+        f"    vec2 p = HOOKED_pos * vec2({float(width)}, {float(height)});",
+        "    vec4 rect;",
+    ]
+    for screen in screens:
+        lines.append(f"    rect = vec4({float(screen['x'])}, {float(screen['y'])}, "
+                     f"{float(screen['width'])}, {float(screen['height'])});")
+        lines.append("    if (lw_inside(p, rect)) return lw_screen_copy(p, rect);")
+    lines += ["    return vec4(0.0, 0.0, 0.0, 1.0);", "}", ""]
+    return '\n'.join(lines)
+
+def shader_file(source):
+    """Path of a temp file holding source. Named by content: mpv caches user
+    shaders by path, so a changed layout needs a new name."""
+    digest = hashlib.sha1(source.encode('utf-8')).hexdigest()[:16]
+    path = os.path.join(tempfile.gettempdir(), f'librewall-mirror-{digest}.glsl')
+    if not os.path.exists(path):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(source)
+        os.replace(tmp, path)
+    return path
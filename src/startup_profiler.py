@@ -0,0 +1,146 @@
+import os
+import sys
+import json
+import time
+import threading
+import contextlib
+
+TRACE_DIR = 'startup_traces'
+HISTORY_FILE = 'startup_history.json'
+KEEP_TRACES = 20
+KEEP_HISTORY = 200
+
+class StartupProfiler:
+    """Phase timer for one process launch.
+
+    Phases are recorded as Chrome trace-event "complete" events (open the
+    file in chrome://tracing or ui.perfetto.dev); nested phases show up
+    nested. finish() writes <process>-<timestamp>.json under startup_traces/
+    (keeping the newest KEEP_TRACES per process) and appends a summary to
+    startup_traces/startup_history.json.
+    """
+
+    def __init__(self, process):
+        self.process = process
+        self.origin = time.perf_counter()
+        self.started_at = time.time()
+        self.pid = os.getpid()
+        self.events = []
+        self.open = {}
+        self.lock = threading.Lock()
+        self.finished = False
+
+    def _us(self, t):
+        return round((t - self.origin) * 1e6, 1)
+
+    def add(self, name, start, end, args=None):
+        event = {
+            "name": name, "cat": "startup", "ph": "X", "pid": self.pid,
+            "tid": threading.get_ident(), "ts": self._us(start), "dur": round((end - start) * 1e6, 1)
+        }
+        if args: event["args"] = args
+        with self.lock:
+            if not self.finished: self.events.append(event)
+
+    def begin(self, name):
+        """Start a phase that cannot be wrapped in a with block (module level code)."""
+        self.open[name] = time.perf_counter()
+
+    def end(self, name, **args):
+        start = self.open.pop(name, None)
+        if start is not None:
+            self.add(name, start, time.perf_counter(), args)
+
+    @contextlib.contextmanager
+    def phase(self, name, **args):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, start, time.perf_counter(), args)
+
+    def mark(self, name, **args):
+        event = {"name": name, "cat": "startup", "ph": "i", "s": "p", "pid": self.pid,
+                 "tid": threading.get_ident(), "ts": self._us(time.perf_counter())}
+        if args: event["args"] = args
+        with self.lock:
+            if not self.finished: self.events.append(event)
+
+    def finish(self, root_dir, **summary):
+        """Write the trace and history entry. Only the first call does anything."""
+        with self.lock:
+            if self.finished: return None
+            self.finished = True
+            total_ms = (time.perf_counter() - self.origin) * 1000
+            events = list(self.events)
+        phases = {}
+        for event in events:
+            if event["ph"] == "X":
+                phases[event["name"]] = round(phases.get(event["name"], 0) + event["dur"] / 1000, 1)
+        events.append({"name": "process_name", "ph": "M", "pid": self.pid, "args": {"name": self.process}})
+        out_dir = os.path.join(root_dir, TRACE_DIR)
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(self.started_at))
+        path = os.path.join(out_dir, f"{self.process}-{stamp}-{self.pid}.json")
+        try:
+            os.makedirs(out_dir, exist_ok=True)
+            with open(path, 'w') as f:
+                json.dump({"traceEvents": events, "displayTimeUnit": "ms",
+                           "otherData": {"process": self.process, "started_at": self.started_at, **summary}}, f)
+            self._prune(out_dir)
+            self._append_history(out_dir, {
+                "process": self.process, "started_at": self.started_at, "pid": self.pid,
+                "total_ms": round(total_ms, 1), "phases": phases, **summary
+            })
+        except Exception as e:
+            print(f"Startup Profiler: Could not write trace: {e}", file=sys.stderr)
+            return None
+        slowest = sorted(phases.items(), key=lambda item: item[1], reverse=True)[:3]
+        print(f"Startup Profiler: {self.process} ready in {total_ms:.0f} ms; slowest: "
+              + ", ".join(f"{name} {ms:.0f} ms" for name, ms in slowest))
+        return path
+
+    def _prune(self, out_dir):
+        prefix = f"{self.process}-"
+        traces = sorted(f for f in os.listdir(out_dir) if f.startswith(prefix) and f.endswith('.json'))
+        for name in traces[:-KEEP_TRACES]:
+            try: os.remove(os.path.join(out_dir, name))
+            except OSError: pass
+
+    def _append_history(self, out_dir, entry):
+        path = os.path.join(out_dir, HISTORY_FILE)
+        history = []
+        try:
+            with open(path, 'r') as f: history = json.load(f)
+        except Exception: pass
+        if not isinstance(history, list): history = []
+        history.append(entry)
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(history[-KEEP_HISTORY:], f, indent=1)
+        os.replace(tmp, path)
+
+def load_history(root_dir, process=None):
+    try:
+        with open(os.path.join(root_dir, TRACE_DIR, HISTORY_FILE), 'r') as f:
+            history = json.load(f)
+    except Exception:
+        return []
+    return [h for h in history if process is None or h.get("process") == process]
+
+if __name__ == "__main__":
+    # Median time per phase over the recorded launches, slowest first.
+    import statistics
+    root = os.path.dirname(os.path.abspath(__file__))
+    process = sys.argv[1] if len(sys.argv) > 1 else None
+    history = load_history(root, process)
+    if not history:
+        print("No startup history recorded.")
+        sys.exit(0)
+    totals = [h["total_ms"] for h in history]
+    print(f"{len(history)} launch(es), total median {statistics.median(totals):.0f} ms, last {totals[-1]:.0f} ms")
+    phases = {}
+    for h in history:
+        for name, ms in h.get("phases", {}).items():
+            phases.setdefault(name, []).append(ms)
+    for name, values in sorted(phases.items(), key=lambda item: statistics.median(item[1]), reverse=True):
+        print(f"  {name:<24} median {statistics.median(values):8.1f} ms  max {max(values):8.1f} ms  n={len(values)}")
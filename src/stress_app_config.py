@@ -0,0 +1,111 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import multiprocessing
+from config_service import ConfigService, ConfigConflict
+import api_config
+
+# Hammers one app_config.json from several processes at once, the way the
+# engine and the Launcher share it: "engine" processes write plain updates
+# (ws_port, screen_layout), "launcher" processes do compare-and-swap theme
+# switches with retries, "reader" processes poll the file raw and through a
+# ConfigService. Passes when no reader ever sees a torn file, versions only
+# go up, every write got its own version, and no unknown key was lost.
+
+THEMES = ('default', 'aurora', 'rain', 'city')
+LAYOUTS = ('primary', 'span', 'mirror')
+
+def engine_writer(root, writes, out):
+    config = ConfigService(root)
+    versions = []
+    for i in range(writes):
+        if i % 2: updated = config.update_app_config(ws_port=random.randint(1024, 65535))
+        else: updated = config.update_app_config(screen_layout=random.choice(LAYOUTS))
+        versions.append(updated.version)
+    out.put(("write", versions, 0))
+
+def launcher_writer(root, writes, out):
+    config = ConfigService(root)
+    versions, conflicts = [], 0
+    for _ in range(writes):
+        while True:
+            current = config.app_config()
+            try:
+                updated = config.update_app_config(expected_version=current.version, active_theme=random.choice(THEMES))
+                break
+            except ConfigConflict:
+                conflicts += 1
+        versions.append(updated.version)
+    out.put(("write", versions, conflicts))
+
+def reader(root, stop, out):
+    config = ConfigService(root)
+    path = config.app_config_path
+    problems, reads, last = [], 0, 0
+    while not stop.is_set():
+        try:
+            with open(path, 'r', encoding='utf-8') as f: data = json.load(f)
+        except PermissionError:
+            continue
+        except Exception as e:
+            problems.append(f"torn read: {e}")
+            continue
+        version = data.get('config_version', 0)
+        if version < last: problems.append(f"version went back from {last} to {version}")
+        last = max(last, version)
+        if data.get('widget_positions') != {"clock": [10, 20]}: problems.append("unknown key lost")
+        typed = config.app_config()
+        if typed.errors: problems.append(f"validation errors: {typed.errors}")
+        if typed.active_theme not in THEMES: problems.append(f"bad active theme {typed.active_theme}")
+        reads += 1
+    out.put(("read", problems[:10], reads))
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent app_config.json writers and readers across processes.")
+    parser.add_argument('--engines', type=int, default=2)
+    parser.add_argument('--launchers', type=int, default=2)
+    parser.add_argument('--readers', type=int, default=2)
+    parser.add_argument('--writes', type=int, default=200, help="writes per writer process")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='librewall-config-')
+    try:
+        with open(os.path.join(root, api_config.APP_CONFIG_FILE), 'w') as f:
+            json.dump({"active_theme": "aurora", "widget_positions": {"clock": [10, 20]}}, f)
+        out, stop = multiprocessing.Queue(), multiprocessing.Event()
+        readers = [multiprocessing.Process(target=reader, args=(root, stop, out)) for _ in range(args.readers)]
+        writers = [multiprocessing.Process(target=engine_writer, args=(root, args.writes, out)) for _ in range(args.engines)]
+        writers += [multiprocessing.Process(target=launcher_writer, args=(root, args.writes, out)) for _ in range(args.launchers)]
+        started = time.perf_counter()
+        for p in readers + writers: p.start()
+        results = [out.get() for _ in writers]
+        elapsed = time.perf_counter() - started
+        stop.set()
+        results += [out.get() for _ in readers]
+        for p in readers + writers: p.join()
+
+        total = len(writers) * args.writes
+        versions = sorted(v for kind, vs, _ in results if kind == "write" for v in vs)
+        conflicts = sum(n for kind, _, n in results if kind == "write")
+        reads = sum(n for kind, _, n in results if kind == "read")
+        problems = [p for kind, ps, _ in results if kind == "read" for p in ps]
+        final = ConfigService(root).app_config()
+        if versions != list(range(1, total + 1)):
+            problems.append(f"versions are not 1..{total} exactly once (lost or doubled writes)")
+        if final.version != total:
+            problems.append(f"final version {final.version}, expected {total}")
+        print(f"{total} writes in {elapsed:.2f} s ({total / elapsed:.0f}/s), {conflicts} CAS retries, {reads} reads")
+        for problem in problems:
+            print(f"    - {problem}")
+        print("FAIL" if problems else "ok")
+        sys.exit(1 if problems else 0)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
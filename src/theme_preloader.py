@@ -0,0 +1,192 @@
+import os
+import time
+import threading
+from file_watcher import RESCAN, ASSET_CHANGED
+
+CHUNK = 1024 * 1024
+DEFAULT_BUDGET_MB = 256
+
+class ThemePreloader:
+    """Warm slot for the theme the user is likely to activate next.
+
+    warm() reads the candidate's page assets (GLB model, HDR environment,
+    background media, css/html/js) into memory on a background thread so
+    the engine's HTTP server can answer the page from RAM after the switch.
+    Files that would push the slot over budget_bytes, or past what the
+    shared memory_budget has left, are left on disk. A video theme's media
+    is read through once without being kept, which leaves it in the OS
+    file cache for mpv. cancel() stops the read and
+    drops the slot. After watch(), lookup() trusts the slot and a
+    FileWatcher event for the warmed theme drops the changed file instead.
+    """
+
+    def __init__(self, config, budget_bytes=DEFAULT_BUDGET_MB * CHUNK, memory_budget=None):
+        self.config = config
+        self.budget_bytes = budget_bytes
+        self.memory_budget = memory_budget
+        self.lock = threading.Lock()
+        self.theme = None
+        self.files = {}
+        self.used = 0
+        self.cancel_event = None
+        self.report = {"state": "empty"}
+        self.watched_dir = None
+
+    def candidate_files(self, theme_id):
+        """(path, keep) for every asset the theme's first load will fetch."""
+        theme = self.config.theme_config(theme_id)
+        keep = theme.render_mode != 'video'
+        return [(path, keep) for path in theme.assets.values() if os.path.isfile(path)]
+
+    def warm(self, theme_id):
+        """Start warming theme_id, replacing whatever the slot held.
+        Raises ValueError for a bad id, LookupError for an unknown theme."""
+        self.config.theme_config(theme_id)
+        with self.lock:
+            if self.theme == theme_id and self.report["state"] in ("warming", "warm"):
+                return dict(self.report)
+            if self.cancel_event is not None:
+                self.cancel_event.set()
+            self.cancel_event = threading.Event()
+            self.theme = theme_id
+            self.files = {}
+            self.used = 0
+            self._account()
+            self.report = {"state": "warming", "theme": theme_id, "started_at": time.time()}
+            cancel_event = self.cancel_event
+        threading.Thread(target=self._warm, args=(theme_id, cancel_event), daemon=True).start()
+        return dict(self.report)
+
+    def _warm(self, theme_id, cancel_event):
+        started = time.perf_counter()
+        cached, prefetched, skipped = 0, 0, []
+        try:
+            for path, keep in self.candidate_files(theme_id):
+                size = os.path.getsize(path)
+                with self.lock:
+                    fits = self.used + size <= self.budget_bytes
+                    if keep and fits and self.memory_budget is not None:
+                        # The shared budget also covers the video demuxer cache.
+                        fits = self.memory_budget.available('preload') >= self.used + size
+                    if keep and fits:
+                        self.used += size
+                        self._account()
+                if keep and not fits:
+                    skipped.append(os.path.basename(path))
+                    continue
+                data = self._read(path, keep, cancel_event)
+                if data is None:
+                    return
+                if keep:
+                    stat = os.stat(path)
+                    with self.lock:
+                        if cancel_event.is_set(): return
+                        self.files[path] = (stat.st_mtime, stat.st_size, data)
+                    cached += size
+                else:
+                    prefetched += size
+        except Exception as e:
+            with self.lock:
+                if not cancel_event.is_set():
+                    self.report = {"state": "failed", "theme": theme_id, "error": str(e)}
+            print(f"Theme Preloader: Could not warm '{theme_id}': {e}")
+            return
+        with self.lock:
+            if cancel_event.is_set(): return
+            self.report = {
+                "state": "warm", "theme": theme_id,
+                "cached_mb": round(cached / 1048576, 1), "prefetched_mb": round(prefetched / 1048576, 1),
+                "skipped": skipped, "budget_mb": round(self.budget_bytes / 1048576),
+                "warm_ms": round((time.perf_counter() - started) * 1000, 1)
+            }
+        print(f"Theme Preloader: '{theme_id}' warm ({cached / 1048576:.1f} MB cached, {prefetched / 1048576:.1f} MB prefetched)")
+
+    def _read(self, path, keep, cancel_event):
+        chunks = []
+        with open(path, 'rb') as f:
+            while True:
+                if cancel_event.is_set(): return None
+                chunk = f.read(CHUNK)
+                if not chunk: break
+                if keep: chunks.append(chunk)
+        return b''.join(chunks)
+
+    def lookup(self, path):
+        """Cached bytes for path, or None if not warmed or changed on disk."""
+        key = os.path.normcase(os.path.abspath(path))
+        with self.lock:
+            entry = self.files.get(key)
+        if entry is None:
+            return None
+        if self.watched_dir is not None and key.startswith(self.watched_dir):
+            return entry[2]
+        try:
+            stat = os.stat(key)
+        except OSError:
+            return None
+        if (stat.st_mtime, stat.st_size) != entry[:2]:
+            return None
+        return entry[2]
+
+    def _account(self):
+        # Called with self.lock held.
+        if self.memory_budget is None: return
+        if self.used: self.memory_budget.reserve('preload', self.used)
+        else: self.memory_budget.release('preload')
+
+    def watch(self, watcher):
+        watcher.subscribe(self._on_watch_events)
+        # Only wallpapers/ is watched; the shared HDR is still stat()ed.
+        self.watched_dir = os.path.normcase(os.path.abspath(watcher.wallpapers_dir)) + os.sep
+
+    def _on_watch_events(self, events):
+        with self.lock:
+            theme = self.theme
+        for event in events:
+            if event.kind == RESCAN or (event.theme_id == theme and event.kind != ASSET_CHANGED):
+                if theme is not None: self.cancel(f"'{theme}' changed on disk")
+                return
+            if event.kind == ASSET_CHANGED and event.theme_id == theme:
+                with self.lock:
+                    entry = self.files.pop(os.path.normcase(os.path.abspath(event.path)), None)
+                    if entry is not None:
+                        self.used -= len(entry[2])
+                        self._account()
+
+    def cancel(self, reason):
+        with self.lock:
+            if self.theme is None: return
+            if self.cancel_event is not None:
+                self.cancel_event.set()
+            print(f"Theme Preloader: Dropped '{self.theme}' ({reason})")
+            self.report = {"state": "cancelled", "theme": self.theme, "reason": reason}
+            self.theme = None
+            self.files = {}
+            self.used = 0
+            self._account()
+
+    def release(self, theme_id):
+        """Drop the slot once theme_id is on screen; its assets are loaded by then."""
+        with self.lock:
+            if self.theme != theme_id: return
+            if self.cancel_event is not None:
+                self.cancel_event.set()
+            self.report = {"state": "used", "theme": theme_id}
+            self.theme = None
+            self.files = {}
+            self.used = 0
+            self._account()
+
+    def snapshot(self):
+        with self.lock:
+            report = dict(self.report)
+            report["held_mb"] = round(sum(len(entry[2]) for entry in self.files.values()) / 1048576, 1)
+            return report
+
+def on_battery():
+    try:
+        import psutil
+        battery = psutil.sensors_battery()
+        return battery is not None and not battery.power_plugged
+    except Exception:
+        return False
@@ -0,0 +1,188 @@
+import os
+import mmap
+import struct
+import threading
+import time
+import zlib
+
+HISTORY_DIR = 'traffic_history'
+
+SEGMENT_MAGIC = b'LWTS'
+SEGMENT_VERSION = 1
+# magic, version, resolution (s), slots per segment, segment epoch
+SEGMENT_HEADER = struct.Struct('<4sHHIq')
+SEGMENT_HEADER_SIZE = 64
+
+# timestamp, upload_bps, download_bps, total_sent, total_recv
+RECORD_BODY = struct.Struct('<dQQQQ')
+RECORD_CRC = struct.Struct('<I')
+RECORD_SIZE = 48
+RECORD_STRUCT = struct.Struct('<dQQQQI4x')
+
+class RollingSeriesFile:
+    """Fixed-size ring of preallocated, memory-mapped segment files.
+
+    Each sample is addressed directly by its timestamp: the slot number picks
+    the segment (modulo segment_count) and the record offset inside it, so a
+    write never moves data and disk usage never grows. A segment whose header
+    epoch does not match the slot being written is stale and gets recycled.
+    """
+
+    def __init__(self, directory, name, resolution, slots_per_segment, segment_count):
+        self.directory = directory
+        self.name = name
+        self.resolution = resolution
+        self.slots = slots_per_segment
+        self.segment_count = segment_count
+        self.segment_size = SEGMENT_HEADER_SIZE + self.slots * RECORD_SIZE
+        # Seconds of history always on hand; the segment being written may be partly recycled.
+        self.span = (segment_count - 1) * slots_per_segment * resolution
+        self.files = []
+        self.maps = []
+        self.epochs = []
+        os.makedirs(directory, exist_ok=True)
+        for index in range(segment_count):
+            self._open_segment(index)
+
+    def _open_segment(self, index):
+        path = os.path.join(self.directory, f"{self.name}_{index:02d}.bin")
+        mode = 'r+b' if os.path.exists(path) else 'w+b'
+        f = open(path, mode)
+        if os.fstat(f.fileno()).st_size != self.segment_size:
+            f.truncate(self.segment_size)
+        mm = mmap.mmap(f.fileno(), self.segment_size)
+        magic, version, resolution, slots, epoch = SEGMENT_HEADER.unpack_from(mm, 0)
+        if magic != SEGMENT_MAGIC or version != SEGMENT_VERSION or resolution != self.resolution or slots != self.slots:
+            epoch = -1
+            mm[:self.segment_size] = bytes(self.segment_size)
+        self.files.append(f)
+        self.maps.append(mm)
+        self.epochs.append(epoch)
+
+    def _recycle(self, index, epoch):
+        mm = self.maps[index]
+        # Records are cleared before the header moves to the new epoch, so a
+        # crash in between leaves an empty segment rather than mixed data.
+        mm[SEGMENT_HEADER_SIZE:] = bytes(self.segment_size - SEGMENT_HEADER_SIZE)
+        SEGMENT_HEADER.pack_into(mm, 0, SEGMENT_MAGIC, SEGMENT_VERSION, self.resolution, self.slots, epoch)
+        self.epochs[index] = epoch
+
+    def write(self, ts, upload_bps, download_bps, total_sent, total_recv):
+        slot = int(ts // self.resolution)
+        epoch = slot // self.slots
+        index = epoch % self.segment_count
+        if self.epochs[index] != epoch:
+            if self.epochs[index] > epoch:
+                return
+            self._recycle(index, epoch)
+        body = RECORD_BODY.pack(ts, upload_bps, download_bps, total_sent, total_recv)
+        offset = SEGMENT_HEADER_SIZE + (slot % self.slots) * RECORD_SIZE
+        mm = self.maps[index]
+        mm[offset:offset + RECORD_BODY.size] = body
+        RECORD_CRC.pack_into(mm, offset + RECORD_BODY.size, zlib.crc32(body))
+
+    def read(self, start_ts, end_ts):
+        rows = []
+        first_slot = int(start_ts // self.resolution)
+        last_slot = int(end_ts // self.resolution)
+        for epoch in range(first_slot // self.slots, last_slot // self.slots + 1):
+            index = epoch % self.segment_count
+            if self.epochs[index] != epoch:
+                continue
+            lo = max(first_slot, epoch * self.slots) - epoch * self.slots
+            hi = min(last_slot, epoch * self.slots + self.slots - 1) - epoch * self.slots + 1
+            mm = self.maps[index]
+            chunk = mm[SEGMENT_HEADER_SIZE + lo * RECORD_SIZE:SEGMENT_HEADER_SIZE + hi * RECORD_SIZE]
+            for i, record in enumerate(RECORD_STRUCT.iter_unpack(chunk)):
+                if record[0] == 0:
+                    continue
+                body_start = i * RECORD_SIZE
+                if zlib.crc32(chunk[body_start:body_start + RECORD_BODY.size]) != record[5]:
+                    continue
+                if start_ts <= record[0] <= end_ts:
+                    rows.append(record[:5])
+        return rows
+
+    def flush(self):
+        for mm in self.maps:
+            mm.flush()
+
+    def close(self):
+        for mm in self.maps:
+            try: mm.close()
+            except Exception: pass
+        for f in self.files:
+            try: f.close()
+            except Exception: pass
+        self.maps = []
+        self.files = []
+
+class TrafficHistory:
+    """Persistent traffic time series: 1 s samples for the last hour and
+    1 min averages for the last day, both kept in RollingSeriesFile rings."""
+
+    def __init__(self, directory):
+        self.lock = threading.Lock()
+        self.seconds = RollingSeriesFile(directory, 'sec', 1, 600, 7)
+        self.minutes = RollingSeriesFile(directory, 'min', 60, 60, 26)
+        self.minute_key = None
+        self.minute_sums = [0, 0]
+        self.minute_count = 0
+        self.last_flush = time.monotonic()
+
+    def record(self, ts, upload_bps, download_bps, total_sent, total_recv):
+        minute = int(ts // 60)
+        with self.lock:
+            self.seconds.write(ts, upload_bps, download_bps, total_sent, total_recv)
+            if minute != self.minute_key:
+                self.minute_key = minute
+                self.minute_sums = [0, 0]
+                self.minute_count = 0
+            self.minute_sums[0] += upload_bps
+            self.minute_sums[1] += download_bps
+            self.minute_count += 1
+            self.minutes.write(
+                minute * 60,
+                self.minute_sums[0] // self.minute_count,
+                self.minute_sums[1] // self.minute_count,
+                total_sent, total_recv
+            )
+            if time.monotonic() - self.last_flush >= 60:
+                self.seconds.flush()
+                self.minutes.flush()
+                self.last_flush = time.monotonic()
+
+    def resolution_for(self, seconds, resolution):
+        """resolution, raised to the minute ring's when the 1 s ring doesn't reach back seconds."""
+        if resolution < self.minutes.resolution and seconds > self.seconds.span:
+            return self.minutes.resolution
+        return resolution
+
+    def query(self, seconds=86400, resolution=60, now=None):
+        """Samples for the last seconds; see resolution_for() for the resolution actually used."""
+        if now is None:
+            now = time.time()
+        start = now - seconds
+        resolution = self.resolution_for(seconds, resolution)
+        store = self.seconds if resolution < self.minutes.resolution else self.minutes
+        with self.lock:
+            rows = store.read(start, now)
+        if resolution <= store.resolution:
+            return [list(r) for r in rows]
+
+        buckets = {}
+        for ts, up, down, sent, recv in rows:
+            key = int(ts // resolution) * resolution
+            b = buckets.get(key)
+            if b is None:
+                buckets[key] = [key, up, down, sent, recv, 1]
+            else:
+                b[1] += up; b[2] += down; b[3] = sent; b[4] = recv; b[5] += 1
+        return [[k, b[1] // b[5], b[2] // b[5], b[3], b[4]] for k, b in sorted(buckets.items())]
+
+    def close(self):
+        with self.lock:
+            self.seconds.flush()
+            self.minutes.flush()
+            self.seconds.close()
+            self.minutes.close()
@@ -0,0 +1,267 @@
+import os
+import collections
+import datetime
+import json
+import struct
+import threading
+import time
+import zlib
+
+TRAFFIC_LOG_DIR = 'traffic_log'
+
+BLOCK_MAGIC = b'LWTB'
+# magic, payload length, event count, first seq, last seq, first ts, last ts
+BLOCK_HEADER = struct.Struct('<4sIIQQdd')
+
+DEFAULT_SETTINGS = {
+    'ring_size': 5000,
+    'segment_kb': 4096,
+    'max_segments': 24,
+    'block_events': 256,
+    'flush_seconds': 10
+}
+
+class TrafficEvent:
+    __slots__ = ('seq', 'ts', 'kind', 'remote_ip', 'remote_port', 'local_port', 'protocol', 'process', 'hostname', 'view')
+
+    def __init__(self, seq, ts, kind, remote_ip, remote_port, local_port, protocol, process, hostname=None):
+        self.seq = seq
+        self.ts = ts
+        self.kind = kind
+        self.remote_ip = remote_ip
+        self.remote_port = remote_port
+        self.local_port = local_port
+        self.protocol = protocol
+        self.process = process
+        self.hostname = hostname
+        self.view = None
+
+    def set_hostname(self, hostname):
+        self.hostname = hostname
+        self.view = None
+
+    def as_tuple(self):
+        return (self.seq, self.ts, self.kind, self.remote_ip, self.remote_port, self.local_port, self.protocol, self.process, self.hostname)
+
+    def as_dict(self):
+        """Widget shape, matching the entries LIVE_TRAFFIC_LOG used to hold."""
+        if self.view is None:
+            if self.kind in ('INCOMING', 'AT-IN'):
+                ip_port = f"{self.remote_ip}:{self.remote_port}>{self.local_port}"
+            else:
+                ip_port = f"{self.remote_ip}:{self.remote_port}"
+            self.view = {
+                "timestamp": datetime.datetime.fromtimestamp(self.ts).strftime('%H:%M:%S.%f')[:-3],
+                "time": self.ts, "type": self.kind, "ip_port": ip_port,
+                "protocol": self.protocol, "process": self.process
+            }
+            if self.hostname: self.view["hostname"] = self.hostname
+        return self.view
+
+    def matches(self, start, end, process, ip, protocol):
+        if start is not None and self.ts < start: return False
+        if end is not None and self.ts > end: return False
+        if process is not None and self.process.lower() != process: return False
+        if ip is not None and self.remote_ip != ip: return False
+        if protocol is not None and self.protocol.lower() != protocol: return False
+        return True
+
+class TrafficEventLog:
+    """Connection event log: a large in-memory ring for recent events plus
+    append-only segment files of zlib-compressed blocks for older ones.
+
+    Every block header carries its seq/time range, so queries skip blocks
+    without decompressing them and only one block is in memory at a time.
+    Blocks are written and fsynced on the log's own writer thread, never on
+    the thread calling append().
+    """
+
+    def __init__(self, directory, settings=None):
+        cfg = dict(DEFAULT_SETTINGS)
+        if settings:
+            cfg.update({k: v for k, v in settings.items() if k in DEFAULT_SETTINGS})
+        self.directory = directory
+        ring_size = max(50, int(cfg['ring_size']))
+        self.block_events = max(1, min(int(cfg['block_events']), ring_size))
+        self.segment_bytes = max(64, int(cfg['segment_kb'])) * 1024
+        self.max_segments = max(1, int(cfg['max_segments']))
+        self.flush_seconds = float(cfg['flush_seconds'])
+        self.lock = threading.Lock()
+        self.io_lock = threading.Lock()
+        self.ring = collections.deque(maxlen=ring_size)
+        self.pending = []
+        self.pending_since = None
+        os.makedirs(directory, exist_ok=True)
+        self.next_seq = self._last_seq_on_disk() + 1
+        # A block torn by a crash would misalign every block appended after
+        # it, so writing resumes in a fresh segment in that case.
+        self.rotate_next = not self._tail_is_clean()
+        self.closing = False
+        self.wake = threading.Event()
+        self.writer = threading.Thread(target=self._write_loop, name='traffic-log-writer', daemon=True)
+        self.writer.start()
+
+    def _segments(self):
+        names = [n for n in os.listdir(self.directory) if n.startswith('traffic_') and n.endswith('.log')]
+        names.sort()
+        return [os.path.join(self.directory, n) for n in names]
+
+    def _read_headers(self, path):
+        headers = []
+        try:
+            with open(path, 'rb') as f:
+                offset = 0
+                while True:
+                    raw = f.read(BLOCK_HEADER.size)
+                    if len(raw) < BLOCK_HEADER.size:
+                        break
+                    header = BLOCK_HEADER.unpack(raw)
+                    if header[0] != BLOCK_MAGIC:
+                        break
+                    headers.append((offset, header))
+                    offset += BLOCK_HEADER.size + header[1]
+                    f.seek(offset)
+        except OSError:
+            pass
+        return headers
+
+    def _last_seq_on_disk(self):
+        for path in reversed(self._segments()):
+            headers = self._read_headers(path)
+            if headers:
+                return headers[-1][1][4]
+        return 0
+
+    def _tail_is_clean(self):
+        segments = self._segments()
+        if not segments:
+            return True
+        headers = self._read_headers(segments[-1])
+        end = headers[-1][0] + BLOCK_HEADER.size + headers[-1][1][1] if headers else 0
+        try:
+            return os.path.getsize(segments[-1]) == end
+        except OSError:
+            return False
+
+    def append(self, kind, remote_ip, remote_port, local_port, protocol, process, ts=None, hostname=None):
+        with self.lock:
+            event = TrafficEvent(
+                self.next_seq, time.time() if ts is None else ts, kind,
+                remote_ip, remote_port, local_port, protocol, process, hostname
+            )
+            self.next_seq += 1
+            self.ring.append(event)
+            self.pending.append(event)
+            # The first pending event starts the writer's flush timer.
+            if len(self.pending) == 1:
+                self.pending_since = time.monotonic()
+            wake = len(self.pending) == 1 or len(self.pending) >= self.block_events
+        if wake:
+            self.wake.set()
+        return event
+
+    def _write_loop(self):
+        while True:
+            with self.lock:
+                if self.closing:
+                    return
+                if not self.pending:
+                    timeout = None
+                elif len(self.pending) >= self.block_events:
+                    timeout = 0
+                else:
+                    timeout = max(0, self.pending_since + self.flush_seconds - time.monotonic())
+            if timeout == 0:
+                self.flush()
+                continue
+            # Sleeps without a timeout while nothing is pending.
+            self.wake.wait(timeout)
+            self.wake.clear()
+
+    def flush(self):
+        # io_lock is taken before pending is swapped out so that concurrent
+        # flushes write their blocks in seq order.
+        with self.io_lock:
+            with self.lock:
+                block, self.pending = self.pending, []
+            if not block:
+                return
+            payload = zlib.compress(json.dumps([e.as_tuple() for e in block], separators=(',', ':')).encode('utf-8'))
+            header = BLOCK_HEADER.pack(BLOCK_MAGIC, len(payload), len(block), block[0].seq, block[-1].seq, block[0].ts, block[-1].ts)
+            try:
+                segments = self._segments()
+                path = segments[-1] if segments else None
+                if path is None or self.rotate_next or os.path.getsize(path) >= self.segment_bytes:
+                    self.rotate_next = False
+                    number = int(os.path.basename(path)[8:-4]) + 1 if path else 1
+                    path = os.path.join(self.directory, f"traffic_{number:06d}.log")
+                    segments.append(path)
+                with open(path, 'ab') as f:
+                    f.write(header + payload)
+                    f.flush()
+                    os.fsync(f.fileno())
+                for old in segments[:-self.max_segments]:
+                    try: os.remove(old)
+                    except OSError: pass
+            except Exception as e:
+                print(f"Network Monitor: Failed to write traffic log segment: {e}")
+
+    def annotate_recent(self, remote_ip, hostname, depth=200):
+        """Attach a late-arriving hostname to the newest ring entries for remote_ip."""
+        with self.lock:
+            for i in range(len(self.ring) - 1, max(-1, len(self.ring) - 1 - depth), -1):
+                event = self.ring[i]
+                if event.remote_ip == remote_ip and event.hostname is None:
+                    event.set_hostname(hostname)
+
+    def recent(self, count=50):
+        with self.lock:
+            if count >= len(self.ring):
+                return list(self.ring)
+            return [self.ring[i] for i in range(len(self.ring) - count, len(self.ring))]
+
+    def query(self, start=None, end=None, process=None, ip=None, protocol=None, limit=500):
+        """Newest-first scan of the ring, then of the segments on disk."""
+        process = process.lower() if process else None
+        protocol = protocol.lower() if protocol else None
+        results = []
+        with self.lock:
+            ring = list(self.ring)
+        oldest_in_ring = ring[0].seq if ring else self.next_seq
+        for event in reversed(ring):
+            if event.matches(start, end, process, ip, protocol):
+                results.append(event)
+                if len(results) >= limit:
+                    return results
+
+        with self.io_lock:
+            segments = self._segments()
+        for path in reversed(segments):
+            headers = self._read_headers(path)
+            for offset, (_, length, _, first_seq, _, first_ts, last_ts) in reversed(headers):
+                if first_seq >= oldest_in_ring: continue
+                if start is not None and last_ts < start: continue
+                if end is not None and first_ts > end: continue
+                try:
+                    with open(path, 'rb') as f:
+                        f.seek(offset + BLOCK_HEADER.size)
+                        rows = json.loads(zlib.decompress(f.read(length)))
+                except Exception:
+                    continue
+                for row in reversed(rows):
+                    if row[0] >= oldest_in_ring: continue
+                    event = TrafficEvent(*row)
+                    if event.matches(start, end, process, ip, protocol):
+                        results.append(event)
+                        if len(results) >= limit:
+                            return results
+            if start is not None and headers and headers[0][1][5] < start:
+                break
+        return results
+
+    def close(self):
+        with self.lock:
+            self.closing = True
+        self.wake.set()
+        self.writer.join(5)
+        self.flush()
@@ -1,9 +1,15 @@
 import sys
 import os
+import time
 import ctypes
+import threading
+import collections
 from PyQt6.QtWidgets import QWidget, QMenu
 from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QAction
+from PyQt6.QtGui import QAction, QPixmap
+from screen_layout import mirror_shader, shader_file
+from render_profiles import RENDER_PROFILES, effective_profile
+from memory_budget import plan_demuxer_cache, DEFAULT_BUDGET_MB, MB
 if getattr(sys, 'frozen', False):
     ROOT_DIR = os.path.dirname(sys.executable)
 else:
@@ -21,16 +27,77 @@ try:
 except OSError as e:
     print(f"CRITICAL: Could not load libmpv.\nError: {e}")
     mpv = None
+TELEMETRY_SAMPLES = 150   # 5 minutes at the scheduler's 2 s interval
+TELEMETRY_PROPERTIES = ('hwdec-current', 'estimated-vf-fps', 'container-fps', 'frame-drop-count',
+                        'decoder-frame-drop-count', 'vo-delayed-frame-count', 'video-bitrate', 'width', 'height')
+# Dropped frames per minute above which a theme wants a lighter render profile.
+DROPS_PER_MIN_LIMIT = 30
+
+def _counter_delta(samples, key):
+    """Growth of an mpv counter across samples; counters restart with each file."""
+    total, last = 0, None
+    for sample in samples:
+        value = sample.get(key)
+        if value is None: continue
+        if last is not None:
+            total += value - last if value >= last else value
+        last = value
+    return total
+
+def summarize_telemetry(samples):
+    span = samples[-1]["ts"] - samples[0]["ts"] if len(samples) > 1 else 0
+    latest = samples[-1]
+    drops = _counter_delta(samples, 'frame-drop-count') + _counter_delta(samples, 'decoder-frame-drop-count')
+    delayed = _counter_delta(samples, 'vo-delayed-frame-count')
+    fps = [s['estimated-vf-fps'] for s in samples if s.get('estimated-vf-fps')]
+    bitrates = [s['video-bitrate'] for s in samples if s.get('video-bitrate')]
+    software = latest.get('hwdec-current') in (None, '', 'no')
+    drops_per_min = round(drops / span * 60, 1) if span else None
+    return {
+        "samples": len(samples), "span_s": round(span, 1), "profile": latest.get("profile"),
+        "hwdec": latest.get('hwdec-current'), "software_decode": software,
+        "resolution": f"{latest.get('width')}x{latest.get('height')}" if latest.get('width') else None,
+        "container_fps": latest.get('container-fps'),
+        "avg_fps": round(sum(fps) / len(fps), 2) if fps else None, "min_fps": round(min(fps), 2) if fps else None,
+        "dropped": drops, "delayed": delayed, "drops_per_min": drops_per_min,
+        "avg_bitrate_mbps": round(sum(bitrates) / len(bitrates) / 1e6, 2) if bitrates else None,
+        "needs_lighter_profile": bool((drops_per_min or 0) > DROPS_PER_MIN_LIMIT
+                                      or (software and (latest.get('height') or 0) >= 1440))
+    }
+
 class NativeVideoWidget(QWidget):
-    def __init__(self, video_path, parent=None, fps_limit=0, mute_audio=False, volume=70):
+    def __init__(self, video_path, parent=None, fps_limit=0, mute_audio=False, volume=70, render_profile='balanced',
+                 memory_budget=None):
         super().__init__(parent)
         self.is_paused = False
+        self.video_path = video_path
+        self.fps_limit = fps_limit
+        self.fps_cap = None
+        self.mute_audio = mute_audio
+        self.volume = volume
+        self.render_profile = render_profile
+        self.profile_cap = None
+        self.applied_profile = None
+        self.memory_budget = memory_budget
+        self.cache_plan = {"strategy": None}
+        self.telemetry = collections.deque(maxlen=TELEMETRY_SAMPLES)
+        self.telemetry_lock = threading.Lock()
+        self.reported_software = None
+        self.start_pos = None
+        self.resume_pos = None
+        self.poster = None
+        self.suspend_info = None
+        self.released = False
+        self.screen_shader = ''
+        self.panscan = 0.0
         if not mpv:
             return
         self.setWindowFlags(Qt.WindowType.FramelessWindowHint)
         self.setAttribute(Qt.WidgetAttribute.WA_NoSystemBackground)
         self.setAttribute(Qt.WidgetAttribute.WA_NativeWindow)
         self.setStyleSheet("background-color: black;")
+        self._create_player()
+    def _create_player(self):
         try:
             self.player = mpv.MPV(
                 wid=str(int(self.winId())),
@@ -41,39 +108,188 @@ class NativeVideoWidget(QWidget):
             self.player['hwdec-codecs'] = 'all' 
             self.player['vo'] = 'gpu'           
             self.player['gpu-context'] = 'd3d11'
-            self.player['scale'] = 'spline36'
-            self.player['cscale'] = 'spline36'
-            self.player['dscale'] = 'mitchell'
-            self.player['dither-depth'] = 'auto'
-            self.player['correct-downscaling'] = 'yes'
-            self.player['linear-downscaling'] = 'yes'
-            self.player['sigmoid-upscaling'] = 'yes'
-            self.player['deband'] = 'yes'
-            self.player['video-sync'] = 'display-resample'
-            self.player['interpolation'] = 'yes'
-            self.player['tscale'] = 'oversample'
-            if fps_limit > 0:
-                print(f"Video Engine: Limiting playback to {fps_limit} FPS")
-                self.player.vf = f'fps={fps_limit}'
-            if mute_audio:
+            self.applied_profile = None
+            self._apply_render_profile()
+            limit = self.effective_fps_limit()
+            if limit > 0:
+                print(f"Video Engine: Limiting playback to {limit} FPS")
+                self.player.vf = f'fps={limit}'
+            if self.mute_audio:
                 print("Video Engine: Audio Muted")
                 self.player.mute = True
             else:
                 self.player.mute = False
-            self.player.volume = volume
+            self.player.volume = self.volume
             self.player['loop-file'] = 'inf'
-            self.player['cache'] = 'yes'
-            self.player['demuxer-max-bytes'] = '500M'  
-            self.player['demuxer-readahead-secs'] = '20' 
-
             self.player['keep-open'] = 'yes'           
-            if os.path.exists(video_path):
-                print(f"Video Engine: Playing {video_path}")
-                self.player.play(video_path)
+            self.player.observe_property('duration', self._on_duration)
+            self._apply_screen_layout()
+            self._apply_cache_plan()
+            if self.start_pos:
+                self.player['start'] = f"{self.start_pos:.3f}"
+            if os.path.exists(self.video_path):
+                print(f"Video Engine: Playing {self.video_path}")
+                self.player.play(self.video_path)
             else:
-                print(f"Video Engine Error: File not found {video_path}")                
+                print(f"Video Engine Error: File not found {self.video_path}")                
         except Exception as e:
             print(f"Video Engine Initialization Failed: {e}")
+    def set_screen_layout(self, mode, screens, width, height):
+        """Fit playback to a window covering several screens: 'mirror' decodes once
+        and draws a full copy per screen on the GPU, 'span' stretches one copy across all."""
+        multi = len(screens) > 1
+        self.screen_shader = mirror_shader(screens, width, height) if multi and mode == 'mirror' else ''
+        self.panscan = 1.0 if multi and mode == 'span' else 0.0
+        if hasattr(self, 'player'):
+            self._apply_screen_layout()
+    def _apply_screen_layout(self):
+        try:
+            # The shader's output is already the window-sized canvas.
+            self.player['glsl-shaders'] = shader_file(self.screen_shader) if self.screen_shader else ''
+            self.player['keepaspect'] = 'no' if self.screen_shader else 'yes'
+            self.player['panscan'] = self.panscan
+            if self.screen_shader:
+                print("Video Engine: Mirroring one decode across screens")
+        except Exception as e:
+            print(f"Video Engine: Could not apply screen layout: {e}")
+    def load(self, video_path, fps_limit=0, mute_audio=False, volume=70, render_profile='balanced'):
+        """Play another video in this widget, reusing the running mpv instance."""
+        self.video_path = video_path
+        self.fps_limit = fps_limit
+        self.mute_audio = mute_audio
+        self.volume = volume
+        self.render_profile = render_profile
+        self.resume_pos = None
+        self.poster = None
+        if not mpv:
+            return
+        if not hasattr(self, 'player'):
+            self.released = False
+            self._create_player()
+            return
+        try:
+            limit = self.effective_fps_limit()
+            self.player.vf = f'fps={limit}' if limit > 0 else ''
+            self.player.mute = self.mute_audio
+            self.player.volume = self.volume
+            self._apply_render_profile()
+            self._apply_cache_plan()
+            # A resume whose first frame hasn't arrived yet still has the old file's position set.
+            self.player['start'] = 'none'
+            if os.path.exists(self.video_path):
+                print(f"Video Engine: Playing {self.video_path}")
+                self.player.play(self.video_path)
+            else:
+                print(f"Video Engine Error: File not found {self.video_path}")
+        except Exception as e:
+            print(f"Video Engine: Could not load {self.video_path}: {e}")
+    def _apply_cache_plan(self, bitrate=None):
+        """Size the demuxer cache for the current file (see plan_demuxer_cache)
+        within what the shared memory budget has left."""
+        try:
+            size = os.path.getsize(self.video_path)
+        except OSError:
+            size = 0
+        budget = self.memory_budget.available('video') if self.memory_budget is not None else DEFAULT_BUDGET_MB * MB
+        strategy, options, wanted = plan_demuxer_cache(size, budget, bitrate)
+        reserved = self.memory_budget.reserve('video', wanted) if self.memory_budget is not None else wanted
+        for key, value in options.items():
+            try:
+                self.player[key] = value
+            except Exception as e:
+                print(f"Video Engine: {key}={value} not supported by this mpv: {e}")
+        self.cache_plan = {
+            "strategy": strategy, "path": self.video_path, "file_mb": round(size / MB, 1),
+            "limit_mb": round(int(options['demuxer-max-bytes']) / MB, 1), "reserved_mb": round(reserved / MB, 1),
+            "bitrate_mbps": round(bitrate / 1e6, 2) if bitrate else None
+        }
+        print(f"Video Engine: Demuxer cache '{strategy}' ({size / MB:.0f} MB file, {int(options['demuxer-max-bytes']) / MB:.0f} MB ahead)")
+    def _on_duration(self, name, duration):
+        # mpv event thread. A stream window is first sized for a guessed
+        # bitrate; resize it once the real one is known.
+        plan = self.cache_plan
+        if not duration or plan.get("strategy") != "stream" or plan.get("bitrate_mbps") or plan.get("path") != self.video_path:
+            return
+        try:
+            self._apply_cache_plan(bitrate=int(os.path.getsize(self.video_path) * 8 / duration))
+        except Exception as e:
+            print(f"Video Engine: Could not resize demuxer cache: {e}")
+    def cache_report(self):
+        """Chosen cache strategy and what the demuxer actually holds."""
+        report = dict(self.cache_plan)
+        report["resident_mb"] = None
+        if hasattr(self, 'player') and not self.released:
+            try:
+                state = self.player['demuxer-cache-state'] or {}
+                resident = state.get('total-bytes', state.get('fw-bytes'))
+                if resident is not None: report["resident_mb"] = round(resident / MB, 1)
+                report["cached_secs"] = round(state.get('cache-duration') or 0, 1)
+            except Exception:
+                pass
+        return report
+    def sample_telemetry(self):
+        """Scheduler task: add one sample of mpv's playback counters to the ring buffer."""
+        if not hasattr(self, 'player') or self.released or self.is_paused:
+            return None
+        sample = {"ts": round(time.time(), 1), "media": os.path.basename(self.video_path), "profile": self.applied_profile}
+        for name in TELEMETRY_PROPERTIES:
+            try: value = self.player[name]
+            except Exception: value = None
+            sample[name] = round(value, 2) if isinstance(value, float) else value
+        try:
+            state = self.player['demuxer-cache-state'] or {}
+            sample['cache-secs'] = round(state.get('cache-duration') or 0, 1)
+        except Exception:
+            sample['cache-secs'] = None
+        hwdec = sample['hwdec-current']
+        if hwdec in (None, '', 'no') and sample['width'] and self.reported_software != self.video_path:
+            self.reported_software = self.video_path
+            print(f"Video Engine: {sample['media']} is decoded in software ({sample['width']}x{sample['height']})")
+        with self.telemetry_lock:
+            self.telemetry.append(sample)
+        return sample
+    def telemetry_report(self, samples=False):
+        """Summary per media file over the ring buffer, newest file first;
+        the raw samples too if asked."""
+        with self.telemetry_lock:
+            buffered = list(self.telemetry)
+        by_media = {}
+        for sample in buffered:
+            by_media.setdefault(sample["media"], []).append(sample)
+        report = {"buffered": len(buffered),
+                  "media": {name: summarize_telemetry(group) for name, group in reversed(list(by_media.items()))}}
+        if samples:
+            report["samples"] = buffered
+        return report
+    def effective_profile(self):
+        return effective_profile(self.render_profile, self.profile_cap)
+    def _apply_render_profile(self):
+        """Set the effective profile's options on the running player; only
+        the options that differ from the applied profile are touched."""
+        name = self.effective_profile()
+        if name == self.applied_profile:
+            return
+        previous = RENDER_PROFILES.get(self.applied_profile, {})
+        for key, value in RENDER_PROFILES[name].items():
+            if previous.get(key) == value: continue
+            try:
+                self.player[key] = value
+            except Exception as e:
+                print(f"Video Engine: {key}={value} not supported by this mpv: {e}")
+        self.applied_profile = name
+        print(f"Video Engine: Render profile '{name}'")
+    def set_render_profile(self, name):
+        """Switch the theme's render profile on the running player."""
+        if name not in RENDER_PROFILES:
+            raise ValueError(f"unknown render profile '{name}'")
+        self.render_profile = name
+        if hasattr(self, 'player'):
+            self._apply_render_profile()
+    def set_profile_cap(self, cap):
+        """Temporary ceiling on the render profile (from the playback policy); None lifts it."""
+        self.profile_cap = cap
+        if hasattr(self, 'player'):
+            self._apply_render_profile()
     def contextMenuEvent(self, event):
         menu = QMenu(self)
         if self.is_paused:
@@ -86,9 +302,105 @@ class NativeVideoWidget(QWidget):
         menu.addSeparator()
         menu.exec(event.globalPos())
     def set_paused(self, paused: bool):
+        self.is_paused = paused
         if hasattr(self, 'player'):
             self.player.pause = paused
-            self.is_paused = paused
+    def effective_fps_limit(self):
+        if self.fps_cap and (self.fps_limit <= 0 or self.fps_cap < self.fps_limit):
+            return self.fps_cap
+        return self.fps_limit
+    def set_fps_cap(self, cap):
+        """Temporary frame-rate ceiling on top of the theme's own fps_limit; None lifts it."""
+        if cap == self.fps_cap:
+            return
+        # Stored even without a player so a deep-suspended widget restores with it.
+        self.fps_cap = cap
+        if not hasattr(self, 'player'):
+            return
+        limit = self.effective_fps_limit()
+        try:
+            self.player.vf = f'fps={limit}' if limit > 0 else ''
+            print(f"Video Engine: Frame rate limit now {limit or 'unlimited'}")
+        except Exception as e:
+            print(f"Video Engine: Could not change frame rate limit: {e}")
+    def set_fps_limit(self, limit):
+        """Change the theme's own frame-rate limit on the running player."""
+        self.fps_limit = int(limit)
+        if not hasattr(self, 'player'):
+            return
+        limit = self.effective_fps_limit()
+        self.player.vf = f'fps={limit}' if limit > 0 else ''
+        print(f"Video Engine: Frame rate limit now {limit or 'unlimited'}")
+    def set_audio(self, mute_audio=None, volume=None):
+        if mute_audio is not None:
+            self.mute_audio = bool(mute_audio)
+        if volume is not None:
+            self.volume = int(volume)
+        if hasattr(self, 'player'):
+            self.player.mute = self.mute_audio
+            self.player.volume = self.volume
+            print(f"Video Engine: Volume {self.volume}{' (muted)' if self.mute_audio else ''}")
+    def capture_frame(self):
+        """Current video frame as a QPixmap, or None."""
+        if not hasattr(self, 'player') or self.released:
+            return None
+        try:
+            from PIL.ImageQt import ImageQt
+            image = self.player.screenshot_raw(includes='video')
+            return QPixmap.fromImage(ImageQt(image.convert('RGBA')))
+        except Exception as e:
+            print(f"Video Engine: Could not capture frame: {e}")
+            return None
+    def release(self):
+        """Terminate mpv, dropping its decoders and demuxer cache. restore() starts it again."""
+        if hasattr(self, 'player') and not self.released:
+            self.player.terminate()
+            del self.player
+            self.released = True
+            if self.memory_budget is not None:
+                self.memory_budget.release('video')
+            self.cache_plan = {"strategy": None}
+            print("Video Engine: Player released")
+    def suspend(self):
+        """release(), remembering the playback position and a poster frame
+        for resume(). Returns the poster (a QPixmap or None)."""
+        if not hasattr(self, 'player') or self.released:
+            return self.poster
+        try: self.resume_pos = self.player['time-pos']
+        except Exception: self.resume_pos = None
+        self.poster = self.capture_frame() or self.poster
+        cache_mb = self.cache_report().get("resident_mb")
+        self.release()
+        self.suspend_info = {"position": round(self.resume_pos, 3) if self.resume_pos else None,
+                             "demuxer_cache_mb": cache_mb, "media": os.path.basename(self.video_path)}
+        return self.poster
+    def resume(self, on_ready=None):
+        """Recreate the player at the position suspend() saved. on_ready(ms)
+        is called on mpv's event thread once playback is running again."""
+        if not self.released or not mpv:
+            return
+        started = time.perf_counter()
+        def ready(name, value):
+            if value is None: return
+            try:
+                self.player.unobserve_property('time-pos', ready)
+                # Later loads start from the beginning again.
+                self.player['start'] = 'none'
+            except Exception:
+                pass
+            if on_ready is not None:
+                on_ready((time.perf_counter() - started) * 1000)
+        self.start_pos = self.resume_pos
+        self.restore()
+        self.start_pos = None
+        if hasattr(self, 'player'):
+            self.player.observe_property('time-pos', ready)
+    def restore(self):
+        if self.released and mpv:
+            self.released = False
+            self._create_player()
+            if self.is_paused and hasattr(self, 'player'):
+                self.player.pause = True
     def stop(self):
         if hasattr(self, 'player'):
             self.player.terminate()
\ No newline at end of file